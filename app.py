@@ -19,13 +19,24 @@ from handlers import (
     writing_practice_handler,
     listening_practice_handler,
     botmaster_handler,
+    homework_handler,
 )
 from handlers.reading_practice_handler import reading_practice_conv_handler
 from handlers.speaking_practice_handler import speaking_practice_conv_handler
 from handlers.writing_practice_handler import writing_practice_conv_handler
 from handlers.listening_practice_handler import listening_practice_conv_handler
 from utils.translation_system import TranslationSystem
+from utils import compression, db_pool, db_routing
+from utils.db_routing import read_only
+from utils.answer_key import AnswerKeyError, compile_answer_key, remember_answer_key
 from services.auth_service import AuthService
+from services.principal_service import authorize, invalidate_principal
+from services.resource_version_service import conditional
+from services.export_service import export_response
+from services.membership_service import add_members
+from services.notification_service import enqueue_homework_notifications
+from services import metrics_service
+from services.ai_usage_service import usage_recorder
 from extensions import db
 from models.user import User
 from models.teacher import Teacher
@@ -37,6 +48,7 @@ from models.homework import Homework, HomeworkSubmission
 # New Imports for Bot Initialization
 import time
 import json
+import secrets
 import requests
 from flask_wtf.csrf import CSRFProtect
 
@@ -111,8 +123,9 @@ async def get_bot_info():
 # Helper function to process updates
 async def process_update(update_data):
     try:
-        update = Update.de_json(update_data, application.bot)
-        await application.process_update(update)
+        with metrics_service.track_webhook_update():
+            update = Update.de_json(update_data, application.bot)
+            await application.process_update(update)
     except Exception as e:
         logger.error(f"Error processing update: {e}")
 
@@ -129,6 +142,7 @@ application.add_handler(CommandHandler("stats", core_handlers.stats_command))
 application.add_handler(CommandHandler("practice", practice_handler.practice_command))
 application.add_handler(CommandHandler("explain", ai_commands_handler.explain_command))
 application.add_handler(CommandHandler("define", ai_commands_handler.define_command))
+application.add_handler(CallbackQueryHandler(ai_commands_handler.define_suggestion_callback, pattern=f"^{ai_commands_handler.DEFINE_SUGGESTION_PREFIX}"))
 application.add_handler(teacher_handler.create_group_conv_handler)
 application.add_handler(teacher_handler.assign_homework_conv_handler)
 application.add_handler(CommandHandler("my_exercises", exercise_management_handler.my_exercises_command))
@@ -139,8 +153,11 @@ application.add_handler(writing_practice_conv_handler)
 application.add_handler(listening_practice_conv_handler)
 application.add_handler(botmaster_handler.approve_teacher_conv_handler)
 application.add_handler(CommandHandler("system_stats", botmaster_handler.system_stats))
+application.add_handler(CommandHandler("ai_usage", botmaster_handler.ai_usage))
 application.add_handler(teacher_handler.group_analytics_conv_handler)
 application.add_handler(teacher_handler.student_progress_conv_handler)
+application.add_handler(teacher_handler.add_students_conv_handler)
+application.add_handler(homework_handler.my_homework_conv_handler)
 application.add_handler(botmaster_handler.manage_content_conv_handler)
 
 # Register error handler
@@ -167,11 +184,18 @@ def create_app(config_name='development'):
     # Initialize extensions with the app
     db.init_app(app)
     migrate.init_app(app, db)
+    db_pool.init_app(app)
+    db_routing.init_app(app)
 
 
     # Initialize CSRF protection (if Flask-WTF is installed and configured)
     CSRFProtect(app)
 
+    # Per-route latency histograms and the /metrics exposition endpoint
+    metrics_service.init_app(app)
+    usage_recorder.init_app(app)
+    compression.init_app(app)
+
     # Import models and register routes within the app context
     with app.app_context():
         @app.route("/")
@@ -182,10 +206,11 @@ def create_app(config_name='development'):
         def login():
             if request.method == "POST":
                 token = request.form.get("api_token")
-                user = AuthService.validate_token(token)
-                if user:
-                    session['user_id'] = user.id
-                    session['user_first_name'] = user.first_name
+                owner = AuthService.authenticate(token)
+                if owner:
+                    session['user_id'] = owner.user_id
+                    session['login_id'] = secrets.token_hex(8)
+                    session['user_first_name'] = owner.first_name
                     return redirect(url_for('dashboard'))
                 else:
                     flash("Invalid API Token. Please try again.", "error")
@@ -244,6 +269,7 @@ def create_app(config_name='development'):
         # API Endpoints
         @app.route("/api/groups", methods=["GET"])
         @login_required
+        @conditional('groups')
         def get_groups():
             teacher_user_id = session.get('user_id')
             groups = db.session.query(Group).filter_by(teacher_id=teacher_user_id).all()
@@ -264,19 +290,19 @@ def create_app(config_name='development'):
             new_group = Group(name=name, description=description, teacher_id=teacher_user_id)
             db.session.add(new_group)
             db.session.commit()
+            invalidate_principal(teacher_user_id)
 
             return jsonify({"success": True, "data": {"id": new_group.id, "name": new_group.name, "description": new_group.description}}), 201
 
         @app.route("/api/groups/<int:group_id>", methods=["GET"])
         @login_required
         def get_group(group_id):
-            teacher_user_id = session.get('user_id')
-            group = db.session.query(Group).filter_by(id=group_id).first()
+            group = db.session.get(Group, group_id)
 
             if not group:
                 return jsonify({"success": False, "error": "Group not found"}), 404
 
-            if group.teacher_id != teacher_user_id:
+            if not authorize(lambda p: p.owns_group(group_id)):
                 return jsonify({"success": False, "error": "Unauthorized"}), 403
             
             members = [{"id": member.id, "first_name": member.first_name, "last_name": member.last_name, "username": member.username} for member in group.members]
@@ -294,8 +320,7 @@ def create_app(config_name='development'):
         @app.route("/api/groups/<int:group_id>", methods=["PUT"])
         @login_required
         def update_group(group_id):
-            teacher_user_id = session.get('user_id')
-            group = db.session.query(Group).filter_by(id=group_id, teacher_id=teacher_user_id).first()
+            group = db.session.get(Group, group_id) if authorize(lambda p: p.owns_group(group_id)) else None
 
             if not group:
                 return jsonify({"success": False, "error": "Group not found or you are not authorized"}), 404
@@ -311,7 +336,7 @@ def create_app(config_name='development'):
         @login_required
         def add_group_member(group_id):
             teacher_user_id = session.get('user_id')
-            group = db.session.query(Group).filter_by(id=group_id, teacher_id=teacher_user_id).first()
+            group = db.session.get(Group, group_id) if authorize(lambda p: p.owns_group(group_id)) else None
 
             if not group:
                 return jsonify({"success": False, "error": "Group not found or you are not authorized"}), 404
@@ -333,14 +358,35 @@ def create_app(config_name='development'):
             new_membership = GroupMembership(group_id=group.id, student_id=student.id)
             db.session.add(new_membership)
             db.session.commit()
+            invalidate_principal(teacher_user_id)
 
             return jsonify({"success": True, "message": "Student added to group successfully"}), 201
 
+        @app.route("/api/groups/<int:group_id>/members/bulk", methods=["POST"])
+        @login_required
+        def add_group_members_bulk(group_id):
+            teacher_user_id = session.get('user_id')
+            if not authorize(lambda p: p.owns_group(group_id)):
+                return jsonify({"success": False, "error": "Group not found or you are not authorized"}), 404
+
+            students = (request.get_json(silent=True) or {}).get('students')
+            if not isinstance(students, list) or not students:
+                return jsonify({"success": False, "error": "A non-empty 'students' list is required"}), 400
+
+            try:
+                results = add_members(group_id, students)
+            except ValueError as e:
+                return jsonify({"success": False, "error": str(e)}), 400
+            invalidate_principal(teacher_user_id)
+
+            added = sum(1 for r in results if r['status'] == 'added')
+            return jsonify({"success": True, "data": {"added": added, "results": results}})
+
         @app.route("/api/groups/<int:group_id>/members/<int:student_id>", methods=["DELETE"])
         @login_required
         def remove_group_member(group_id, student_id):
             teacher_user_id = session.get('user_id')
-            group = db.session.query(Group).filter_by(id=group_id, teacher_id=teacher_user_id).first()
+            group = db.session.get(Group, group_id) if authorize(lambda p: p.owns_group(group_id)) else None
 
             if not group:
                 return jsonify({"success": False, "error": "Group not found or you are not authorized"}), 404
@@ -352,21 +398,15 @@ def create_app(config_name='development'):
 
             db.session.delete(membership)
             db.session.commit()
+            invalidate_principal(teacher_user_id)
 
             return jsonify({"success": True, "message": "Student removed from group successfully"})
 
         @app.route("/api/students/<int:student_id>", methods=["GET"])
         @login_required
         def get_student_details(student_id):
-            teacher_user_id = session.get('user_id')
-            
             # Authorization check: is the student in any of the teacher's groups?
-            is_authorized = db.session.query(GroupMembership).join(Group).filter(
-                Group.teacher_id == teacher_user_id,
-                GroupMembership.student_id == student_id
-            ).first()
-
-            if not is_authorized:
+            if not authorize(lambda p: p.teaches_student(student_id)):
                 return jsonify({"success": False, "error": "Unauthorized to view this student"}), 403
 
             student = db.session.query(User).filter_by(id=student_id).first()
@@ -377,16 +417,10 @@ def create_app(config_name='development'):
 
         @app.route("/api/students/<int:student_id>/progress", methods=["GET"])
         @login_required
+        @read_only
         def get_student_progress(student_id):
-            teacher_user_id = session.get('user_id')
-
             # Authorization check
-            is_authorized = db.session.query(GroupMembership).join(Group).filter(
-                Group.teacher_id == teacher_user_id,
-                GroupMembership.student_id == student_id
-            ).first()
-
-            if not is_authorized:
+            if not authorize(lambda p: p.teaches_student(student_id)):
                 return jsonify({"success": False, "error": "Unauthorized"}), 403
 
             student = db.session.get(User, student_id)
@@ -406,6 +440,7 @@ def create_app(config_name='development'):
 
         @app.route("/api/exercises", methods=["GET"])
         @login_required
+        @conditional('exercises')
         def get_exercises():
             teacher_user_id = session.get('user_id')
             exercises = db.session.query(TeacherExercise).filter_by(creator_id=teacher_user_id).all()
@@ -432,19 +467,19 @@ def create_app(config_name='development'):
             )
             db.session.add(new_exercise)
             db.session.commit()
+            invalidate_principal(teacher_user_id)
 
             return jsonify({"success": True, "data": {"id": new_exercise.id, "title": new_exercise.title, "description": new_exercise.description}}), 201
 
         @app.route("/api/exercises/<int:exercise_id>", methods=["GET"])
         @login_required
         def get_exercise(exercise_id):
-            teacher_user_id = session.get('user_id')
-            exercise = db.session.query(TeacherExercise).filter_by(id=exercise_id).first()
+            exercise = db.session.get(TeacherExercise, exercise_id)
 
             if not exercise:
                 return jsonify({"success": False, "error": "Exercise not found"}), 404
 
-            if exercise.creator_id != teacher_user_id:
+            if not authorize(lambda p: p.owns_exercise(exercise_id)):
                 return jsonify({"success": False, "error": "Unauthorized"}), 403
 
             return jsonify({
@@ -463,8 +498,7 @@ def create_app(config_name='development'):
         @app.route("/api/exercises/<int:exercise_id>", methods=["PUT"])
         @login_required
         def update_exercise(exercise_id):
-            teacher_user_id = session.get('user_id')
-            exercise = db.session.query(TeacherExercise).filter_by(id=exercise_id, creator_id=teacher_user_id).first()
+            exercise = db.session.get(TeacherExercise, exercise_id) if authorize(lambda p: p.owns_exercise(exercise_id)) else None
 
             if not exercise:
                 return jsonify({"success": False, "error": "Exercise not found or not authorized"}), 404
@@ -476,22 +510,35 @@ def create_app(config_name='development'):
             exercise.difficulty = data.get('difficulty', exercise.difficulty)
             exercise.content = data.get('content', exercise.content)
             exercise.is_published = data.get('is_published', exercise.is_published)
-            
+            if exercise.is_published:
+                try:
+                    answer_key = compile_answer_key(exercise.content)
+                except AnswerKeyError as e:
+                    db.session.rollback()
+                    return jsonify({"success": False, "error": str(e)}), 400
+
             db.session.commit()
+            if exercise.is_published:
+                remember_answer_key(exercise, answer_key)
             return jsonify({"success": True, "data": exercise.to_dict()})
 
         @app.route("/api/exercises/<int:exercise_id>/publish", methods=["POST"])
         @login_required
         def publish_exercise(exercise_id):
-            teacher_user_id = session.get('user_id')
-            exercise = db.session.query(TeacherExercise).filter_by(id=exercise_id, creator_id=teacher_user_id).first()
+            exercise = db.session.get(TeacherExercise, exercise_id) if authorize(lambda p: p.owns_exercise(exercise_id)) else None
 
             if not exercise:
                 return jsonify({"success": False, "error": "Exercise not found or not authorized"}), 404
 
+            try:
+                answer_key = compile_answer_key(exercise.content)
+            except AnswerKeyError as e:
+                return jsonify({"success": False, "error": str(e)}), 400
+
             exercise.is_published = True
             db.session.commit()
-            
+            remember_answer_key(exercise, answer_key)
+
             return jsonify({"success": True, "data": exercise.to_dict()})
 
         @app.route("/api/homework", methods=["POST"])
@@ -509,10 +556,7 @@ def create_app(config_name='development'):
                 return jsonify({"success": False, "error": "Exercise ID and Group ID are required"}), 400
 
             # Authorization: Check if teacher owns the group and the exercise
-            group = db.session.query(Group).filter_by(id=group_id, teacher_id=teacher_user_id).first()
-            exercise = db.session.query(TeacherExercise).filter_by(id=exercise_id, creator_id=teacher_user_id).first()
-
-            if not group or not exercise:
+            if not authorize(lambda p: p.owns_group(group_id) and p.owns_exercise(exercise_id)):
                 return jsonify({"success": False, "error": "Unauthorized or resource not found"}), 403
 
             due_date = datetime.fromisoformat(due_date_str) if due_date_str else None
@@ -525,12 +569,17 @@ def create_app(config_name='development'):
                 instructions=instructions
             )
             db.session.add(new_homework)
+            db.session.flush()
+            # Queued in the same transaction; the notification worker delivers them.
+            enqueue_homework_notifications(new_homework)
             db.session.commit()
+            invalidate_principal(teacher_user_id)
             
             return jsonify({"success": True, "message": "Homework assigned successfully.", "data": {"id": new_homework.id}}), 201
 
         @app.route("/api/homework", methods=["GET"])
         @login_required
+        @conditional('homework', 'groups', 'exercises')
         def get_homework_assignments():
             teacher_user_id = session.get('user_id')
             assignments = db.session.query(Homework).filter_by(assigned_by_id=teacher_user_id).all()
@@ -548,10 +597,8 @@ def create_app(config_name='development'):
         @app.route("/api/homework/<int:homework_id>/submissions", methods=["GET"])
         @login_required
         def get_homework_submissions(homework_id):
-            teacher_user_id = session.get('user_id')
-            
             # Authorization check
-            homework = db.session.query(Homework).filter_by(id=homework_id, assigned_by_id=teacher_user_id).first()
+            homework = db.session.get(Homework, homework_id) if authorize(lambda p: p.assigned_homework(homework_id)) else None
             if not homework:
                 return jsonify({"success": False, "error": "Homework not found or unauthorized"}), 404
 
@@ -567,11 +614,10 @@ def create_app(config_name='development'):
 
         @app.route("/api/analytics/groups/<int:group_id>", methods=["GET"])
         @login_required
+        @read_only
         def get_group_analytics(group_id):
-            teacher_user_id = session.get('user_id')
-            
             # Authorization: ensure the teacher owns the group
-            group = db.session.query(Group).filter_by(id=group_id, teacher_id=teacher_user_id).first()
+            group = db.session.get(Group, group_id) if authorize(lambda p: p.owns_group(group_id)) else None
             if not group:
                 return jsonify({"success": False, "error": "Group not found or unauthorized"}), 404
 
@@ -608,11 +654,10 @@ def create_app(config_name='development'):
 
         @app.route("/api/analytics/exercises/<int:exercise_id>", methods=["GET"])
         @login_required
+        @read_only
         def get_exercise_analytics(exercise_id):
-            teacher_user_id = session.get('user_id')
-
             # Authorization: ensure the teacher owns the exercise
-            exercise = db.session.query(TeacherExercise).filter_by(id=exercise_id, creator_id=teacher_user_id).first()
+            exercise = db.session.get(TeacherExercise, exercise_id) if authorize(lambda p: p.owns_exercise(exercise_id)) else None
             if not exercise:
                 return jsonify({"success": False, "error": "Exercise not found or unauthorized"}), 404
 
@@ -640,6 +685,34 @@ def create_app(config_name='development'):
 
             return jsonify({"success": True, "data": analytics_data})
 
+        @app.route("/api/groups/<int:group_id>/export", methods=["GET"])
+        @login_required
+        @read_only
+        def export_group_progress(group_id):
+            if not authorize(lambda p: p.owns_group(group_id)):
+                return jsonify({"success": False, "error": "Group not found or unauthorized"}), 404
+
+            student_ids = db.select(GroupMembership.student_id).where(GroupMembership.group_id == group_id)
+            try:
+                return export_response(student_ids, request.args, f"group-{group_id}-progress")
+            except ValueError as e:
+                return jsonify({"success": False, "error": str(e)}), 400
+
+        @app.route("/api/exports/progress", methods=["GET"])
+        @login_required
+        @read_only
+        def export_progress():
+            # All students in any of the teacher's groups, optionally within a start/end date range
+            student_ids = (
+                db.select(GroupMembership.student_id)
+                .join(Group, GroupMembership.group_id == Group.id)
+                .where(Group.teacher_id == session.get('user_id'))
+            )
+            try:
+                return export_response(student_ids, request.args, "progress")
+            except ValueError as e:
+                return jsonify({"success": False, "error": str(e)}), 400
+
         # @app.route("/webhook", methods=["POST"])
         # async def webhook():
         #     try:
@@ -661,8 +734,9 @@ def create_app(config_name='development'):
                         logger.info(f"Parsed JSON update: {update_data}")
                         if update_data:
                             # Use the global application object to process the update
-                            update = Update.de_json(update_data, application.bot)
-                            await application.process_update(update)
+                            with metrics_service.track_webhook_update():
+                                update = Update.de_json(update_data, application.bot)
+                                await application.process_update(update)
                         return "OK"
                     except Exception as e:
                         logger.error(f"Error in webhook: {e}")
@@ -1,32 +1,102 @@
 import os
 from dotenv import load_dotenv
+from sqlalchemy.pool import NullPool
 
 # Load environment variables from .env file
 load_dotenv()
 
+
+def _env_flag(name: str) -> bool:
+    return (os.environ.get(name) or "").lower() in ("1", "true", "yes")
+
+
+def engine_options(uri: str, pool_size: int, max_overflow: int, pool_timeout: float,
+                   pool_recycle: int, statement_timeout_ms: int) -> dict:
+    """
+    SQLAlchemy engine options for a deployment profile.
+
+    The DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE and
+    DB_STATEMENT_TIMEOUT_MS environment variables override the profile's
+    values. With DB_PGBOUNCER=1 the app keeps no pool of its own and leaves
+    pooling to PgBouncer in transaction mode; see utils.db_pool.
+    """
+    if uri.startswith("sqlite"):
+        # SQLite picks its own pool class; size limits do not apply to it.
+        return {"pool_pre_ping": True}
+    statement_timeout_ms = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS") or statement_timeout_ms)
+    if _env_flag("DB_PGBOUNCER"):
+        # Every checkout is a fresh client connection to PgBouncer, which is cheap; PgBouncer
+        # rejects startup options, so the statement timeout is set per transaction instead.
+        return {"poolclass": NullPool, "pool_pre_ping": False}
+    return {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE") or pool_size),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW") or max_overflow),
+        "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT") or pool_timeout),
+        # Replace connections before the server or a load balancer drops them as idle.
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE") or pool_recycle),
+        # Reuse the most recent connection, so connections left over from a burst sit idle and get recycled.
+        "pool_use_lifo": True,
+        "pool_pre_ping": True,
+        "connect_args": {
+            "connect_timeout": 10,
+            "options": f"-c statement_timeout={statement_timeout_ms} "
+                       f"-c idle_in_transaction_session_timeout={statement_timeout_ms * 2}",
+        },
+    }
+
+
 class Config:
     """Base configuration class."""
     SECRET_KEY = os.environ.get('FLASK_SECRET_KEY') or 'you-will-never-guess'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Seconds between background writes of buffered AI usage records; 0 disables the flush thread.
+    AI_USAGE_FLUSH_INTERVAL = float(os.environ.get('AI_USAGE_FLUSH_INTERVAL') or 5.0)
+    # Connections go through PgBouncer in transaction pooling mode.
+    DB_PGBOUNCER = _env_flag('DB_PGBOUNCER')
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS') or 30000)
+    # Optional read replica for reports and analytics; see utils.db_routing.
+    SQLALCHEMY_REPLICA_URI = os.environ.get('DATABASE_REPLICA_URL')
+    REPLICA_MAX_STALENESS = float(os.environ.get('REPLICA_MAX_STALENESS') or 5.0)
+    REPLICA_LAG_CHECK_INTERVAL = float(os.environ.get('REPLICA_LAG_CHECK_INTERVAL') or 1.0)
 
 class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL_DEV') or 'sqlite:///dev.db'
+    POOL_PROFILE = dict(
+        pool_size=5, max_overflow=5, pool_timeout=30,
+        pool_recycle=1800, statement_timeout_ms=Config.DB_STATEMENT_TIMEOUT_MS,
+    )
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI, **POOL_PROFILE)
 
 class TestingConfig(Config):
     """Testing configuration."""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_REPLICA_URI = None
+    POOL_PROFILE = dict(
+        pool_size=5, max_overflow=0, pool_timeout=5,
+        pool_recycle=1800, statement_timeout_ms=Config.DB_STATEMENT_TIMEOUT_MS,
+    )
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI, **POOL_PROFILE)
     WTF_CSRF_ENABLED = False
+    AI_USAGE_FLUSH_INTERVAL = 0
 
 class ProductionConfig(Config):
     """Production configuration."""
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///prod.db'
+    # Per gunicorn worker: up to pool_size + max_overflow connections, so keep
+    # GUNICORN_WORKERS * 30 below the server's max_connections. Bursts beyond
+    # that wait up to pool_timeout seconds for a connection, then fail fast.
+    POOL_PROFILE = dict(
+        pool_size=10, max_overflow=20, pool_timeout=10,
+        pool_recycle=300, statement_timeout_ms=Config.DB_STATEMENT_TIMEOUT_MS,
+    )
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI, **POOL_PROFILE)
 
 config = {
     'development': DevelopmentConfig,
     'testing': TestingConfig,
     'production': ProductionConfig,
     'default': DevelopmentConfig
-} 
\ No newline at end of file
+}
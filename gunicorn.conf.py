@@ -0,0 +1,23 @@
+import os
+import shutil
+
+# Gunicorn settings for production. Usage: gunicorn -c gunicorn.conf.py main:app
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", "4"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+
+# Every worker writes its metrics into this directory and /metrics merges them.
+# It must be set before prometheus_client is imported, so it is set here.
+multiproc_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/ielts_bot_metrics")
+
+
+def on_starting(server):
+    """Clears metric files left over from a previous run."""
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Drops live gauges (queue depth, memory) of a worker that has exited."""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
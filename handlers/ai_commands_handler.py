@@ -1,10 +1,15 @@
 import logging
-from telegram import Update
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
 from utils.translation_system import TranslationSystem
 from utils.input_validator import InputValidator
 from services.openai_service import OpenAIService
+from services.ai_usage_service import AIBudgetExceededError
+from services.openai_resilience import AIServiceBusyError
+from utils.progressive_message import ProgressiveMessage, iterate_in_thread
+from utils.lexicon import get_lexicon
+from utils.spelling import get_spelling_index
 from .decorators import error_handler
 
 logger = logging.getLogger(__name__)
@@ -36,19 +41,28 @@ async def explain_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         TranslationSystem.get_message('ai', 'thinking', lang_code)
     )
 
-    ai_service = OpenAIService()
+    ai_service = OpenAIService(user_id=user.id)
+    header = TranslationSystem.get_message('ai', 'explanation_header', lang_code, query=query)
+    progress = ProgressiveMessage(thinking_message)
     try:
-        explanation = ai_service.generate_explanation(
-            query=query, context=ai_context, language=lang_code
-        )
-        final_message = f"{TranslationSystem.get_message('ai', 'explanation_header', lang_code, query=query)}\n\n{explanation}"
-        await thinking_message.edit_text(final_message)
+        explanation = ""
+        stream = ai_service.stream_explanation(query=query, context=ai_context, language=lang_code)
+        async for explanation in iterate_in_thread(stream):
+            await progress.update(f"{header}\n\n{explanation}")
+        await progress.finish(f"{header}\n\n{explanation.strip()}")
+    except AIBudgetExceededError:
+        await thinking_message.edit_text(TranslationSystem.get_error_message("ai_budget_exceeded", lang_code))
+    except AIServiceBusyError:
+        await thinking_message.edit_text(TranslationSystem.get_error_message("ai_busy", lang_code))
     except Exception as e:
         logger.error(f"Error calling OpenAI service for /explain: {e}", exc_info=True)
         error_message = TranslationSystem.get_error_message("general", lang_code)
         await thinking_message.edit_text(error_message)
 
 
+DEFINE_SUGGESTION_PREFIX = "define_"
+
+
 @error_handler
 async def define_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handles the /define command to provide AI-powered definitions."""
@@ -68,18 +82,59 @@ async def define_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.message.reply_text(error_message)
         return
 
+    # Typos and gibberish are turned away locally instead of costing an API call.
+    lexicon = get_lexicon()
+    if lexicon is not None and not lexicon.is_known_word(word_to_define):
+        spelling = get_spelling_index()
+        suggestions = spelling.suggest(word_to_define) if spelling is not None else []
+        if suggestions:
+            keyboard = [[
+                InlineKeyboardButton(word, callback_data=f"{DEFINE_SUGGESTION_PREFIX}{word}") for word in suggestions
+            ]]
+            await update.message.reply_text(
+                TranslationSystem.get_message("ai_commands", "define_did_you_mean", lang_code, word=word_to_define),
+                reply_markup=InlineKeyboardMarkup(keyboard),
+            )
+        else:
+            await update.message.reply_text(
+                TranslationSystem.get_message("ai_commands", "define_unknown_word", lang_code, word=word_to_define)
+            )
+        return
+
     # Let the user know the bot is working
     thinking_message = await update.message.reply_text(
         TranslationSystem.get_message('ai', 'thinking', lang_code)
     )
+    await _send_definition(thinking_message, user.id, word_to_define, lang_code)
+
 
-    ai_service = OpenAIService()
+@error_handler
+async def define_suggestion_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Defines the word picked from the 'Did you mean' buttons."""
+    query = update.callback_query
+    await query.answer()
+
+    lang_code = TranslationSystem.detect_language(query.from_user.to_dict())
+    word = query.data[len(DEFINE_SUGGESTION_PREFIX):]
+    await query.edit_message_text(TranslationSystem.get_message('ai', 'thinking', lang_code))
+    await _send_definition(query.message, query.from_user.id, word, lang_code)
+
+
+async def _send_definition(thinking_message, user_id: int, word: str, lang_code: str) -> None:
+    """Streams the definition of `word` into `thinking_message`."""
+    ai_service = OpenAIService(user_id=user_id)
+    header = TranslationSystem.get_message('ai', 'definition_header', lang_code, word=word)
+    progress = ProgressiveMessage(thinking_message)
     try:
-        definition = ai_service.generate_definition(
-            word=word_to_define, language=lang_code
-        )
-        final_message = f"{TranslationSystem.get_message('ai', 'definition_header', lang_code, word=word_to_define)}\n\n{definition}"
-        await thinking_message.edit_text(final_message)
+        definition = ""
+        stream = ai_service.stream_definition(word=word, language=lang_code)
+        async for definition in iterate_in_thread(stream):
+            await progress.update(f"{header}\n\n{definition}")
+        await progress.finish(f"{header}\n\n{definition.strip()}")
+    except AIBudgetExceededError:
+        await thinking_message.edit_text(TranslationSystem.get_error_message("ai_budget_exceeded", lang_code))
+    except AIServiceBusyError:
+        await thinking_message.edit_text(TranslationSystem.get_error_message("ai_busy", lang_code))
     except Exception as e:
         logger.error(f"Error calling OpenAI service for /define: {e}", exc_info=True)
         error_message = TranslationSystem.get_error_message("general", lang_code)
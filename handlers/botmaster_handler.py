@@ -14,6 +14,9 @@ from models import User, Teacher, Group, TeacherExercise, Homework, PracticeSess
 from extensions import db
 from utils.translation_system import TranslationSystem
 from services.auth_service import AuthService
+from services.ai_usage_service import usage_report
+from utils.db_routing import read_only
+from utils.answer_key import AnswerKeyError, compile_answer_key, remember_answer_key
 
 # Initialize logger and translation system
 logger = logging.getLogger(__name__)
@@ -62,9 +65,17 @@ async def get_user_to_approve(update: Update, context: ContextTypes.DEFAULT_TYPE
         return ConversationHandler.END
 
     user_to_approve.teacher_profile.is_approved = True
-    # Assign an API token upon approval
-    AuthService.assign_token_to_teacher(user_to_approve.teacher_profile)
+    # Assign an API token upon approval. Only its digest is stored, so this message is the teacher's only copy.
+    token = AuthService.assign_token_to_teacher(user_to_approve.teacher_profile)
     db.session.commit()
+    try:
+        await context.bot.send_message(
+            chat_id=user_to_approve.user_id,
+            text=trans.get_message('teacher', 'api_token_issued', user_to_approve.preferred_language, token=token),
+            parse_mode='Markdown',
+        )
+    except Exception as e:
+        logger.warning(f"Could not send the API token to teacher {user_to_approve.user_id}: {e}")
 
     await update.message.reply_text(
         text=trans.get_message(
@@ -83,6 +94,7 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE, user: User)
     await update.message.reply_text(text=trans.get_message('botmaster', 'action_cancelled', language))
     return ConversationHandler.END
 
+@read_only
 @botmaster_required
 async def system_stats(update: Update, context: ContextTypes.DEFAULT_TYPE, user: User):
     """Displays system-wide statistics."""
@@ -107,6 +119,33 @@ async def system_stats(update: Update, context: ContextTypes.DEFAULT_TYPE, user:
     
     await update.message.reply_text(stats_message)
 
+@error_handler
+@botmaster_required
+async def ai_usage(update: Update, context: ContextTypes.DEFAULT_TYPE, user: User):
+    """Displays AI spend and latency per feature for the last 7 days."""
+    language = user.preferred_language
+    report = usage_report(days=7)
+
+    if not report:
+        await update.message.reply_text(trans.get_message('botmaster', 'ai_usage_empty', language))
+        return
+
+    lines = [trans.get_message('botmaster', 'ai_usage_header', language, days=7)]
+    for item in report:
+        lines.append(trans.get_message(
+            'botmaster',
+            'ai_usage_line',
+            language,
+            feature=item['feature'],
+            calls=item['calls'],
+            errors=item['errors'],
+            tokens=item['tokens'],
+            cost=f"{item['cost_usd']:.2f}",
+            p50=round(item['p50_ms']),
+            p95=round(item['p95_ms']),
+        ))
+    await update.message.reply_text("\n".join(lines))
+
 # We need to pass the botmaster user object from the entry point to other states
 # A better way would be to refactor the decorator or use a different state management
 async def patched_get_user_to_approve(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -164,9 +203,20 @@ async def manage_content_action(update: Update, context: ContextTypes.DEFAULT_TY
         await query.edit_message_text(trans.get_message('botmaster', 'content_not_found', user.preferred_language))
         return ConversationHandler.END
         
-    # Toggle publish status
+    # Toggle publish status; only content with a valid answer key can go live
+    answer_key = None
+    if not exercise.is_published:
+        try:
+            answer_key = compile_answer_key(exercise.content)
+        except AnswerKeyError as e:
+            await query.edit_message_text(
+                trans.get_message('botmaster', 'content_invalid', user.preferred_language, title=exercise.title, error=str(e))
+            )
+            return ConversationHandler.END
     exercise.is_published = not exercise.is_published
     db.session.commit()
+    if answer_key is not None:
+        remember_answer_key(exercise, answer_key)
     
     status = "Published" if exercise.is_published else "Draft"
     await query.edit_message_text(
@@ -1,11 +1,14 @@
 from functools import wraps
 import logging
+import time
 from flask import current_app
 from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
 from models import User
 from extensions import db
 from utils.translation_system import TranslationSystem
+from services import metrics_service
+from utils.db_routing import acting_as
 
 # Initialize translation system and logger
 trans = TranslationSystem()
@@ -18,15 +21,22 @@ def error_handler(func):
     """
     @wraps(func)
     async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
+        start = time.perf_counter()
+        outcome = 'ok'
+        principal = ('telegram', update.effective_user.id) if update.effective_user else None
         try:
-            return await func(update, context, *args, **kwargs)
+            with acting_as(principal):
+                return await func(update, context, *args, **kwargs)
         except Exception as e:
+            outcome = 'error'
             # Log the error with stack trace
             logger.error(f"Error in handler {func.__name__}: {e}", exc_info=True)
             language = trans.detect_language(update.effective_user.to_dict())
             if update.message:
                 await update.message.reply_text(text=trans.get_message('errors', 'general_error', language))
             # Potentially return a specific state or ConversationHandler.END if in a conversation
+        finally:
+            metrics_service.observe_handler(func.__name__, time.perf_counter() - start, outcome)
     return wrapper
 
 def teacher_required(func):
@@ -0,0 +1,170 @@
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import ContextTypes, ConversationHandler, CommandHandler, MessageHandler, filters, CallbackQueryHandler
+from models import User
+from extensions import db
+from utils.translation_system import TranslationSystem
+from .decorators import error_handler
+from services.homework_service import get_assignment, pending_homework, submit
+from utils.answer_key import AnswerKeyError, get_answer_key
+
+# Initialize translation system
+trans = TranslationSystem()
+
+# Define states for the homework submission ConversationHandler
+SELECT_HOMEWORK, ANSWER_QUESTION = range(2)
+
+def _student(telegram_id):
+    return db.session.query(User).filter(User.user_id == telegram_id).first()
+
+def _clear(context):
+    for key in ('homework_id', 'homework_questions', 'homework_answers'):
+        context.user_data.pop(key, None)
+
+async def _reply(update: Update, text, reply_markup=None):
+    """Edits the message behind a button press, or answers a typed message."""
+    if update.callback_query:
+        await update.callback_query.edit_message_text(text=text, reply_markup=reply_markup)
+    else:
+        await update.message.reply_text(text=text, reply_markup=reply_markup)
+
+async def _ask_next_question(update: Update, context: ContextTypes.DEFAULT_TYPE, user: User):
+    """Shows the next unanswered question, or stores the submission once all are answered."""
+    prompts = context.user_data['homework_questions']
+    answers = context.user_data['homework_answers']
+    if len(answers) == len(prompts):
+        return await _finish(update, context, user)
+
+    question = prompts[len(answers)]
+    text = trans.get_message('homework', 'question', user.preferred_language,
+                             number=len(answers) + 1, total=len(prompts), text=question['text'])
+    if question['options']:
+        # The question number rides along so that late or repeated taps can be told apart.
+        keyboard = [[InlineKeyboardButton(option, callback_data=f"mh_ans_{len(answers)}_{i}")]
+                    for i, option in enumerate(question['options'])]
+        await _reply(update, text, InlineKeyboardMarkup(keyboard))
+    else:
+        await _reply(update, text + "\n\n" + trans.get_message('homework', 'type_answer', user.preferred_language))
+    return ANSWER_QUESTION
+
+async def _finish(update: Update, context: ContextTypes.DEFAULT_TYPE, user: User):
+    """Stores the answers and acknowledges at once; scoring beyond multiple choice happens in the background."""
+    homework = get_assignment(context.user_data['homework_id'], user.id)
+    submission = submit(homework, user.id, context.user_data['homework_answers']) if homework else None
+    if submission is None:
+        text = trans.get_message('homework', 'not_available', user.preferred_language)
+    elif submission.score is not None:
+        text = trans.get_message('homework', 'submitted_scored', user.preferred_language, score=submission.score)
+    else:
+        text = trans.get_message('homework', 'submitted_pending', user.preferred_language)
+    await _reply(update, text)
+    _clear(context)
+    return ConversationHandler.END
+
+@error_handler
+async def my_homework_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Lists the homework the student still has to submit."""
+    user = _student(update.effective_user.id)
+    if not user:
+        language = trans.detect_language(update.effective_user.to_dict())
+        await update.message.reply_text(trans.get_message('errors', 'user_not_found', language))
+        return ConversationHandler.END
+
+    pending = pending_homework(user.id)
+    if not pending:
+        await update.message.reply_text(trans.get_message('homework', 'no_pending', user.preferred_language))
+        return ConversationHandler.END
+
+    keyboard = []
+    for homework, title, group_name in pending:
+        label = f"{title} ({group_name})"
+        if homework.due_date:
+            label += " · " + trans.get_message('homework', 'due_label', user.preferred_language,
+                                               due_date=homework.due_date.strftime('%Y-%m-%d'))
+        keyboard.append([InlineKeyboardButton(label, callback_data=f"mh_hw_{homework.id}")])
+    await update.message.reply_text(
+        text=trans.get_message('homework', 'select_homework', user.preferred_language),
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+    return SELECT_HOMEWORK
+
+@error_handler
+async def select_homework(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Starts answering the chosen homework."""
+    query = update.callback_query
+    await query.answer()
+    user = _student(query.from_user.id)
+
+    homework = get_assignment(int(query.data.split('_')[-1]), user.id)
+    try:
+        key = get_answer_key(homework.exercise) if homework else None
+    except AnswerKeyError:
+        key = None
+    if key is None:
+        await query.edit_message_text(text=trans.get_message('homework', 'not_available', user.preferred_language))
+        return ConversationHandler.END
+
+    exercise = homework.exercise
+    prompts = [{'text': q.text, 'options': list(q.options)} for q in key.questions]
+    # Writing tasks may carry their prompt in the description instead of a question list.
+    prompts = prompts or [{'text': exercise.description or exercise.title, 'options': []}]
+    context.user_data['homework_id'] = homework.id
+    context.user_data['homework_questions'] = prompts
+    context.user_data['homework_answers'] = []
+    return await _ask_next_question(update, context, user)
+
+@error_handler
+async def receive_choice(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Records the option picked for a multiple-choice question."""
+    query = update.callback_query
+    await query.answer()
+    user = _student(query.from_user.id)
+    if 'homework_answers' not in context.user_data:
+        await query.edit_message_text(text=trans.get_message('errors', 'session_expired', user.preferred_language))
+        return ConversationHandler.END
+
+    question_number, option = (int(part) for part in query.data.split('_')[-2:])
+    if question_number != len(context.user_data['homework_answers']):
+        # A double tap, or a tap on an earlier question's buttons: already answered.
+        return ANSWER_QUESTION
+    context.user_data['homework_answers'].append(option)
+    return await _ask_next_question(update, context, user)
+
+@error_handler
+async def receive_text_answer(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Records a typed answer; multiple-choice questions must be answered with the buttons."""
+    user = _student(update.effective_user.id)
+    if 'homework_answers' not in context.user_data:
+        await update.message.reply_text(trans.get_message('errors', 'session_expired', user.preferred_language))
+        return ConversationHandler.END
+
+    question = context.user_data['homework_questions'][len(context.user_data['homework_answers'])]
+    if question['options']:
+        await update.message.reply_text(trans.get_message('homework', 'use_buttons', user.preferred_language))
+        return ANSWER_QUESTION
+
+    context.user_data['homework_answers'].append(update.message.text.strip())
+    return await _ask_next_question(update, context, user)
+
+@error_handler
+async def cancel_homework(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Cancels the submission without storing anything."""
+    user = _student(update.effective_user.id)
+    _clear(context)
+    language = user.preferred_language if user else trans.detect_language(update.effective_user.to_dict())
+    await update.message.reply_text(trans.get_message('homework', 'cancelled', language))
+    return ConversationHandler.END
+
+# Define the conversation handler for submitting homework
+my_homework_conv_handler = ConversationHandler(
+    entry_points=[CommandHandler('my_homework', my_homework_command)],
+    states={
+        SELECT_HOMEWORK: [CallbackQueryHandler(select_homework, pattern='^mh_hw_')],
+        ANSWER_QUESTION: [
+            CallbackQueryHandler(receive_choice, pattern='^mh_ans_'),
+            MessageHandler(filters.TEXT & ~filters.COMMAND, receive_text_answer),
+        ],
+    },
+    fallbacks=[CommandHandler('cancel', cancel_homework)],
+    per_user=True,
+    per_chat=True,
+)
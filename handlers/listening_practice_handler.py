@@ -9,6 +9,7 @@ from telegram.ext import (
 )
 
 from models import User, PracticeSession
+from services.skill_assessment_service import update_skill_level_from_session
 from utils.translation_system import TranslationSystem
 from extensions import db
 from datetime import datetime
@@ -23,36 +24,6 @@ logger = logging.getLogger(__name__)
 # Conversation states
 SELECTING_EXERCISE, AWAITING_ANSWER = range(2)
 
-# Define skill levels and their score thresholds
-SKILL_LEVELS = {
-    "Advanced": 0.81,
-    "Upper-Intermediate": 0.61,
-    "Intermediate": 0.41,
-    "Elementary": 0.21,
-    "Beginner": 0.0,
-}
-
-def _update_skill_level(user: User, session: PracticeSession) -> str | None:
-    """
-    Updates a user's skill level based on their performance in a practice session.
-    Returns the new skill level if it was changed, otherwise None.
-    """
-    if not session.total_questions or session.total_questions == 0:
-        return None
-
-    score_percent = (session.correct_answers or 0) / session.total_questions
-
-    new_skill_level = "Beginner"
-    for level, threshold in SKILL_LEVELS.items():
-        if score_percent >= threshold:
-            new_skill_level = level
-            break
-
-    if user.skill_level != new_skill_level:
-        user.update_skill_level(new_skill_level)
-        return new_skill_level
-    
-    return None
 
 def _get_recommendation(current_section="listening"):
     """Gets a recommendation for the next practice section."""
@@ -213,7 +184,8 @@ async def handle_answer(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
         lang_code = user.preferred_language
 
         # Update skill level
-        new_level = _update_skill_level(user, session)
+        new_level = update_skill_level_from_session(user, session)
+        db.session.commit()
         final_message = f"Listening practice complete!\nYour score: {score}/{len(exercise['questions'])}"
         if new_level:
             level_up_message = TranslationSystem.get_message(
@@ -2,6 +2,7 @@ import logging
 import json
 import os
 import random
+from datetime import datetime
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import (
     ContextTypes,
@@ -13,6 +14,7 @@ from sqlalchemy.orm.attributes import flag_modified
 
 from extensions import db
 from models import User, PracticeSession
+from services.skill_assessment_service import update_skill_level_from_session
 from utils.translation_system import TranslationSystem
 
 # Enable logging
@@ -29,37 +31,6 @@ DATA_FILE_PATH = os.path.join(
     os.path.dirname(__file__), "..", "data", "reading_mcq.json"
 )
 
-# Define skill levels and their score thresholds
-SKILL_LEVELS = {
-    "Advanced": 0.81,
-    "Upper-Intermediate": 0.61,
-    "Intermediate": 0.41,
-    "Elementary": 0.21,
-    "Beginner": 0.0,
-}
-
-def _update_skill_level(user: User, session: PracticeSession) -> str | None:
-    """
-    Updates a user's skill level based on their performance in a practice session.
-    Returns the new skill level if it was changed, otherwise None.
-    """
-    if not session.total_questions or session.total_questions == 0:
-        return None
-
-    score_percent = (session.correct_answers or 0) / session.total_questions
-
-    new_skill_level = "Beginner"
-    for level, threshold in SKILL_LEVELS.items():
-        if score_percent >= threshold:
-            new_skill_level = level
-            break
-
-    if user.skill_level != new_skill_level:
-        user.update_skill_level(new_skill_level)
-        return new_skill_level
-    
-    return None
-
 
 def load_reading_data():
     """Loads reading practice data from the JSON file."""
@@ -178,6 +149,7 @@ async def handle_reading_answer(
 
     # Update stats
     session.total_questions = (session.total_questions or 0) + 1
+    session.completed_at = datetime.utcnow()
     stats = user.stats or {}
     reading_stats = stats.get("reading", {"correct": 0, "total": 0})
     reading_stats["total"] += 1
@@ -207,7 +179,7 @@ async def handle_reading_answer(
     flag_modified(user, "stats")
     
     # Update skill level
-    new_level = _update_skill_level(user, session)
+    new_level = update_skill_level_from_session(user, session)
     
     db.session.commit()
 
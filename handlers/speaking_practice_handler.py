@@ -1,7 +1,9 @@
+import asyncio
 import logging
 import os
 import uuid
 import random
+import time
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     ContextTypes,
@@ -12,12 +14,15 @@ from telegram.ext import (
     CommandHandler,
 )
 
-from models import User, PracticeSession
+from models import User, PracticeSession, PracticeAttempt
 from services.openai_service import OpenAIService
+from services.ai_usage_service import AIBudgetExceededError
+from services.openai_resilience import AIServiceBusyError
+from services.skill_assessment_service import update_skill_level_from_session
 from utils.translation_system import TranslationSystem
+from utils.phrase_index import get_phrase_index, format_phrase_review
 from extensions import db
 from datetime import datetime
-from sqlalchemy.orm.attributes import flag_modified
 
 # Enable logging
 logging.basicConfig(
@@ -33,38 +38,6 @@ TEMP_AUDIO_DIR = "temp_audio"
 if not os.path.exists(TEMP_AUDIO_DIR):
     os.makedirs(TEMP_AUDIO_DIR)
 
-# Define skill levels and their score thresholds
-SKILL_LEVELS = {
-    "Advanced": 0.81,
-    "Upper-Intermediate": 0.61,
-    "Intermediate": 0.41,
-    "Elementary": 0.21,
-    "Beginner": 0.0,
-}
-
-def _update_skill_level(user: User, band_score: float) -> str | None:
-    """
-    Updates a user's skill level based on their performance in a speaking session.
-    Returns the new skill level if it was changed, otherwise None.
-    """
-    if band_score is None:
-        return None
-
-    # Convert band score (1-9) to a percentage
-    score_percent = band_score / 9.0
-
-    new_skill_level = "Beginner"
-    for level, threshold in SKILL_LEVELS.items():
-        if score_percent >= threshold:
-            new_skill_level = level
-            break
-
-    if user.skill_level != new_skill_level:
-        user.update_skill_level(new_skill_level)
-        return new_skill_level
-    
-    return None
-
 
 def _get_recommendation(current_section="speaking"):
     """Gets a recommendation for the next practice section."""
@@ -102,18 +75,30 @@ async def start_speaking_practice(update: Update, context: ContextTypes.DEFAULT_
     return SELECTING_PART
 
 
+def _remember_model_answer(context: ContextTypes.DEFAULT_TYPE, question_data: dict) -> None:
+    """Keeps the corpus model answer, if the question came with one, for after the student has answered."""
+    if question_data.get("model_answer"):
+        context.user_data["speaking_model_answer"] = {
+            "answer": question_data["model_answer"],
+            "vocabulary": question_data.get("vocabulary", []),
+        }
+    else:
+        context.user_data.pop("speaking_model_answer", None)
+
+
 async def handle_part_1(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handles Speaking Part 1."""
     query = update.callback_query
     await query.answer()
     lang_code = TranslationSystem.detect_language(query.from_user.to_dict())
     
-    openai_service = OpenAIService()
-    question_data = openai_service.generate_speaking_question(part_number=1)
+    openai_service = OpenAIService(user_id=query.from_user.id)
+    question_data = await asyncio.to_thread(openai_service.generate_speaking_question, part_number=1)
     
     question = question_data.get("question", "Let's talk about your hometown. What kind of place is it?")
     context.user_data["speaking_question"] = question
     context.user_data["speaking_part"] = 1
+    _remember_model_answer(context, question_data)
 
     message = TranslationSystem.get_message("speaking_practice", "please_send_voice_response", lang_code)
     await query.edit_message_text(text=f"Part 1: {question}\\n\\n{message}")
@@ -126,8 +111,8 @@ async def handle_part_2(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     await query.answer()
     lang_code = TranslationSystem.detect_language(query.from_user.to_dict())
     
-    openai_service = OpenAIService()
-    question_data = openai_service.generate_speaking_question(part_number=2)
+    openai_service = OpenAIService(user_id=query.from_user.id)
+    question_data = await asyncio.to_thread(openai_service.generate_speaking_question, part_number=2)
 
     question = question_data.get("question", "Describe a memorable journey you have taken.")
     topic = question_data.get("topic", "A memorable journey")
@@ -135,6 +120,7 @@ async def handle_part_2(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     context.user_data["speaking_question"] = question
     context.user_data["speaking_topic"] = topic
     context.user_data["speaking_part"] = 2
+    _remember_model_answer(context, question_data)
 
     message = TranslationSystem.get_message("speaking_practice", "please_send_voice_response", lang_code)
     await query.edit_message_text(text=f"Part 2: {question}\\n\\n{message}")
@@ -148,12 +134,13 @@ async def handle_part_3_question(update: Update, context: ContextTypes.DEFAULT_T
     
     part_2_topic = context.user_data.get("speaking_topic", "your previous answer")
     
-    openai_service = OpenAIService()
-    question_data = openai_service.generate_speaking_question(part_number=3, topic=part_2_topic)
+    openai_service = OpenAIService(user_id=update.effective_user.id)
+    question_data = await asyncio.to_thread(openai_service.generate_speaking_question, part_number=3, topic=part_2_topic)
     question = question_data.get("question", f"Let's discuss more about {part_2_topic}. Why is it important?")
     
     context.user_data["speaking_question"] = question
     context.user_data["speaking_part"] = 3
+    _remember_model_answer(context, question_data)
 
     message = TranslationSystem.get_message("speaking_practice", "please_send_voice_response", lang_code)
     await context.bot.send_message(chat_id=update.effective_chat.id, text=f"Part 3: {question}\\n\\n{message}")
@@ -187,38 +174,53 @@ async def handle_voice_message(update: Update, context: ContextTypes.DEFAULT_TYP
         file_path = os.path.join(TEMP_AUDIO_DIR, file_name)
         await file.download_to_drive(file_path)
 
-        openai_service = OpenAIService()
+        openai_service = OpenAIService(user_id=message.from_user.id)
         question = context.user_data.get("speaking_question", "")
-        transcript = openai_service.speech_to_text(audio_file_path=file_path)
+        grading_started = time.perf_counter()
+        transcript = await asyncio.to_thread(openai_service.speech_to_text, audio_file_path=file_path)
         
         part_number = context.user_data.get("speaking_part", 1)
-        feedback = openai_service.generate_speaking_feedback(transcript, part_number, question)
+        feedback = await asyncio.to_thread(openai_service.generate_speaking_feedback, transcript, part_number, question)
+        phrase_index = get_phrase_index()
+        phrase_review = phrase_index.review(transcript, question) if phrase_index is not None else None
 
         session.total_questions = (session.total_questions or 0) + 1
-        current_session_data = session.session_data or []
-        current_session_data.append({
-            "part": part_number,
-            "question": question,
-            "transcript": transcript,
-            "feedback": feedback,
-        })
-        session.session_data = current_session_data
+        attempt = PracticeAttempt(
+            session_id=session.id,
+            ordinal=session.total_questions,
+            question=question,
+            answer=transcript,
+            feedback=feedback,
+            latency_ms=(time.perf_counter() - grading_started) * 1000,
+            details={
+                "part": part_number,
+                "target_phrases_used": [p.text for p in phrase_review["used"]] if phrase_review else [],
+            },
+        )
+        db.session.add(attempt)
         
         try:
             estimated_band = float(feedback.get('estimated_band', 0.0))
+            attempt.band = estimated_band
             session.score = ((session.score or 0.0) * (session.total_questions - 1) + estimated_band) / session.total_questions
             if estimated_band > 0:
                 session.correct_answers = (session.correct_answers or 0) + 1
         except (ValueError, TypeError):
             pass # Keep score as is
 
-        flag_modified(session, "session_data")
+        # Part 2 leads into Part 3; any other part ends the session, which
+        # then counts once towards the skill level, as in the nightly recompute.
+        new_level = None
+        if part_number != 2:
+            session.completed_at = datetime.utcnow()
+            new_level = update_skill_level_from_session(user, session)
         db.session.commit()
 
         summary_message = format_feedback(feedback, lang_code)
+        phrase_message = format_phrase_review(phrase_review, lang_code) if phrase_review else None
+        if phrase_message:
+            summary_message += f"\n\n{phrase_message}"
         
-        # Update skill level based on band score
-        new_level = _update_skill_level(user, estimated_band)
         if new_level:
             level_up_message = TranslationSystem.get_message(
                 "practice", "skill_level_up", lang_code, new_skill_level=new_level
@@ -226,23 +228,32 @@ async def handle_voice_message(update: Update, context: ContextTypes.DEFAULT_TYP
             summary_message += f"\\n\\n{level_up_message}"
 
         await message.reply_text(summary_message, parse_mode='Markdown')
+
+        model_answer = format_model_answer(context.user_data.pop("speaking_model_answer", None), lang_code)
+        if model_answer:
+            await message.reply_text(model_answer)
         
         os.remove(file_path)
 
         if part_number == 2:
             return await handle_part_3_question(update, context)
 
+    except AIBudgetExceededError:
+        await message.reply_text(TranslationSystem.get_error_message("ai_budget_exceeded", lang_code))
+        db.session.rollback()
+        return ConversationHandler.END
+    except AIServiceBusyError:
+        # The answer is kept in the conversation, so the student can simply resend it.
+        await message.reply_text(TranslationSystem.get_error_message("ai_busy", lang_code))
+        db.session.rollback()
+        return AWAITING_VOICE
     except Exception as e:
         logger.error(f"Error processing voice message: {e}", exc_info=True)
         await message.reply_text(TranslationSystem.get_error_message("general", lang_code))
         db.session.rollback()
         return ConversationHandler.END
 
-    # If the practice session is over (not continuing to Part 3)
-    session.completed_at = datetime.utcnow()
-    db.session.commit()
-    
-    # Offer a new practice recommendation
+    # The practice session is over, so offer a new practice recommendation
     recommendation = _get_recommendation()
     recommendation_text = TranslationSystem.get_message(
         "practice",
@@ -267,6 +278,17 @@ async def handle_voice_message(update: Update, context: ContextTypes.DEFAULT_TYP
     return ConversationHandler.END
 
 
+def format_model_answer(model_answer: dict | None, lang_code: str) -> str | None:
+    """Formats a stored model answer as plain text, or returns None if there is none."""
+    if not model_answer:
+        return None
+    text = f"{TranslationSystem.get_message('speaking_practice', 'model_answer_header', lang_code)}\n\n{model_answer['answer']}"
+    if model_answer.get("vocabulary"):
+        vocabulary = ", ".join(model_answer["vocabulary"])
+        text += f"\n\n{TranslationSystem.get_message('speaking_practice', 'useful_vocabulary', lang_code, vocabulary=vocabulary)}"
+    return text
+
+
 def format_feedback(feedback: dict, lang_code: str) -> str:
     """Formats the structured feedback into a user-friendly string."""
     try:
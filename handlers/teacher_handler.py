@@ -1,3 +1,4 @@
+from collections import Counter
 from functools import wraps
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler, CommandHandler, MessageHandler, filters, CallbackQueryHandler
@@ -7,6 +8,10 @@ from utils.translation_system import TranslationSystem
 from .decorators import error_handler, teacher_required
 from sqlalchemy.orm import joinedload
 from models import PracticeSession
+from services.essay_dedup_service import flagged_essay_count
+from services.membership_service import MAX_BULK_MEMBERS, add_members
+from services.notification_service import enqueue_homework_notifications
+from utils.db_routing import read_only
 
 # Initialize translation system
 trans = TranslationSystem()
@@ -23,6 +28,9 @@ SELECTING_GROUP_ANALYTICS = range(4, 5)
 # Define states for student progress
 SELECT_GROUP_FOR_PROGRESS, SELECT_STUDENT_FOR_PROGRESS = range(5, 7)
 
+# Define states for adding students in bulk
+SELECT_GROUP_FOR_ADDING, RECEIVE_STUDENT_LIST = range(7, 9)
+
 @error_handler
 @teacher_required
 async def create_group_start(update: Update, context: ContextTypes.DEFAULT_TYPE, user: User):
@@ -173,6 +181,8 @@ async def select_exercise_for_homework(update: Update, context: ContextTypes.DEF
         assigned_by_id=teacher.id
     )
     db.session.add(new_homework)
+    db.session.flush()
+    enqueue_homework_notifications(new_homework)
     db.session.commit()
 
     group = db.session.query(Group).filter_by(id=group_id).first()
@@ -217,6 +227,7 @@ assign_homework_conv_handler = ConversationHandler(
 )
 
 @error_handler
+@read_only
 @teacher_required
 async def group_analytics_start(update: Update, context: ContextTypes.DEFAULT_TYPE, user: User):
     """Starts the group analytics process by listing the teacher's groups."""
@@ -249,6 +260,7 @@ async def group_analytics_start(update: Update, context: ContextTypes.DEFAULT_TY
     return SELECTING_GROUP_ANALYTICS
 
 @error_handler
+@read_only
 async def show_group_analytics(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Fetches and displays analytics for the selected group."""
     query = update.callback_query
@@ -310,6 +322,7 @@ group_analytics_conv_handler = ConversationHandler(
 )
 
 @error_handler
+@read_only
 @teacher_required
 async def student_progress_start(update: Update, context: ContextTypes.DEFAULT_TYPE, user: User):
     """Starts the student progress check by listing the teacher's groups."""
@@ -332,6 +345,7 @@ async def student_progress_start(update: Update, context: ContextTypes.DEFAULT_T
     return SELECT_GROUP_FOR_PROGRESS
 
 @error_handler
+@read_only
 async def select_group_for_student_progress(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Lists students in the selected group."""
     query = update.callback_query
@@ -361,6 +375,7 @@ async def select_group_for_student_progress(update: Update, context: ContextType
     return SELECT_STUDENT_FOR_PROGRESS
 
 @error_handler
+@read_only
 async def show_student_progress(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Displays the selected student's progress."""
     query = update.callback_query
@@ -391,6 +406,12 @@ async def show_student_progress(update: Update, context: ContextTypes.DEFAULT_TY
         speaking_score=f"{stats.get('speaking', {}).get('band', 'N/A')}",
         listening_score=f"{stats.get('listening', {}).get('correct', 0)}/{stats.get('listening', {}).get('total', 0)}",
     )
+    flagged = flagged_essay_count(student.id)
+    if flagged:
+        progress_report += "\n\n" + trans.get_message(
+            'teacher', 'near_duplicate_warning', teacher_user.preferred_language,
+            count=flagged, student_name=student.first_name,
+        )
     await query.edit_message_text(text=progress_report, parse_mode='Markdown')
     return ConversationHandler.END
 
@@ -402,4 +423,86 @@ student_progress_conv_handler = ConversationHandler(
         SELECT_STUDENT_FOR_PROGRESS: [CallbackQueryHandler(show_student_progress, pattern='^sp_student_')],
     },
     fallbacks=[CommandHandler('cancel', cancel_group_creation)],
-) 
\ No newline at end of file
+) 
+@error_handler
+@teacher_required
+async def add_students_start(update: Update, context: ContextTypes.DEFAULT_TYPE, user: User):
+    """Starts adding students in bulk by listing the teacher's groups."""
+    teacher = user.teacher_profile
+    if not teacher:
+        await update.message.reply_text(trans.get_message('teacher', 'teacher_profile_not_found', user.preferred_language))
+        return ConversationHandler.END
+
+    taught_groups = db.session.query(Group).filter_by(teacher_id=teacher.id).all()
+    if not taught_groups:
+        await update.message.reply_text(trans.get_message('teacher', 'no_groups_for_adding_students', user.preferred_language))
+        return ConversationHandler.END
+
+    keyboard = [[InlineKeyboardButton(g.name, callback_data=f"as_group_{g.id}")] for g in taught_groups]
+    await update.message.reply_text(
+        text=trans.get_message('teacher', 'add_students_select_group', user.preferred_language),
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+    return SELECT_GROUP_FOR_ADDING
+
+@error_handler
+async def select_group_for_adding_students(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Stores the selected group and asks for the students to add."""
+    query = update.callback_query
+    await query.answer()
+    user = db.session.query(User).filter_by(user_id=query.from_user.id).first()
+
+    group_id = int(query.data.split('_')[-1])
+    group = db.session.get(Group, group_id)
+    if not group or group.teacher_id != user.teacher_profile.id:
+        await query.edit_message_text(text=trans.get_message('errors', 'unauthorized', user.preferred_language))
+        return ConversationHandler.END
+
+    context.user_data['add_students_group_id'] = group_id
+    await query.edit_message_text(
+        text=trans.get_message('teacher', 'add_students_prompt', user.preferred_language,
+                               group_name=group.name, max_students=MAX_BULK_MEMBERS)
+    )
+    return RECEIVE_STUDENT_LIST
+
+@error_handler
+async def receive_student_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Adds the listed students (Telegram ids or @usernames) in one insert and reports the outcome."""
+    user = db.session.query(User).filter(User.user_id == update.effective_user.id).first()
+    group_id = context.user_data.get('add_students_group_id')
+
+    items = update.message.text.replace(',', ' ').split()
+    try:
+        results = add_members(group_id, items, id_column=User.user_id)
+    except ValueError:
+        await update.message.reply_text(
+            trans.get_message('teacher', 'add_students_too_many', user.preferred_language, max_students=MAX_BULK_MEMBERS)
+        )
+        return RECEIVE_STUDENT_LIST
+
+    counts = Counter(r['status'] for r in results)
+    summary = trans.get_message(
+        'teacher', 'add_students_summary', user.preferred_language,
+        added=counts['added'], already=counts['already_member'],
+    )
+    missing = [r['item'] for r in results if r['status'] in ('not_found', 'invalid')]
+    if missing:
+        summary += "\n" + trans.get_message(
+            'teacher', 'add_students_not_found', user.preferred_language, items=", ".join(missing)
+        )
+    await update.message.reply_text(summary)
+
+    context.user_data.pop('add_students_group_id', None)
+    return ConversationHandler.END
+
+# Define the conversation handler for adding students in bulk
+add_students_conv_handler = ConversationHandler(
+    entry_points=[CommandHandler('add_students', add_students_start)],
+    states={
+        SELECT_GROUP_FOR_ADDING: [CallbackQueryHandler(select_group_for_adding_students, pattern='^as_group_')],
+        RECEIVE_STUDENT_LIST: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_student_list)],
+    },
+    fallbacks=[CommandHandler('cancel', cancel_group_creation)],
+    per_user=True,
+    per_chat=True,
+)
@@ -1,5 +1,7 @@
+import asyncio
 import logging
 import random
+import time
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     ContextTypes,
@@ -9,12 +11,18 @@ from telegram.ext import (
     filters,
     CommandHandler,
 )
-from models import User, PracticeSession
+from models import User, PracticeSession, PracticeAttempt
 from services.openai_service import OpenAIService
+from services.ai_usage_service import AIBudgetExceededError
+from services.openai_resilience import AIServiceBusyError
+from services.essay_dedup_service import fingerprint_essay, find_cached_feedback, record_essay
+from services.skill_assessment_service import update_skill_level_from_band
 from utils.translation_system import TranslationSystem
+from utils.phrase_index import get_phrase_index, format_phrase_review
+from utils.essay_metrics import analyze_essay
+from utils.progressive_message import ProgressiveMessage, iterate_in_thread
 from extensions import db
 from datetime import datetime
-from sqlalchemy.orm.attributes import flag_modified
 from sqlalchemy.orm import attributes
 
 # Enable logging
@@ -26,14 +34,6 @@ logger = logging.getLogger(__name__)
 # Conversation states
 SELECTING_TASK, AWAITING_ESSAY = range(2)
 
-# Define skill levels and their score thresholds
-SKILL_LEVELS = {
-    "Advanced": 0.81,
-    "Upper-Intermediate": 0.61,
-    "Intermediate": 0.41,
-    "Elementary": 0.21,
-    "Beginner": 0.0,
-}
 
 def _get_recommendation(current_section="writing"):
     """Gets a recommendation for the next practice section."""
@@ -41,29 +41,6 @@ def _get_recommendation(current_section="writing"):
     available_sections = [s for s in all_sections if s != current_section]
     return random.choice(available_sections)
 
-def _update_skill_level(user: User, band_score: float) -> str | None:
-    """
-    Updates a user's skill level based on their performance in a writing session.
-    Returns the new skill level if it was changed, otherwise None.
-    """
-    if band_score is None:
-        return None
-
-    # Convert band score (1-9) to a percentage
-    score_percent = band_score / 9.0
-
-    new_skill_level = "Beginner"
-    for level, threshold in SKILL_LEVELS.items():
-        if score_percent >= threshold:
-            new_skill_level = level
-            break
-
-    if user.skill_level != new_skill_level:
-        user.update_skill_level(new_skill_level)
-        return new_skill_level
-    
-    return None
-
 async def start_writing_practice(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Starts the writing practice session by showing task selection."""
     query = update.callback_query
@@ -97,9 +74,9 @@ async def handle_task_selection(update: Update, context: ContextTypes.DEFAULT_TY
 
     await query.edit_message_text(text=TranslationSystem.get_message("writing_practice", "generating_task", lang_code))
 
-    openai_service = OpenAIService()
+    openai_service = OpenAIService(user_id=query.from_user.id)
     try:
-        task_data = openai_service.generate_writing_task(task_type)
+        task_data = await asyncio.to_thread(openai_service.generate_writing_task, task_type)
         question = task_data.get("question")
         if not question:
             raise ValueError("Missing 'question' in task data from OpenAI")
@@ -139,43 +116,95 @@ async def handle_essay(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
         
     user = db.session.query(User).filter_by(id=session.user_id).first()
     lang_code = user.preferred_language
+    task_type = 1 if "task_1" in session.section else 2
 
-    await update.message.reply_text(TranslationSystem.get_message("writing_practice", "analysis_in_progress", lang_code))
+    # Essays that clearly miss the task are answered locally, without a model call.
+    metrics = analyze_essay(essay_text, task_type)
+    if metrics.problem == "too_short":
+        await update.message.reply_text(TranslationSystem.get_message(
+            "writing_practice", "essay_too_short", lang_code,
+            count=metrics.word_count, task=task_type, minimum=metrics.minimum_words,
+        ))
+        return AWAITING_ESSAY
+    if metrics.problem == "not_english":
+        await update.message.reply_text(TranslationSystem.get_message("writing_practice", "essay_not_english", lang_code))
+        return AWAITING_ESSAY
 
-    openai_service = OpenAIService()
     question = context.user_data.get("writing_question")
-    task_type = 1 if "task_1" in session.section else 2
-    
-    try:
-        feedback = openai_service.provide_writing_feedback(essay_text, task_type, question)
-    except Exception as e:
-        logger.error(f"Error getting writing feedback: {e}")
-        await update.message.reply_text(TranslationSystem.get_message("general", "error_generic_message", lang_code))
-        context.user_data.clear()
-        return ConversationHandler.END
+    # A resubmission of an essay that was already graded for this prompt gets the same feedback again.
+    grading_started = time.perf_counter()
+    fingerprint = fingerprint_essay(essay_text, question)
+    feedback = find_cached_feedback(fingerprint)
+    message_key = "duplicate_essay" if feedback is not None else "analysis_in_progress"
+    progress_message = await update.message.reply_text(
+        TranslationSystem.get_message("writing_practice", message_key, lang_code)
+    )
+    progress = ProgressiveMessage(progress_message)
+
+    if feedback is None:
+        openai_service = OpenAIService(user_id=user.user_id)
+        try:
+            # Feedback fields are shown as they stream in; the last item is the complete feedback.
+            stream = openai_service.stream_writing_feedback(essay_text, task_type, question, metrics)
+            async for feedback in iterate_in_thread(stream):
+                await progress.update(format_writing_feedback(feedback, lang_code, placeholder="…"))
+            if feedback is None:
+                raise ValueError("Empty writing feedback stream from OpenAI")
+        except AIBudgetExceededError:
+            await update.message.reply_text(TranslationSystem.get_error_message("ai_budget_exceeded", lang_code))
+            context.user_data.clear()
+            return ConversationHandler.END
+        except AIServiceBusyError:
+            # Keep the session so the student can resend the same essay.
+            await update.message.reply_text(TranslationSystem.get_error_message("ai_busy", lang_code))
+            return AWAITING_ESSAY
+        except Exception as e:
+            logger.error(f"Error getting writing feedback: {e}")
+            await update.message.reply_text(TranslationSystem.get_message("general", "error_generic_message", lang_code))
+            context.user_data.clear()
+            return ConversationHandler.END
 
     # Update session
     session.completed_at = datetime.utcnow()
-    session.session_data = {"question": question, "essay": essay_text, "feedback": feedback}
+    phrase_index = get_phrase_index()
+    phrase_review = phrase_index.review(essay_text, question) if phrase_index is not None else None
+    attempt = PracticeAttempt(
+        session_id=session.id,
+        ordinal=1,
+        question=question,
+        answer=essay_text,
+        feedback=feedback,
+        latency_ms=(time.perf_counter() - grading_started) * 1000,
+        details={
+            "metrics": metrics.to_dict(),
+            "target_phrases_used": [p.text for p in phrase_review["used"]] if phrase_review else [],
+        },
+    )
+    db.session.add(attempt)
+    formatted_feedback = format_writing_feedback(feedback, lang_code)
+    phrase_message = format_phrase_review(phrase_review, lang_code) if phrase_review else None
+    if phrase_message:
+        formatted_feedback += f"\n\n{phrase_message}"
     try:
         session.score = float(feedback.get("estimated_band", 0.0))
+        attempt.band = session.score
         if session.score > 0:
             session.correct_answers = 1
         # Update skill level based on band score
-        new_level = _update_skill_level(user, session.score)
+        new_level = update_skill_level_from_band(user, session.score)
         if new_level:
             level_up_message = TranslationSystem.get_message(
                 "practice", "skill_level_up", lang_code, new_skill_level=new_level
             )
-            formatted_feedback = format_writing_feedback(feedback, lang_code) + f"\\n\\n{level_up_message}"
+            formatted_feedback += f"\\n\\n{level_up_message}"
     except (ValueError, TypeError):
         session.score = 0.0
 
-    flag_modified(session, "session_data")
+    record_essay(fingerprint, user_id=session.user_id, practice_session_id=session.id)
     db.session.commit()
     
-    # Format and send feedback
-    await update.message.reply_text(formatted_feedback, parse_mode='Markdown')
+    # Replace the streamed preview with the final, Markdown-formatted feedback
+    await progress.finish(formatted_feedback, parse_mode='Markdown')
 
     # Offer a new practice recommendation
     recommendation = _get_recommendation()
@@ -203,8 +232,11 @@ async def handle_essay(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     return ConversationHandler.END
 
 
-def format_writing_feedback(feedback: dict, lang_code: str) -> str:
-    """Formats the structured writing feedback into a user-friendly string."""
+def format_writing_feedback(feedback: dict, lang_code: str, placeholder: str = 'N/A') -> str:
+    """
+    Formats the structured writing feedback into a user-friendly string.
+    `placeholder` fills fields that are missing, e.g. while feedback is still streaming.
+    """
     
     def get_msg(key, **kwargs):
         return TranslationSystem.get_message("writing_practice", key, lang_code, **kwargs)
@@ -214,11 +246,11 @@ def format_writing_feedback(feedback: dict, lang_code: str) -> str:
 
     return (
         f"{get_msg('feedback_summary_title')}\\n\\n"
-        f"{get_msg('estimated_band')} {feedback.get('estimated_band', 'N/A')}\\n\\n"
-        f"{get_msg('task_achievement')}\\n{feedback.get('task_achievement', 'N/A')}\\n\\n"
-        f"{get_msg('coherence_cohesion')}\\n{feedback.get('coherence_cohesion', 'N/A')}\\n\\n"
-        f"{get_msg('lexical_resource')}\\n{feedback.get('lexical_resource', 'N/A')}\\n\\n"
-        f"{get_msg('grammatical_range_accuracy')}\\n{feedback.get('grammatical_range_accuracy', 'N/A')}\\n\\n"
+        f"{get_msg('estimated_band')} {feedback.get('estimated_band', placeholder)}\\n\\n"
+        f"{get_msg('task_achievement')}\\n{feedback.get('task_achievement', placeholder)}\\n\\n"
+        f"{get_msg('coherence_cohesion')}\\n{feedback.get('coherence_cohesion', placeholder)}\\n\\n"
+        f"{get_msg('lexical_resource')}\\n{feedback.get('lexical_resource', placeholder)}\\n\\n"
+        f"{get_msg('grammatical_range_accuracy')}\\n{feedback.get('grammatical_range_accuracy', placeholder)}\\n\\n"
         f"{get_msg('strengths')}\\n- {strengths}\\n\\n"
         f"{get_msg('areas_for_improvement')}\\n- {improvements}"
     )
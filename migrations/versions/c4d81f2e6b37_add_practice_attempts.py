@@ -0,0 +1,160 @@
+"""Add practice_attempts and move answers out of practice_sessions.session_data
+
+Revision ID: c4d81f2e6b37
+Revises: b7e3c90a4d15
+Create Date: 2026-10-18 15:02:44.306118
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d81f2e6b37'
+down_revision = 'b7e3c90a4d15'
+branch_labels = None
+depends_on = None
+
+# Sessions read, split and written back per round trip; keeps memory flat on large tables.
+BATCH_SIZE = 500
+
+practice_sessions = sa.table(
+    'practice_sessions',
+    sa.column('id', sa.Integer),
+    sa.column('completed_at', sa.DateTime),
+    sa.column('session_data', sa.JSON),
+)
+practice_attempts = sa.table(
+    'practice_attempts',
+    sa.column('id', sa.Integer),
+    sa.column('session_id', sa.Integer),
+    sa.column('ordinal', sa.Integer),
+    sa.column('question', sa.Text),
+    sa.column('answer', sa.Text),
+    sa.column('feedback', sa.JSON),
+    sa.column('band', sa.Float),
+    sa.column('latency_ms', sa.Float),
+    sa.column('details', sa.JSON),
+    sa.column('created_at', sa.DateTime),
+)
+
+
+def _band(feedback):
+    try:
+        return float((feedback or {}).get('estimated_band'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _split(session_data):
+    """The attempts stored in one session_data blob, as (question, answer, feedback, details)."""
+    if isinstance(session_data, list):  # Speaking: one entry per answered part
+        return [
+            (e.get('question'), e.get('transcript'), e.get('feedback'),
+             {'part': e.get('part'), 'target_phrases_used': e.get('target_phrases_used', [])})
+            for e in session_data if isinstance(e, dict)
+        ]
+    if isinstance(session_data, dict) and 'essay' in session_data:  # Writing: the one essay
+        return [(
+            session_data.get('question'), session_data.get('essay'), session_data.get('feedback'),
+            {'metrics': session_data.get('metrics'), 'target_phrases_used': session_data.get('target_phrases_used', [])},
+        )]
+    return []
+
+
+def _join(attempts):
+    """Rebuilds a session_data blob from a session's attempts, in ordinal order."""
+    if len(attempts) == 1 and 'metrics' in (attempts[0].details or {}):
+        a = attempts[0]
+        return {'question': a.question, 'essay': a.answer, 'feedback': a.feedback, **(a.details or {})}
+    return [
+        {'part': (a.details or {}).get('part'), 'question': a.question, 'transcript': a.answer,
+         'feedback': a.feedback, 'target_phrases_used': (a.details or {}).get('target_phrases_used', [])}
+        for a in attempts
+    ]
+
+
+def upgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('practice_attempts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('ordinal', sa.Integer(), nullable=False),
+    sa.Column('question', sa.Text(), nullable=True),
+    sa.Column('answer', sa.Text(), nullable=True),
+    sa.Column('feedback', sa.JSON(), nullable=True),
+    sa.Column('band', sa.Float(), nullable=True),
+    sa.Column('latency_ms', sa.Float(), nullable=True),
+    sa.Column('details', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['session_id'], ['practice_sessions.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('session_id', 'ordinal', name='uq_practice_attempts_session_id_ordinal')
+    )
+    # ### end Alembic commands ###
+
+    # Keyset-paginated, so each batch is an index range scan and no blob is held past its batch.
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(practice_sessions.c.id, practice_sessions.c.completed_at, practice_sessions.c.session_data)
+            .where(practice_sessions.c.id > last_id, practice_sessions.c.session_data.isnot(None))
+            .order_by(practice_sessions.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        attempts, moved = [], []
+        for session_id, completed_at, session_data in rows:
+            split = _split(session_data)
+            for ordinal, (question, answer, feedback, details) in enumerate(split, start=1):
+                attempts.append({
+                    'session_id': session_id, 'ordinal': ordinal, 'question': question, 'answer': answer,
+                    'feedback': feedback, 'band': _band(feedback), 'latency_ms': None, 'details': details,
+                    'created_at': completed_at or datetime.utcnow(),
+                })
+            if split:
+                moved.append(session_id)
+        if attempts:
+            conn.execute(practice_attempts.insert(), attempts)
+        if moved:
+            conn.execute(
+                practice_sessions.update().where(practice_sessions.c.id.in_(moved)).values(session_data=sa.null())
+            )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        session_ids = conn.execute(
+            sa.select(practice_attempts.c.session_id).distinct()
+            .where(practice_attempts.c.session_id > last_id)
+            .order_by(practice_attempts.c.session_id)
+            .limit(BATCH_SIZE)
+        ).scalars().all()
+        if not session_ids:
+            break
+        rows = conn.execute(
+            sa.select(practice_attempts)
+            .where(practice_attempts.c.session_id.in_(session_ids))
+            .order_by(practice_attempts.c.session_id, practice_attempts.c.ordinal)
+        ).fetchall()
+        by_session = {}
+        for row in rows:
+            by_session.setdefault(row.session_id, []).append(row)
+        conn.execute(
+            practice_sessions.update()
+            .where(practice_sessions.c.id == sa.bindparam('target_id'))
+            .values(session_data=sa.bindparam('data')),
+            [{'target_id': sid, 'data': _join(attempts)} for sid, attempts in by_session.items()],
+        )
+        last_id = session_ids[-1]
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_table('practice_attempts')
+    # ### end Alembic commands ###
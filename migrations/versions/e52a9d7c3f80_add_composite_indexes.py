@@ -0,0 +1,44 @@
+"""Add composite and partial indexes for practice session, homework and group queries
+
+Revision ID: e52a9d7c3f80
+Revises: c4d81f2e6b37
+Create Date: 2026-10-18 16:40:19.772051
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e52a9d7c3f80'
+down_revision = 'c4d81f2e6b37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Built CONCURRENTLY on Postgres so the tables stay writable; that cannot run inside a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_practice_sessions_user_id_completed_at', 'practice_sessions', ['user_id', 'completed_at'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_practice_sessions_user_id_section_score', 'practice_sessions', ['user_id', 'section', 'score'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_homework_submissions_homework_id_score', 'homework_submissions', ['homework_id', 'score'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_homework_submissions_ungraded', 'homework_submissions', ['id'], unique=False, postgresql_concurrently=True,
+                        postgresql_where=sa.text('score IS NULL AND grading_batch_id IS NULL'),
+                        sqlite_where=sa.text('score IS NULL AND grading_batch_id IS NULL'))
+        op.create_index(op.f('ix_groups_teacher_id'), 'groups', ['teacher_id'], unique=False, postgresql_concurrently=True)
+
+        # Both are prefixes of the composite indexes above.
+        op.drop_index('ix_practice_sessions_user_id', table_name='practice_sessions', postgresql_concurrently=True)
+        op.drop_index('ix_homework_submissions_homework_id', table_name='homework_submissions', postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_homework_submissions_homework_id', 'homework_submissions', ['homework_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_practice_sessions_user_id', 'practice_sessions', ['user_id'], unique=False, postgresql_concurrently=True)
+
+        op.drop_index(op.f('ix_groups_teacher_id'), table_name='groups', postgresql_concurrently=True)
+        op.drop_index('ix_homework_submissions_ungraded', table_name='homework_submissions', postgresql_concurrently=True)
+        op.drop_index('ix_homework_submissions_homework_id_score', table_name='homework_submissions', postgresql_concurrently=True)
+        op.drop_index('ix_practice_sessions_user_id_section_score', table_name='practice_sessions', postgresql_concurrently=True)
+        op.drop_index('ix_practice_sessions_user_id_completed_at', table_name='practice_sessions', postgresql_concurrently=True)
@@ -0,0 +1,51 @@
+"""Store teacher API tokens as SHA-256 digests
+
+Revision ID: f1a6c3b9d27e
+Revises: e52a9d7c3f80
+Create Date: 2026-10-18 23:31:07.418260
+
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a6c3b9d27e'
+down_revision = 'e52a9d7c3f80'
+branch_labels = None
+depends_on = None
+
+teachers = sa.table(
+    'teachers',
+    sa.column('id', sa.Integer),
+    sa.column('api_token', sa.String),
+    sa.column('api_token_hash', sa.String),
+)
+
+
+def upgrade():
+    with op.batch_alter_table('teachers', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('api_token_hash', sa.String(length=64), nullable=True))
+
+    conn = op.get_bind()
+    rows = conn.execute(sa.select(teachers.c.id, teachers.c.api_token).where(teachers.c.api_token.isnot(None))).fetchall()
+    if rows:
+        conn.execute(
+            teachers.update().where(teachers.c.id == sa.bindparam('target_id')).values(api_token_hash=sa.bindparam('digest')),
+            [{'target_id': id_, 'digest': hashlib.sha256(token.encode('utf-8')).hexdigest()} for id_, token in rows],
+        )
+
+    with op.batch_alter_table('teachers', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_teachers_api_token_hash', ['api_token_hash'])
+        batch_op.drop_column('api_token')
+
+
+def downgrade():
+    # Digests cannot be turned back into tokens; teachers need new ones after a downgrade.
+    with op.batch_alter_table('teachers', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('api_token', sa.String(length=255), nullable=True))
+        batch_op.create_unique_constraint('uq_teachers_api_token', ['api_token'])
+        batch_op.drop_constraint('uq_teachers_api_token_hash', type_='unique')
+        batch_op.drop_column('api_token_hash')
@@ -3,7 +3,13 @@ from .teacher import Teacher
 from .group import Group, GroupMembership
 from .exercise import TeacherExercise
 from .practice_session import PracticeSession
-from .homework import Homework, HomeworkSubmission
+from .practice_attempt import PracticeAttempt
+from .homework import Homework, HomeworkSubmission, GradingBatch
+from .ai_usage import AIUsageRecord
+from .essay_fingerprint import EssayFingerprint, EssayFingerprintBand
+from .resource_version import ResourceVersion
+from .notification import NotificationOutbox
+from .scheduled_job import ScheduledJob
 
 __all__ = [
     "User",
@@ -12,6 +18,14 @@ __all__ = [
     "GroupMembership",
     "TeacherExercise",
     "PracticeSession",
+    "PracticeAttempt",
     "Homework",
     "HomeworkSubmission",
+    "GradingBatch",
+    "AIUsageRecord",
+    "EssayFingerprint",
+    "EssayFingerprintBand",
+    "ResourceVersion",
+    "NotificationOutbox",
+    "ScheduledJob",
 ] 
\ No newline at end of file
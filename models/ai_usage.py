@@ -0,0 +1,34 @@
+from extensions import db
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, Index
+from datetime import datetime
+
+class AIUsageRecord(db.Model):
+    """
+    One row per upstream OpenAI call. The table is append-only: rows are
+    inserted in batches by services.ai_usage_service and never updated.
+    """
+    __tablename__ = 'ai_usage_records'
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    user_id = Column(BigInteger, nullable=True)  # Telegram User ID, None for system calls
+    feature = Column(String(50), nullable=False)  # e.g., 'speaking_feedback', 'explain', 'question_gen'
+    method = Column(String(50), nullable=False)  # OpenAIService method name
+    model = Column(String(50), nullable=False)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    latency_ms = Column(Float, nullable=False)
+    cost_usd = Column(Float, nullable=False, default=0.0)
+    outcome = Column(String(20), nullable=False)  # 'ok' or the exception class name
+
+    __table_args__ = (
+        Index('ix_ai_usage_records_user_id_created_at', 'user_id', 'created_at'),
+        Index('ix_ai_usage_records_created_at_feature', 'created_at', 'feature'),
+    )
+
+    @property
+    def total_tokens(self) -> int:
+        return (self.prompt_tokens or 0) + (self.completion_tokens or 0)
+
+    def __repr__(self):
+        return f"<AIUsageRecord(id={self.id}, feature='{self.feature}', user_id={self.user_id}, tokens={self.total_tokens})>"
@@ -0,0 +1,51 @@
+from extensions import db
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, LargeBinary, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from datetime import datetime
+
+class EssayFingerprint(db.Model):
+    """
+    Hashes of one submitted essay, used to spot resubmissions and copying.
+    Written by services.essay_dedup_service alongside the practice session
+    that holds the essay and its feedback.
+    """
+    __tablename__ = 'essay_fingerprints'
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    practice_session_id = Column(Integer, ForeignKey('practice_sessions.id'), nullable=True, index=True)
+    prompt_hash = Column(String(32), nullable=False)
+    content_hash = Column(String(64), nullable=False)  # SHA-256 of the normalized essay text
+    signature = Column(LargeBinary, nullable=False)  # MinHash signature, NUM_PERM little-endian uint32s
+    # Closest earlier essay by another student, if it is a near-duplicate of this one.
+    near_duplicate_of_id = Column(Integer, ForeignKey('essay_fingerprints.id'), nullable=True, index=True)
+    similarity = Column(Float, nullable=True)  # Estimated Jaccard similarity to near_duplicate_of
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    practice_session = relationship("PracticeSession")
+    near_duplicate_of = relationship("EssayFingerprint", remote_side=[id])
+    bands = relationship("EssayFingerprintBand", back_populates="fingerprint", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index('ix_essay_fingerprints_prompt_hash_content_hash', 'prompt_hash', 'content_hash'),
+    )
+
+    def __repr__(self):
+        return f"<EssayFingerprint(id={self.id}, user_id={self.user_id}, near_duplicate_of_id={self.near_duplicate_of_id})>"
+
+
+class EssayFingerprintBand(db.Model):
+    """
+    One LSH band of a fingerprint's signature. Essays that share any band
+    key are near-duplicate candidates; the primary key doubles as the
+    lookup index.
+    """
+    __tablename__ = 'essay_fingerprint_bands'
+
+    band_key = Column(BigInteger, primary_key=True, autoincrement=False)
+    fingerprint_id = Column(Integer, ForeignKey('essay_fingerprints.id'), primary_key=True)
+
+    fingerprint = relationship("EssayFingerprint", back_populates="bands")
+
+    def __repr__(self):
+        return f"<EssayFingerprintBand(band_key={self.band_key}, fingerprint_id={self.fingerprint_id})>"
@@ -18,7 +18,7 @@ class Group(db.Model):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
     description = Column(Text, nullable=True)
-    teacher_id = Column(Integer, ForeignKey('teachers.id'), nullable=False)
+    teacher_id = Column(Integer, ForeignKey('teachers.id'), nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, server_default=db.func.now())
     is_active = Column(Boolean, default=True)
     last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
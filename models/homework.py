@@ -1,5 +1,5 @@
 from extensions import db
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON, Index, UniqueConstraint, and_
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -11,7 +11,7 @@ class Homework(db.Model):
     group_id = Column(Integer, ForeignKey('groups.id'), nullable=False, index=True)
     assigned_by_id = Column(Integer, ForeignKey('teachers.id'), nullable=False, index=True)
     assigned_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    due_date = Column(DateTime, nullable=True)
+    due_date = Column(DateTime, nullable=True, index=True)
     instructions = Column(Text, nullable=True)
 
     # Relationships
@@ -28,16 +28,53 @@ class HomeworkSubmission(db.Model):
     __tablename__ = 'homework_submissions'
 
     id = Column(Integer, primary_key=True, index=True)
-    homework_id = Column(Integer, ForeignKey('homework.id'), nullable=False, index=True)
+    homework_id = Column(Integer, ForeignKey('homework.id'), nullable=False)
     student_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
     submitted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     content = Column(JSON, nullable=False)
     score = Column(Integer, nullable=True)
     feedback = Column(Text, nullable=True)
+    # Set while the submission is out for batch grading; cleared again if grading fails.
+    grading_batch_id = Column(Integer, ForeignKey('grading_batches.id'), nullable=True, index=True)
+    # Batch grading runs that returned no usable result; capped so a bad essay is not re-billed forever.
+    grading_attempts = Column(Integer, nullable=False, default=0, server_default='0')
 
     # Relationships
     homework = relationship("Homework", back_populates="submissions")
     student = relationship("User", back_populates="homework_submissions")
+    grading_batch = relationship("GradingBatch", back_populates="submissions")
+
+    __table_args__ = (
+        # One submission per student and assignment, even when two finishes race
+        UniqueConstraint('homework_id', 'student_id', name='uq_homework_submissions_homework_id_student_id'),
+        # Submission scores per assignment, answered from the index alone
+        Index('ix_homework_submissions_homework_id_score', 'homework_id', 'score'),
+        # Only the submissions still waiting for the batch grader, in the order it takes them
+        Index(
+            'ix_homework_submissions_ungraded', 'id',
+            postgresql_where=and_(score.is_(None), grading_batch_id.is_(None)),
+            sqlite_where=and_(score.is_(None), grading_batch_id.is_(None)),
+        ),
+    )
+
+    def __repr__(self):
+        return f"<HomeworkSubmission(id={self.id}, homework_id={self.homework_id}, student_id={self.student_id})>"
+
+
+class GradingBatch(db.Model):
+    """An offline grading job covering many homework submissions."""
+    __tablename__ = 'grading_batches'
+
+    id = Column(Integer, primary_key=True, index=True)
+    backend = Column(String(20), nullable=False)  # 'openai' or 'local'
+    provider_batch_id = Column(String(100), nullable=False, unique=True)
+    status = Column(String(20), nullable=False, default='submitted')  # 'submitted', 'completed' or 'failed'
+    submission_count = Column(Integer, nullable=False, default=0)
+    graded_count = Column(Integer, nullable=False, default=0)
+    submitted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    completed_at = Column(DateTime, nullable=True)
+
+    submissions = relationship("HomeworkSubmission", back_populates="grading_batch")
 
     def __repr__(self):
-        return f"<HomeworkSubmission(id={self.id}, homework_id={self.homework_id}, student_id={self.student_id})>" 
\ No newline at end of file
+        return f"<GradingBatch(id={self.id}, provider_batch_id='{self.provider_batch_id}', status='{self.status}')>"
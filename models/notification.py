@@ -0,0 +1,37 @@
+from extensions import db
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Index
+from datetime import datetime
+
+class NotificationOutbox(db.Model):
+    """
+    A Telegram message waiting to be sent. Rows are written in the same
+    transaction as the change they announce and delivered afterwards by the
+    rate-limited worker in services.notification_service.
+    """
+    __tablename__ = 'notification_outbox'
+
+    id = Column(Integer, primary_key=True)
+    # Enqueuing the same notification twice is a no-op, e.g. 'homework:12:user:34'
+    idempotency_key = Column(String(100), nullable=False, unique=True)
+    chat_id = Column(BigInteger, nullable=False)  # Telegram User ID of the recipient
+    kind = Column(String(30), nullable=False)  # e.g., 'homework_assigned'
+    text = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default='pending')  # 'pending', 'sent' or 'failed'
+    attempts = Column(Integer, nullable=False, default=0)
+    # Earliest time the worker may (re)try; pushed forward while a worker holds the row
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Only the rows still to be delivered, in the order the worker takes them
+        Index(
+            'ix_notification_outbox_pending', 'next_attempt_at',
+            postgresql_where=(status == 'pending'),
+            sqlite_where=(status == 'pending'),
+        ),
+    )
+
+    def __repr__(self):
+        return f"<NotificationOutbox(id={self.id}, kind='{self.kind}', chat_id={self.chat_id}, status='{self.status}')>"
@@ -0,0 +1,47 @@
+from extensions import db
+from sqlalchemy import Column, Integer, Float, Text, JSON, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import relationship
+from datetime import datetime
+
+class PracticeAttempt(db.Model):
+    """
+    One answered question in a practice session: a speaking part, an essay.
+    Rows are only ever inserted, so recording an answer never rewrites the
+    session row or earlier attempts.
+    """
+    __tablename__ = 'practice_attempts'
+
+    id = Column(Integer, primary_key=True)
+    session_id = Column(Integer, ForeignKey('practice_sessions.id'), nullable=False)
+    ordinal = Column(Integer, nullable=False)  # 1-based position within the session
+    question = Column(Text, nullable=True)
+    answer = Column(Text, nullable=True)  # Transcript or essay text
+    feedback = Column(JSON, nullable=True)
+    band = Column(Float, nullable=True)
+    latency_ms = Column(Float, nullable=True)  # Time taken to grade the answer
+    details = Column(JSON, nullable=True)  # Section-specific extras, e.g. speaking part or essay metrics
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    session = relationship("PracticeSession", back_populates="attempts")
+
+    __table_args__ = (
+        # Also serves lookups of a session's attempts in order.
+        UniqueConstraint('session_id', 'ordinal', name='uq_practice_attempts_session_id_ordinal'),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "session_id": self.session_id,
+            "ordinal": self.ordinal,
+            "question": self.question,
+            "answer": self.answer,
+            "feedback": self.feedback,
+            "band": self.band,
+            "latency_ms": self.latency_ms,
+            "details": self.details,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+    def __repr__(self):
+        return f"<PracticeAttempt(id={self.id}, session_id={self.session_id}, ordinal={self.ordinal}, band={self.band})>"
@@ -1,5 +1,5 @@
 from extensions import db  # Import the db instance from extensions
-from sqlalchemy import Column, Integer, String, Float, JSON, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, JSON, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func # For default datetime
 
@@ -10,7 +10,7 @@ class PracticeSession(db.Model):
     __tablename__ = 'practice_sessions'
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     section = Column(String(50), nullable=False)  # e.g., 'speaking_part1', 'reading_mcq', 'writing_task2'
     
     score = Column(Float, nullable=True)
@@ -20,10 +20,21 @@ class PracticeSession(db.Model):
     started_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     completed_at = Column(DateTime(timezone=True), nullable=True)
     
-    session_data = Column(JSON, nullable=True) # For storing questions, user answers, AI feedback, etc.
+    session_data = Column(JSON, nullable=True) # Small per-session summary; answers and feedback live in practice_attempts
 
     # Relationship to User model (optional, but good for ORM features)
     user = relationship("User", back_populates="practice_sessions") # Define back_populates on User model later
+    # Loaded only when accessed, so listing sessions never pulls in transcripts and feedback.
+    attempts = relationship("PracticeAttempt", back_populates="session", order_by="PracticeAttempt.ordinal",
+                            cascade="all, delete-orphan")
+
+    # Both lead with user_id, so they also serve plain per-user lookups.
+    __table_args__ = (
+        # A student's sessions, newest first (progress reports)
+        Index('ix_practice_sessions_user_id_completed_at', 'user_id', 'completed_at'),
+        # Average score per section over a group's students, answered from the index alone
+        Index('ix_practice_sessions_user_id_section_score', 'user_id', 'section', 'score'),
+    )
 
     def to_dict(self):
         """Converts the practice session to a dictionary."""
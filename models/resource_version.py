@@ -0,0 +1,17 @@
+from extensions import db
+from sqlalchemy import Column, BigInteger, String
+
+class ResourceVersion(db.Model):
+    """
+    A counter bumped on every write to one teacher's groups, exercises or
+    homework, keyed like 'groups:42'. The dashboard list APIs derive their
+    ETags from these, so an unchanged list is answered without loading it.
+    Maintained by services.resource_version_service.
+    """
+    __tablename__ = 'resource_versions'
+
+    key = Column(String(64), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ResourceVersion(key='{self.key}', version={self.version})>"
@@ -0,0 +1,21 @@
+from extensions import db
+from sqlalchemy import Column, String, DateTime
+
+class ScheduledJob(db.Model):
+    """
+    Run state of a periodic background job. `locked_until` is a lease: the
+    process that sets it runs the job, and every other process skips it
+    until the lease is released or runs out. `watermark` is how far the job
+    has already processed, e.g. the upper due-date bound of the last reminder run.
+    Maintained by services.reminder_service.
+    """
+    __tablename__ = 'scheduled_jobs'
+
+    name = Column(String(50), primary_key=True)
+    locked_by = Column(String(100), nullable=True)  # host:pid of the lease holder
+    locked_until = Column(DateTime, nullable=True)
+    watermark = Column(DateTime, nullable=True)
+    last_run_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<ScheduledJob(name='{self.name}', locked_by='{self.locked_by}', watermark={self.watermark})>"
@@ -1,14 +1,22 @@
 from extensions import db
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
+import hashlib
+
+
+def hash_api_token(token: str) -> str:
+    """The fixed-length digest stored for, and looked up by, an API token."""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
 
 class Teacher(db.Model):
     __tablename__ = 'teachers'
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, unique=True, index=True)
-    api_token = Column(String(255), unique=True, nullable=True)
+    # SHA-256 hex digest of the teacher's API token; the token itself is never stored.
+    api_token_hash = Column(String(64), nullable=True)
     is_approved = Column(Boolean, default=False, nullable=False)
     approval_date = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -22,5 +30,17 @@ class Teacher(db.Model):
     # Relationship to the TeacherExercise model
     exercises = relationship("TeacherExercise", back_populates="creator")
 
+    @property
+    def api_token(self):
+        raise AttributeError("API tokens are stored hashed; only api_token_hash can be read")
+
+    @api_token.setter
+    def api_token(self, token: str | None):
+        self.api_token_hash = hash_api_token(token) if token else None
+
+    __table_args__ = (
+        UniqueConstraint('api_token_hash', name='uq_teachers_api_token_hash'),
+    )
+
     def __repr__(self):
         return f"<Teacher(id={self.id}, user_id={self.user_id}, is_approved={self.is_approved})>" 
\ No newline at end of file
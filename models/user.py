@@ -26,6 +26,8 @@ class User(db.Model):
     })
     placement_test_score = Column(Float, nullable=True)
     skill_level = Column(String(50), nullable=True, default="Beginner") # Default skill level
+    # Moving average of practice results (0-1) behind skill_level; see services.skill_assessment_service
+    skill_score = Column(Float, nullable=True)
 
     # Relationships
     practice_sessions = relationship("PracticeSession", back_populates="user", cascade="all, delete-orphan")
@@ -0,0 +1,223 @@
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+import numpy as np
+from cachetools import TTLCache
+from flask import has_app_context
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models.ai_usage import AIUsageRecord
+
+logger = logging.getLogger(__name__)
+
+# USD per one million tokens, as (prompt, completion).
+MODEL_PRICING = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+# Tokens a single Telegram user may spend per UTC day. 0 disables the budget.
+DAILY_TOKEN_BUDGET = int(os.getenv("AI_DAILY_TOKEN_BUDGET", "60000"))
+
+# Records kept in memory while the database is unreachable; the oldest are dropped first.
+MAX_BUFFERED_RECORDS = 10000
+
+
+class AIBudgetExceededError(Exception):
+    """Raised when a user has used up their daily AI token budget."""
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        super().__init__(f"Daily AI token budget exceeded for user {user_id}")
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Returns the estimated USD cost of a call, or 0.0 for unpriced models."""
+    prompt_price, completion_price = MODEL_PRICING.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+class UsageRecorder:
+    """
+    Buffers AI usage records in memory and writes them to `ai_usage_records`
+    in batches from a background thread, so handlers never wait on the insert.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._buffer = deque(maxlen=MAX_BUFFERED_RECORDS)
+        self._daily_tokens = TTLCache(maxsize=10000, ttl=60)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def init_app(self, app) -> None:
+        """Binds the recorder to an app and starts the flush thread if configured."""
+        self.app = app
+        interval = app.config.get("AI_USAGE_FLUSH_INTERVAL", 0)
+        if interval and self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, args=(interval,), name="ai-usage-flusher", daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self.flush()
+
+    def record(self, *, method: str, feature: str, model: str, user_id: int | None,
+               usage, latency_ms: float, outcome: str, price_factor: float = 1.0) -> None:
+        """
+        Queues a usage record. Safe to call from any thread; never touches the database.
+
+        Args:
+            method: The OpenAIService method that made the call.
+            feature: The product feature (e.g., 'explain', 'writing_feedback').
+            model: The model the request was sent to.
+            user_id: The Telegram user ID the call was made for, if any.
+            usage: The `response.usage` object, or None.
+            latency_ms: Wall-clock duration of the upstream call.
+            outcome: 'ok', or the exception class name for failed calls.
+            price_factor: Multiplier on list price, e.g. 0.5 for Batch API calls.
+        """
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        self._buffer.append({
+            "created_at": datetime.utcnow(),
+            "user_id": user_id,
+            "feature": feature,
+            "method": method,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_ms": latency_ms,
+            "cost_usd": estimate_cost(model, prompt_tokens, completion_tokens) * price_factor,
+            "outcome": outcome,
+        })
+        key = (user_id, datetime.utcnow().date())
+        if user_id is not None and key in self._daily_tokens:
+            self._daily_tokens[key] += prompt_tokens + completion_tokens
+
+    def _app_context(self):
+        if has_app_context():
+            return nullcontext()
+        if self.app is None:
+            return None
+        return self.app.app_context()
+
+    def flush(self) -> int:
+        """
+        Writes all buffered records in a single multi-row insert.
+
+        Returns:
+            The number of records written.
+        """
+        rows = []
+        while self._buffer:
+            rows.append(self._buffer.popleft())
+        if not rows:
+            return 0
+
+        ctx = self._app_context()
+        if ctx is None:
+            logger.warning(f"Dropping {len(rows)} AI usage records: no application bound to the recorder.")
+            return 0
+        try:
+            with ctx, Session(db.engine) as session:
+                session.execute(insert(AIUsageRecord), rows)
+                session.commit()
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Failed to write {len(rows)} AI usage records: {e}")
+            self._buffer.extendleft(reversed(rows))
+            return 0
+
+    def tokens_used_today(self, user_id: int) -> int:
+        """Returns the tokens a user has spent since UTC midnight, including unflushed records."""
+        today = datetime.utcnow().date()
+        key = (user_id, today)
+        if key in self._daily_tokens:
+            return self._daily_tokens[key]
+
+        pending = sum(
+            r["prompt_tokens"] + r["completion_tokens"]
+            for r in list(self._buffer) if r["user_id"] == user_id
+        )
+        stored = 0
+        ctx = self._app_context()
+        if ctx is not None:
+            try:
+                with ctx, Session(db.engine) as session:
+                    stored = session.query(
+                        func.coalesce(func.sum(AIUsageRecord.prompt_tokens + AIUsageRecord.completion_tokens), 0)
+                    ).filter(
+                        AIUsageRecord.user_id == user_id,
+                        AIUsageRecord.created_at >= datetime.combine(today, datetime.min.time()),
+                    ).scalar()
+            except Exception as e:
+                # Budgets fail open: an accounting outage must not block students.
+                logger.error(f"Could not read AI usage for user {user_id}: {e}")
+                return pending
+        self._daily_tokens[key] = stored + pending
+        return self._daily_tokens[key]
+
+    def is_over_budget(self, user_id: int | None) -> bool:
+        """Checks whether a user has exhausted their daily token budget."""
+        if user_id is None or DAILY_TOKEN_BUDGET <= 0:
+            return False
+        return self.tokens_used_today(user_id) >= DAILY_TOKEN_BUDGET
+
+
+usage_recorder = UsageRecorder()
+
+
+def usage_report(days: int = 7) -> list[dict]:
+    """
+    Summarizes AI spend and latency by feature.
+
+    Args:
+        days: How many days back to include.
+
+    Returns:
+        One dict per feature with call, error and token counts, USD cost and
+        p50/p95 latency in milliseconds, most expensive feature first.
+    """
+    usage_recorder.flush()
+    since = datetime.utcnow() - timedelta(days=days)
+    rows = db.session.query(
+        AIUsageRecord.feature,
+        AIUsageRecord.latency_ms,
+        AIUsageRecord.prompt_tokens + AIUsageRecord.completion_tokens,
+        AIUsageRecord.cost_usd,
+        AIUsageRecord.outcome,
+    ).filter(AIUsageRecord.created_at >= since).all()
+    if not rows:
+        return []
+
+    features = np.array([r[0] for r in rows])
+    latencies = np.array([r[1] for r in rows], dtype=float)
+    tokens = np.array([r[2] for r in rows], dtype=np.int64)
+    costs = np.array([r[3] for r in rows], dtype=float)
+    errors = np.array([r[4] != "ok" for r in rows])
+
+    report = []
+    for feature in np.unique(features):
+        mask = features == feature
+        p50, p95 = np.percentile(latencies[mask], [50, 95])
+        report.append({
+            "feature": str(feature),
+            "calls": int(mask.sum()),
+            "errors": int(errors[mask].sum()),
+            "tokens": int(tokens[mask].sum()),
+            "cost_usd": float(costs[mask].sum()),
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+        })
+    report.sort(key=lambda item: item["cost_usd"], reverse=True)
+    return report
@@ -1,7 +1,54 @@
+import hmac
 import secrets
+import threading
+from dataclasses import dataclass
+
+from cachetools import TTLCache
+from sqlalchemy import event
+
 from models import Teacher, User
+from models.teacher import hash_api_token
 from extensions import db
 
+# Validated tokens, keyed by digest. Entries are dropped as soon as a token is
+# replaced or revoked or its teacher's approval changes in this process; the
+# TTL bounds how long another worker can keep accepting a revoked token.
+TOKEN_CACHE_TTL = 60
+_token_cache = TTLCache(maxsize=1024, ttl=TOKEN_CACHE_TTL)
+_token_cache_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class TokenOwner:
+    """The approved teacher an API token belongs to."""
+    user_id: int
+    teacher_id: int
+    first_name: str | None
+
+
+def _forget(token_hash) -> None:
+    if isinstance(token_hash, str):
+        with _token_cache_lock:
+            _token_cache.pop(token_hash, None)
+
+
+# active_history loads the old digest when it is expired, so it can be evicted.
+@event.listens_for(Teacher.api_token_hash, 'set', active_history=True)
+def _token_changed(teacher, value, oldvalue, initiator):
+    _forget(oldvalue)
+    _forget(value)
+
+
+@event.listens_for(Teacher.is_approved, 'set')
+def _approval_changed(teacher, value, oldvalue, initiator):
+    _forget(teacher.api_token_hash)
+
+
+@event.listens_for(Teacher, 'after_delete')
+def _teacher_deleted(mapper, connection, teacher):
+    _forget(teacher.api_token_hash)
+
+
 class AuthService:
     """
     Handles authentication-related services, such as API token
@@ -18,36 +65,68 @@ class AuthService:
         return secrets.token_hex(32)
 
     @staticmethod
-    def validate_token(api_token: str) -> User | None:
+    def authenticate(api_token: str) -> TokenOwner | None:
         """
-        Validates an API token and returns the associated user if valid.
+        Resolves an API token to its approved teacher. Tokens seen recently
+        are answered from memory without touching the database.
         Args:
             api_token: The API token to validate.
         Returns:
-            The User object if the token is valid and the teacher is approved, otherwise None.
+            The token's owner if the token is valid and the teacher is approved, otherwise None.
         """
         if not api_token:
             return None
+        token_hash = hash_api_token(api_token)
+
+        with _token_cache_lock:
+            owner = _token_cache.get(token_hash)
+        if owner is not None:
+            return owner
+
+        row = (
+            db.session.query(Teacher.api_token_hash, Teacher.id, Teacher.is_approved, User.id, User.first_name)
+            .join(User, Teacher.user_id == User.id)
+            .filter(Teacher.api_token_hash == token_hash)
+            .first()
+        )
+        if not row or not row[2] or not hmac.compare_digest(row[0], token_hash):
+            return None
 
-        teacher = db.session.query(Teacher).filter_by(api_token=api_token).first()
+        owner = TokenOwner(user_id=row[3], teacher_id=row[1], first_name=row[4])
+        with _token_cache_lock:
+            _token_cache[token_hash] = owner
+        return owner
 
-        if teacher and teacher.is_approved:
-            return teacher.user
-        
-        return None
+    @staticmethod
+    def validate_token(api_token: str) -> User | None:
+        """
+        Validates an API token and returns the associated user if valid.
+        Args:
+            api_token: The API token to validate.
+        Returns:
+            The User object if the token is valid and the teacher is approved, otherwise None.
+        """
+        owner = AuthService.authenticate(api_token)
+        return db.session.get(User, owner.user_id) if owner else None
 
     @staticmethod
     def assign_token_to_teacher(teacher: Teacher) -> str:
         """
-        Generates and assigns a new API token to a teacher, ensuring it's unique.
+        Generates and assigns a new API token to a teacher, replacing any
+        previous one. 256 random bits make a collision with another teacher's
+        token practically impossible; the unique digest column still rejects one.
         Args:
             teacher: The Teacher object to assign the token to.
         Returns:
-            The newly generated token.
-        """
-        while True:
-            token = AuthService.generate_api_token()
-            if not db.session.query(Teacher).filter_by(api_token=token).first():
-                teacher.api_token = token
-                db.session.commit()
-                return token 
\ No newline at end of file
+            The newly generated token. Only its digest is stored.
+        """
+        token = AuthService.generate_api_token()
+        teacher.api_token = token
+        db.session.commit()
+        return token
+
+    @staticmethod
+    def revoke_token(teacher: Teacher) -> None:
+        """Revokes a teacher's API token."""
+        teacher.api_token = None
+        db.session.commit()
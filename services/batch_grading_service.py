@@ -0,0 +1,355 @@
+"""
+Offline grading of written homework through a batch job queue.
+
+Ungraded writing submissions are collected, sent as one batch job, and
+polled until the job finishes; scores and feedback are then written back
+in a single bulk UPDATE. Nothing here runs on the Telegram or web request
+path: run it from cron or as a worker with
+
+    python -m services.batch_grading_service [--loop SECONDS]
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy import case, update
+
+from extensions import db
+from models import GradingBatch, Homework, HomeworkSubmission, TeacherExercise
+from services.ai_usage_service import usage_recorder
+from services.homework_service import NEEDS_REVIEW_FEEDBACK
+from services.openai_service import OpenAIService
+from utils.essay_metrics import analyze_essay
+
+logger = logging.getLogger(__name__)
+
+GRADING_MODEL = "gpt-4o"
+MAX_BATCH_SIZE = 500
+# The Batch API bills at half the interactive price.
+BATCH_PRICE_FACTOR = 0.5
+CUSTOM_ID_PREFIX = "submission-"
+# Grading runs without a usable result before an essay is left for the teacher.
+MAX_GRADING_ATTEMPTS = 3
+
+
+class OpenAIBatchBackend:
+    """Submits jobs to the OpenAI Batch API (24h completion window)."""
+    name = "openai"
+
+    def __init__(self, client=None):
+        self.client = client or OpenAIService().client
+
+    def submit(self, requests: list[dict]) -> str:
+        payload = "\n".join(json.dumps(r) for r in requests).encode("utf-8")
+        input_file = self.client.files.create(file=("grading.jsonl", io.BytesIO(payload)), purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def results(self, batch_id: str) -> list[dict]:
+        batch = self.client.batches.retrieve(batch_id)
+        lines = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                lines.extend(json.loads(line) for line in self.client.files.content(file_id).text.splitlines() if line)
+        return lines
+
+
+class LocalBatchBackend:
+    """
+    File-based stand-in for the Batch API, for tests and for proxies that do
+    not expose /v1/batches. Each job is a directory holding input.jsonl; the
+    first status check runs every request through `responder` and writes
+    output.jsonl in the Batch API's output format.
+
+    Args:
+        directory: Where job directories are created.
+        responder: Maps a request body to the assistant's message content.
+            Defaults to a synchronous chat completion.
+    """
+    name = "local"
+
+    def __init__(self, directory: str, responder=None):
+        self.directory = directory
+        self.responder = responder or self._complete
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def _complete(body: dict) -> str:
+        response = OpenAIService()._chat_completion("batch_grade_local", **body)
+        return response.choices[0].message.content
+
+    def _path(self, batch_id: str, name: str) -> str:
+        return os.path.join(self.directory, batch_id, name)
+
+    def submit(self, requests: list[dict]) -> str:
+        batch_id = f"local-{uuid.uuid4().hex}"
+        os.makedirs(os.path.join(self.directory, batch_id))
+        with open(self._path(batch_id, "input.jsonl"), "w", encoding="utf-8") as f:
+            for request in requests:
+                f.write(json.dumps(request) + "\n")
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        if not os.path.exists(self._path(batch_id, "output.jsonl")):
+            self._process(batch_id)
+        return "completed"
+
+    def _process(self, batch_id: str) -> None:
+        with open(self._path(batch_id, "input.jsonl"), encoding="utf-8") as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+        with open(self._path(batch_id, "output.jsonl"), "w", encoding="utf-8") as out:
+            for request in requests:
+                try:
+                    content = self.responder(request["body"])
+                    line = {
+                        "custom_id": request["custom_id"],
+                        "response": {"status_code": 200, "body": {
+                            "model": request["body"]["model"],
+                            "choices": [{"message": {"role": "assistant", "content": content}}],
+                            "usage": {"prompt_tokens": 0, "completion_tokens": 0},
+                        }},
+                        "error": None,
+                    }
+                except Exception as e:
+                    line = {"custom_id": request["custom_id"], "response": None,
+                            "error": {"code": type(e).__name__, "message": str(e)}}
+                out.write(json.dumps(line) + "\n")
+
+    def results(self, batch_id: str) -> list[dict]:
+        with open(self._path(batch_id, "output.jsonl"), encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+def get_backend():
+    """Picks the backend from GRADING_BATCH_BACKEND ('openai' or 'local')."""
+    if os.getenv("GRADING_BATCH_BACKEND", "openai") == "local":
+        return LocalBatchBackend(os.getenv("GRADING_BATCH_DIR", "grading_batches"))
+    return OpenAIBatchBackend()
+
+
+def essay_text(content) -> str | None:
+    """Extracts the essay from a submission's content JSON."""
+    if isinstance(content, str):
+        return content.strip() or None
+    if isinstance(content, dict):
+        for key in ("essay", "text", "answer"):
+            value = content.get(key)
+            if isinstance(value, str) and value.strip():
+                return value.strip()
+        # Bot submissions keep one answer per question (services.homework_service).
+        answers = [a.strip() for a in content.get("answers") or [] if isinstance(a, str) and a.strip()]
+        if answers:
+            return "\n\n".join(answers)
+    return None
+
+
+def band_to_score(band) -> int:
+    """Converts an IELTS band (0-9) to the 0-100 scale used by HomeworkSubmission.score."""
+    return max(0, min(100, round(float(band) / 9 * 100)))
+
+
+def _grading_request(submission_id: int, essay: str, exercise: TeacherExercise) -> dict:
+    content = exercise.content if isinstance(exercise.content, dict) else {}
+    question = content.get("question") or content.get("prompt") or exercise.description or exercise.title
+    task_type = content.get("task_type", 2)
+    return {
+        "custom_id": f"{CUSTOM_ID_PREFIX}{submission_id}",
+        "method": "POST",
+        "url": "/v1/chat/completions",
+        "body": {
+            "model": GRADING_MODEL,
+            "messages": [{"role": "system", "content": OpenAIService.writing_feedback_prompt(
+                essay, task_type, question, analyze_essay(essay, task_type)
+            )}],
+            "response_format": {"type": "json_object"},
+            "temperature": 0.7,
+        },
+    }
+
+
+def submit_ungraded(backend, limit: int = MAX_BATCH_SIZE) -> GradingBatch | None:
+    """
+    Sends up to `limit` ungraded writing submissions to the backend as one job.
+    Submissions without an essay are marked for teacher review instead, so
+    they do not take up the batch again on the next run.
+
+    Returns:
+        The new GradingBatch, or None if there was nothing to grade.
+    """
+    rows = db.session.query(HomeworkSubmission.id, HomeworkSubmission.content, TeacherExercise).join(
+        Homework, HomeworkSubmission.homework_id == Homework.id
+    ).join(
+        TeacherExercise, Homework.exercise_id == TeacherExercise.id
+    ).filter(
+        HomeworkSubmission.score.is_(None),
+        HomeworkSubmission.grading_batch_id.is_(None),
+        HomeworkSubmission.feedback.is_(None),
+        TeacherExercise.exercise_type == "writing",
+    ).order_by(HomeworkSubmission.id).limit(limit).all()
+
+    requests, empty = [], []
+    for submission_id, content, exercise in rows:
+        essay = essay_text(content)
+        if essay:
+            requests.append(_grading_request(submission_id, essay, exercise))
+        else:
+            empty.append(submission_id)
+    if empty:
+        db.session.execute(
+            update(HomeworkSubmission).where(HomeworkSubmission.id.in_(empty)).values(feedback=NEEDS_REVIEW_FEEDBACK)
+        )
+        db.session.commit()
+    if not requests:
+        return None
+
+    provider_batch_id = backend.submit(requests)
+    batch = GradingBatch(
+        backend=backend.name,
+        provider_batch_id=provider_batch_id,
+        status="submitted",
+        submission_count=len(requests),
+        graded_count=0,
+    )
+    db.session.add(batch)
+    db.session.flush()
+    submission_ids = [int(r["custom_id"][len(CUSTOM_ID_PREFIX):]) for r in requests]
+    db.session.execute(
+        update(HomeworkSubmission)
+        .where(HomeworkSubmission.id.in_(submission_ids))
+        .values(grading_batch_id=batch.id)
+    )
+    db.session.commit()
+    logger.info(f"Submitted {len(requests)} essays for grading as batch {provider_batch_id}.")
+    return batch
+
+
+def _parse_result(line: dict, record_usage: bool = True) -> dict | None:
+    """
+    Turns one output line into an UPDATE row, or None if the request failed.
+    Usage is recorded at the batch price unless `record_usage` is False.
+    """
+    response = line.get("response") or {}
+    if line.get("error") or response.get("status_code") != 200:
+        return None
+    body = response["body"]
+    try:
+        feedback = json.loads(body["choices"][0]["message"]["content"])
+        score = band_to_score(feedback["estimated_band"])
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        logger.warning(f"Unusable grading result for {line.get('custom_id')}: {e}")
+        return None
+    if record_usage:
+        usage_recorder.record(
+            method="batch_grade",
+            feature="homework_grading",
+            model=body.get("model", GRADING_MODEL),
+            user_id=None,
+            usage=SimpleNamespace(**(body.get("usage") or {})),
+            latency_ms=0.0,
+            outcome="ok",
+            price_factor=BATCH_PRICE_FACTOR,
+        )
+    return {
+        "id": int(line["custom_id"][len(CUSTOM_ID_PREFIX):]),
+        "score": score,
+        "feedback": json.dumps(feedback),
+    }
+
+
+def collect_results(backend) -> int:
+    """
+    Polls every outstanding batch and writes back the finished ones.
+    Submissions whose request failed or returned an unusable result are
+    released so the next run retries them, up to MAX_GRADING_ATTEMPTS runs;
+    after that they are marked for teacher review.
+
+    Returns:
+        The number of submissions graded.
+    """
+    graded = 0
+    pending = db.session.query(GradingBatch).filter_by(status="submitted", backend=backend.name).all()
+    for batch in pending:
+        status = backend.status(batch.provider_batch_id)
+        if status in ("failed", "expired", "cancelled"):
+            batch.status = "failed"
+            batch.completed_at = datetime.utcnow()
+            db.session.execute(
+                update(HomeworkSubmission)
+                .where(HomeworkSubmission.grading_batch_id == batch.id)
+                .values(grading_batch_id=None)
+            )
+            db.session.commit()
+            logger.warning(f"Grading batch {batch.provider_batch_id} ended as '{status}'; its essays will be resubmitted.")
+            continue
+        if status != "completed":
+            continue
+
+        # The local backend's completions were already recorded by OpenAIService, at the full price.
+        record_usage = backend.name != "local"
+        rows = [row for row in (_parse_result(line, record_usage) for line in backend.results(batch.provider_batch_id))
+                if row]
+        if rows:
+            # Bulk UPDATE by primary key: one executemany instead of loading each submission.
+            db.session.execute(update(HomeworkSubmission), rows)
+        graded_ids = [row["id"] for row in rows]
+        attempts = HomeworkSubmission.grading_attempts + 1
+        db.session.execute(
+            update(HomeworkSubmission)
+            .where(HomeworkSubmission.grading_batch_id == batch.id, HomeworkSubmission.id.notin_(graded_ids))
+            .values(
+                grading_batch_id=None,
+                grading_attempts=attempts,
+                feedback=case((attempts >= MAX_GRADING_ATTEMPTS, NEEDS_REVIEW_FEEDBACK),
+                              else_=HomeworkSubmission.feedback),
+            )
+        )
+        batch.status = "completed"
+        batch.graded_count = len(rows)
+        batch.completed_at = datetime.utcnow()
+        db.session.commit()
+        graded += len(rows)
+        logger.info(f"Grading batch {batch.provider_batch_id} completed: {len(rows)}/{batch.submission_count} graded.")
+    return graded
+
+
+def run_once(backend) -> int:
+    """Collects finished batches, then submits any new ungraded essays."""
+    graded = collect_results(backend)
+    submit_ungraded(backend)
+    return graded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade written homework through the batch job queue.")
+    parser.add_argument("--loop", type=float, default=0, help="Repeat every N seconds instead of running once.")
+    args = parser.parse_args(argv)
+
+    from app import create_app
+    app = create_app(os.getenv("FLASK_CONFIG") or "default")
+    backend = get_backend()
+    with app.app_context():
+        while True:
+            graded = run_once(backend)
+            logger.info(f"Graded {graded} submissions this run.")
+            if not args.loop:
+                break
+            time.sleep(args.loop)
+        usage_recorder.flush()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,204 @@
+"""
+Exact- and near-duplicate detection for submitted essays.
+
+Every graded essay gets a fingerprint: a SHA-256 of its normalized text
+(with a hash of the prompt it answers) for exact matches, and a MinHash
+signature over its word 3-gram shingles for near matches. The signature is
+split into LSH bands whose keys are stored in `essay_fingerprint_bands`,
+so finding near-duplicate candidates is a single primary-key IN lookup
+over BANDS keys, whatever the number of essays stored. Candidates are then
+verified against their signatures in one vectorized comparison.
+
+An exact duplicate of an already graded essay for the same prompt reuses
+that essay's feedback instead of a model call; an essay that closely
+matches another student's is flagged for their teachers.
+
+    python -m services.essay_dedup_service   # signature and lookup timings
+"""
+import hashlib
+import re
+import sys
+import time
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import func
+
+from extensions import db
+from models import EssayFingerprint, EssayFingerprintBand, PracticeAttempt
+
+# 16 bands of 8 rows: essays with a Jaccard similarity of 0.8 share a band
+# 95% of the time, essays at 0.5 only 6% of the time.
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+# Estimated Jaccard similarity above which two essays count as near-duplicates.
+NEAR_DUPLICATE_SIMILARITY = 0.8
+# Most recent candidates verified per lookup, bounding the work for very common texts.
+MAX_CANDIDATES = 50
+
+# Universal hashing (a * x + b) mod p over 32-bit shingle hashes; a, b < 2^32
+# keep the product inside uint64. The seed is fixed so signatures stay
+# comparable across processes and deployments.
+_PRIME = np.uint64(4294967311)  # smallest prime above 2^32
+_rng = np.random.default_rng(20261018)
+_A = _rng.integers(1, 2**32, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 2**32, size=NUM_PERM, dtype=np.uint64)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+
+_WORD = re.compile(r"[a-z0-9]+(?:['’-][a-z0-9]+)*")
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    prompt_hash: str
+    content_hash: str
+    signature: np.ndarray  # uint32[NUM_PERM]
+
+    def band_keys(self) -> list[int]:
+        return band_keys(self.signature)
+
+
+def _words(text: str) -> list[str]:
+    return _WORD.findall((text or "").lower())
+
+
+def shingles(text: str) -> np.ndarray:
+    """The distinct 32-bit hashes of the essay's word 3-grams (or of the whole text if shorter)."""
+    tokens = _words(text)
+    n = min(SHINGLE_SIZE, len(tokens)) or 1
+    grams = (" ".join(tokens[i:i + n]) for i in range(max(len(tokens) - n + 1, 1)))
+    return np.unique(np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64))
+
+
+def minhash(shingle_hashes: np.ndarray) -> np.ndarray:
+    """MinHash signature: the minimum of each of the NUM_PERM hash functions over the shingles."""
+    hashed = (_A[:, None] * shingle_hashes[None, :] + _B[:, None]) % _PRIME
+    return (hashed.min(axis=1) & _MAX_HASH).astype("<u4")
+
+
+def band_keys(signature: np.ndarray) -> list[int]:
+    """One signed 63-bit key per band, so the keys fit a BIGINT column."""
+    raw = signature.astype("<u4").tobytes()
+    keys = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(raw[band * ROWS * 4:(band + 1) * ROWS * 4], digest_size=8, salt=bytes([band]))
+        keys.append(int.from_bytes(digest.digest(), "little") & 0x7FFF_FFFF_FFFF_FFFF)
+    return keys
+
+
+def similarity(signature: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """Estimated Jaccard similarity of `signature` to each row of `others`."""
+    return (others == signature).mean(axis=1)
+
+
+def fingerprint_essay(essay: str, prompt: str | None) -> Fingerprint:
+    """Computes the fingerprint of an essay written for `prompt`."""
+    normalized = " ".join(_words(essay))
+    return Fingerprint(
+        prompt_hash=hashlib.sha256(" ".join(_words(prompt)).encode("utf-8")).hexdigest()[:32],
+        content_hash=hashlib.sha256(normalized.encode("utf-8")).hexdigest(),
+        signature=minhash(shingles(essay)),
+    )
+
+
+def find_cached_feedback(fingerprint: Fingerprint) -> dict | None:
+    """
+    Returns the feedback given to the latest graded essay with the same
+    prompt and text, or None if there is none.
+    """
+    attempt = (
+        db.session.query(PracticeAttempt)
+        .join(EssayFingerprint, EssayFingerprint.practice_session_id == PracticeAttempt.session_id)
+        .filter(
+            EssayFingerprint.prompt_hash == fingerprint.prompt_hash,
+            EssayFingerprint.content_hash == fingerprint.content_hash,
+            PracticeAttempt.feedback.isnot(None),
+        )
+        .order_by(EssayFingerprint.id.desc())
+        .first()
+    )
+    feedback = attempt.feedback if attempt else None
+    return feedback if isinstance(feedback, dict) else None
+
+
+def find_near_duplicates(fingerprint: Fingerprint, exclude_user_id: int = None) -> list[tuple[float, EssayFingerprint]]:
+    """
+    Finds stored essays whose estimated similarity to `fingerprint` is at
+    least NEAR_DUPLICATE_SIMILARITY.
+
+    Args:
+        fingerprint: The essay to look up.
+        exclude_user_id: Skip this user's own essays (resubmissions are not copying).
+
+    Returns:
+        (similarity, fingerprint) pairs, most similar first.
+    """
+    query = (
+        db.session.query(EssayFingerprint)
+        .join(EssayFingerprintBand)
+        .filter(EssayFingerprintBand.band_key.in_(fingerprint.band_keys()))
+    )
+    if exclude_user_id is not None:
+        query = query.filter(EssayFingerprint.user_id != exclude_user_id)
+    candidates = query.distinct().order_by(EssayFingerprint.id.desc()).limit(MAX_CANDIDATES).all()
+    if not candidates:
+        return []
+    signatures = np.frombuffer(b"".join(c.signature for c in candidates), dtype="<u4").reshape(len(candidates), NUM_PERM)
+    scores = similarity(fingerprint.signature, signatures)
+    matches = [(float(s), c) for s, c in zip(scores, candidates) if s >= NEAR_DUPLICATE_SIMILARITY]
+    return sorted(matches, key=lambda m: m[0], reverse=True)
+
+
+def record_essay(fingerprint: Fingerprint, user_id: int, practice_session_id: int = None) -> EssayFingerprint:
+    """
+    Stores an essay's fingerprint and band keys in the current transaction,
+    linking it to the closest near-duplicate by another student if any.
+    The caller commits.
+    """
+    matches = find_near_duplicates(fingerprint, exclude_user_id=user_id)
+    record = EssayFingerprint(
+        user_id=user_id,
+        practice_session_id=practice_session_id,
+        prompt_hash=fingerprint.prompt_hash,
+        content_hash=fingerprint.content_hash,
+        signature=fingerprint.signature.astype("<u4").tobytes(),
+        near_duplicate_of=matches[0][1] if matches else None,
+        similarity=matches[0][0] if matches else None,
+    )
+    # Identical bands within one signature collapse to one key.
+    record.bands = [EssayFingerprintBand(band_key=key) for key in dict.fromkeys(fingerprint.band_keys())]
+    db.session.add(record)
+    return record
+
+
+def flagged_essay_count(user_id: int) -> int:
+    """How many of a user's essays closely match an earlier essay by another student."""
+    return (
+        db.session.query(func.count(EssayFingerprint.id))
+        .filter(EssayFingerprint.user_id == user_id, EssayFingerprint.near_duplicate_of_id.isnot(None))
+        .scalar()
+    )
+
+
+if __name__ == "__main__":
+    essay = " ".join(sys.argv[1:]) or (
+        "Some people believe that university education should be free for every student, while others "
+        "argue that students should pay for their own studies because they benefit from them later. "
+    ) * 6
+    runs = 1000
+    start = time.perf_counter()
+    for _ in range(runs):
+        fingerprint = fingerprint_essay(essay, "Should university education be free?")
+    print(f"Fingerprint of {len(_words(essay))} words: {(time.perf_counter() - start) / runs * 1e6:.0f} us")
+    start = time.perf_counter()
+    for _ in range(runs):
+        fingerprint.band_keys()
+    print(f"{BANDS} band keys: {(time.perf_counter() - start) / runs * 1e6:.0f} us")
+    others = np.random.default_rng(0).integers(0, 2**32, size=(MAX_CANDIDATES, NUM_PERM), dtype=np.uint32)
+    start = time.perf_counter()
+    for _ in range(runs):
+        similarity(fingerprint.signature, others)
+    print(f"Verifying {MAX_CANDIDATES} candidates: {(time.perf_counter() - start) / runs * 1e6:.0f} us")
@@ -0,0 +1,125 @@
+"""
+Streaming CSV and NDJSON exports of students' practice sessions.
+
+The query runs once with yield_per, which uses a server-side cursor on
+Postgres, and rows are rendered partition by partition into a generator
+response. Memory stays flat whatever the number of rows: at most one
+partition of YIELD_PER rows and its rendered text are held at a time.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from flask import Response, stream_with_context
+from sqlalchemy import select
+
+from extensions import db
+from models import PracticeSession, User
+
+YIELD_PER = 2000
+
+EXPORT_COLUMNS = {
+    'student_id': User.id,
+    'telegram_id': User.user_id,
+    'first_name': User.first_name,
+    'last_name': User.last_name,
+    'username': User.username,
+    'session_id': PracticeSession.id,
+    'section': PracticeSession.section,
+    'score': PracticeSession.score,
+    'total_questions': PracticeSession.total_questions,
+    'correct_answers': PracticeSession.correct_answers,
+    'started_at': PracticeSession.started_at,
+    'completed_at': PracticeSession.completed_at,
+}
+DEFAULT_COLUMNS = ['student_id', 'first_name', 'last_name', 'section', 'score', 'completed_at']
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def parse_export_args(args) -> tuple[str, list[str], datetime | None, datetime | None]:
+    """
+    Validates an export request's query string.
+
+    Args:
+        args: The request args: format (csv or ndjson), columns
+            (comma-separated names from EXPORT_COLUMNS), and start/end
+            (ISO dates or datetimes; end is exclusive).
+
+    Returns:
+        (format, columns, start, end)
+
+    Raises:
+        ValueError: If any argument is invalid.
+    """
+    fmt = args.get('format', 'csv')
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'; use one of {', '.join(FORMATS)}")
+    columns = [c.strip() for c in args.get('columns', '').split(',') if c.strip()] or DEFAULT_COLUMNS
+    unknown = [c for c in columns if c not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    start, end = (datetime.fromisoformat(args[k]) if args.get(k) else None for k in ('start', 'end'))
+    return fmt, columns, start, end
+
+
+def progress_query(student_ids, columns, start=None, end=None):
+    """The sessions of the students selected by `student_ids` (a subquery), in student and time order."""
+    stmt = (
+        select(*(EXPORT_COLUMNS[c] for c in columns))
+        .select_from(PracticeSession)
+        .join(User, PracticeSession.user_id == User.id)
+        .where(PracticeSession.user_id.in_(student_ids))
+        .order_by(PracticeSession.user_id, PracticeSession.completed_at)
+    )
+    if start is not None:
+        stmt = stmt.where(PracticeSession.completed_at >= start)
+    if end is not None:
+        stmt = stmt.where(PracticeSession.completed_at < end)
+    return stmt
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def render_csv(columns, result):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for partition in result.partitions():
+        writer.writerows([_value(v) for v in row] for row in partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def render_ndjson(columns, result):
+    for partition in result.partitions():
+        yield "".join(json.dumps(dict(zip(columns, map(_value, row)))) + "\n" for row in partition)
+
+
+def export_response(student_ids, args, filename: str) -> Response:
+    """
+    Streams the export described by `args` for the students selected by
+    `student_ids`. The query is executed before returning, so it runs on
+    the bind (primary or replica) chosen for the calling route.
+
+    Raises:
+        ValueError: If `args` is invalid.
+    """
+    fmt, columns, start, end = parse_export_args(args)
+    stmt = progress_query(student_ids, columns, start, end).execution_options(yield_per=YIELD_PER)
+    result = db.session.execute(stmt)
+    render = render_csv if fmt == 'csv' else render_ndjson
+    return Response(
+        stream_with_context(render(columns, result)),
+        mimetype=FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}.{fmt}"'},
+    )
@@ -0,0 +1,140 @@
+"""
+Student homework submissions.
+
+A submission is stored as soon as the student finishes answering, and the
+student is acknowledged straight away. Only multiple-choice answers are
+scored on that path: checking them is a loop over the exercise's compiled
+answer key (utils.answer_key). Anything else waits for a background worker, so scoring never holds
+up the Telegram webhook:
+
+* writing exercises are graded by services.batch_grading_service;
+* free-text answers to other exercises are checked against each
+  question's accepted answers by `score_pending`, which the scheduler in
+  services.reminder_service runs every SCORING_TICK seconds.
+
+Submission content is `{"answers": [...]}` with one entry per question:
+the chosen option's index, the student's text, or None if skipped.
+"""
+import logging
+import os
+
+from sqlalchemy import and_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import Group, GroupMembership, Homework, HomeworkSubmission, TeacherExercise
+from utils.answer_key import AnswerKeyError, get_answer_key
+
+logger = logging.getLogger(__name__)
+
+SCORING_TICK = int(os.getenv("HOMEWORK_SCORING_TICK_SECONDS", "30"))
+SCORING_BATCH_SIZE = 500
+# Set on submissions the worker has nothing to check in, so it does not pick them up again.
+NEEDS_REVIEW_FEEDBACK = "Awaiting teacher review."
+
+
+def pending_homework(student_id: int):
+    """Homework in the student's groups they have not submitted yet, soonest due first."""
+    return db.session.execute(
+        select(Homework, TeacherExercise.title, Group.name)
+        .join(TeacherExercise, Homework.exercise_id == TeacherExercise.id)
+        .join(Group, Homework.group_id == Group.id)
+        .join(GroupMembership, and_(
+            GroupMembership.group_id == Homework.group_id, GroupMembership.student_id == student_id,
+        ))
+        .outerjoin(HomeworkSubmission, and_(
+            HomeworkSubmission.homework_id == Homework.id, HomeworkSubmission.student_id == student_id,
+        ))
+        .where(HomeworkSubmission.id.is_(None))
+        .order_by(Homework.due_date.is_(None), Homework.due_date, Homework.id)
+    ).all()
+
+
+def get_assignment(homework_id: int, student_id: int) -> Homework | None:
+    """The homework if the student is in its group and has not submitted it yet."""
+    return db.session.execute(
+        select(Homework)
+        .join(GroupMembership, and_(
+            GroupMembership.group_id == Homework.group_id, GroupMembership.student_id == student_id,
+        ))
+        .outerjoin(HomeworkSubmission, and_(
+            HomeworkSubmission.homework_id == Homework.id, HomeworkSubmission.student_id == student_id,
+        ))
+        .where(Homework.id == homework_id, HomeworkSubmission.id.is_(None))
+    ).scalar_one_or_none()
+
+
+def submit(homework: Homework, student_id: int, answers: list) -> HomeworkSubmission | None:
+    """
+    Stores a submission and commits. Multiple-choice-only exercises are
+    scored here; the rest keep a NULL score for the background graders.
+
+    Returns:
+        The submission, or None if the student had already submitted this
+        homework (e.g. a second finish that raced the first).
+    """
+    exercise = homework.exercise
+    score = None
+    if exercise.exercise_type != "writing":
+        try:
+            key = get_answer_key(exercise)
+        except AnswerKeyError:
+            key = None
+        if key is not None and key.all_choice:
+            score = key.grade(answers)
+    submission = HomeworkSubmission(
+        homework_id=homework.id, student_id=student_id, content={"answers": answers}, score=score,
+    )
+    db.session.add(submission)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return None
+    return submission
+
+
+def score_pending(limit: int = SCORING_BATCH_SIZE) -> int:
+    """
+    Scores up to `limit` unscored submissions to non-writing exercises
+    against their compiled answer keys and writes the scores back in one
+    bulk UPDATE.
+
+    Returns:
+        The number of submissions scored.
+    """
+    rows = db.session.query(HomeworkSubmission.id, HomeworkSubmission.content, TeacherExercise).join(
+        Homework, HomeworkSubmission.homework_id == Homework.id
+    ).join(
+        TeacherExercise, Homework.exercise_id == TeacherExercise.id
+    ).filter(
+        HomeworkSubmission.score.is_(None),
+        HomeworkSubmission.grading_batch_id.is_(None),
+        HomeworkSubmission.feedback.is_(None),
+        TeacherExercise.exercise_type != "writing",
+    ).order_by(HomeworkSubmission.id).limit(limit).all()
+
+    scored, review = [], []
+    for submission_id, content, exercise in rows:
+        try:
+            key = get_answer_key(exercise)
+        except AnswerKeyError:
+            review.append(submission_id)
+            continue
+        score = key.grade(content.get("answers") if isinstance(content, dict) else None)
+        if score is None:
+            review.append(submission_id)
+        else:
+            scored.append({"id": submission_id, "score": score})
+
+    if scored:
+        db.session.execute(update(HomeworkSubmission), scored)
+    if review:
+        db.session.execute(
+            update(HomeworkSubmission).where(HomeworkSubmission.id.in_(review))
+            .values(feedback=NEEDS_REVIEW_FEEDBACK)
+        )
+    db.session.commit()
+    if rows:
+        logger.info(f"Scored {len(scored)} homework submissions; {len(review)} need teacher review.")
+    return len(scored)
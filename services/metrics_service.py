@@ -0,0 +1,189 @@
+import os
+import time
+import logging
+from contextlib import contextmanager
+
+import psutil
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+logger = logging.getLogger(__name__)
+
+# Handlers range from a few milliseconds (DB-only commands) to tens of
+# seconds (GPT-4o feedback), so the buckets cover both ends.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+
+# How often a worker refreshes its own memory gauge from the request path.
+MEMORY_SAMPLE_INTERVAL = 15.0
+
+HANDLER_LATENCY = Histogram(
+    'ielts_bot_handler_latency_seconds',
+    'Latency of Telegram command and conversation handlers.',
+    ['handler', 'outcome'],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUEST_LATENCY = Histogram(
+    'ielts_http_request_latency_seconds',
+    'Latency of Flask routes.',
+    ['route', 'method', 'status'],
+    buckets=LATENCY_BUCKETS,
+)
+OPENAI_LATENCY = Histogram(
+    'ielts_openai_request_latency_seconds',
+    'Latency of upstream OpenAI calls, by OpenAIService method.',
+    ['method'],
+    buckets=LATENCY_BUCKETS,
+)
+OPENAI_TOKENS = Counter(
+    'ielts_openai_tokens',
+    'Tokens consumed by OpenAI calls.',
+    ['method', 'kind'],
+)
+OPENAI_ERRORS = Counter(
+    'ielts_openai_errors',
+    'Failed OpenAI calls, by method and exception type.',
+    ['method', 'error_type'],
+)
+OPENAI_RETRIES = Counter(
+    'ielts_openai_retries',
+    'Upstream OpenAI attempts retried after a 429, 5xx or timeout.',
+    ['method'],
+)
+WEBHOOK_QUEUE_DEPTH = Gauge(
+    'ielts_webhook_updates_in_flight',
+    'Telegram updates accepted by the webhook and not yet processed.',
+    multiprocess_mode='livesum',
+)
+PROCESS_MEMORY = Gauge(
+    'ielts_process_resident_memory_bytes',
+    'Resident memory of each worker process.',
+    multiprocess_mode='liveall',
+)
+
+# Label children are cached in plain dicts so the hot path is a dict lookup
+# instead of prometheus_client's locked labels() call.
+_handler_children = {}
+_http_children = {}
+_openai_children = {}
+_retry_children = {}
+_last_memory_sample = 0.0
+_process = psutil.Process()
+
+
+def _child(cache: dict, metric, *labels):
+    child = cache.get(labels)
+    if child is None:
+        child = metric.labels(*labels)
+        cache[labels] = child
+    return child
+
+
+def observe_handler(handler_name: str, duration: float, outcome: str = 'ok') -> None:
+    """Records the latency of a single Telegram handler invocation."""
+    _child(_handler_children, HANDLER_LATENCY, handler_name, outcome).observe(duration)
+
+
+def record_openai_tokens(method: str, usage) -> None:
+    """
+    Counts the tokens reported in an OpenAI response's `usage` block.
+
+    Args:
+        method: The OpenAIService method that made the call.
+        usage: The `response.usage` object, or None for endpoints that do not report usage.
+    """
+    if usage is None:
+        return
+    prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+    completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+    if prompt_tokens:
+        _child(_openai_children, OPENAI_TOKENS, method, 'prompt').inc(prompt_tokens)
+    if completion_tokens:
+        _child(_openai_children, OPENAI_TOKENS, method, 'completion').inc(completion_tokens)
+
+
+def record_openai_retry(method: str) -> None:
+    """Counts one retried upstream attempt."""
+    _child(_retry_children, OPENAI_RETRIES, method).inc()
+
+
+@contextmanager
+def observe_openai(method: str):
+    """Times an upstream OpenAI call and counts it as an error if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        _child(_openai_children, OPENAI_ERRORS, method, type(e).__name__).inc()
+        raise
+    finally:
+        _child(_openai_children, OPENAI_LATENCY, method).observe(time.perf_counter() - start)
+
+
+@contextmanager
+def track_webhook_update():
+    """Counts a Telegram update as queued for the duration of the block."""
+    WEBHOOK_QUEUE_DEPTH.inc()
+    try:
+        yield
+    finally:
+        WEBHOOK_QUEUE_DEPTH.dec()
+
+
+def sample_process_memory(force: bool = False) -> None:
+    """Refreshes this worker's memory gauge, at most once per sample interval."""
+    global _last_memory_sample
+    now = time.monotonic()
+    if not force and now - _last_memory_sample < MEMORY_SAMPLE_INTERVAL:
+        return
+    _last_memory_sample = now
+    PROCESS_MEMORY.set(_process.memory_info().rss)
+
+
+def _exposition_registry():
+    """
+    Returns the registry to expose. Under gunicorn, PROMETHEUS_MULTIPROC_DIR
+    points every worker at a shared directory and the collector merges them.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render_metrics() -> bytes:
+    """Renders all metrics in the Prometheus text exposition format."""
+    sample_process_memory(force=True)
+    return generate_latest(_exposition_registry())
+
+
+def init_app(app) -> None:
+    """Registers per-route latency hooks and the /metrics endpoint on a Flask app."""
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            _child(
+                _http_children, HTTP_REQUEST_LATENCY, route, request.method, str(response.status_code)
+            ).observe(time.perf_counter() - start)
+        sample_process_memory()
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(render_metrics(), mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,258 @@
+"""
+Student notifications through a transactional outbox.
+
+Assigning homework writes one `notification_outbox` row per group member,
+in the same transaction as the Homework itself: one query finds the
+members and one INSERT ... ON CONFLICT DO NOTHING queues them, so the
+teacher's request returns immediately whatever the group size, and a
+notification is queued exactly when its homework exists.
+
+A separate worker drains the outbox within Telegram's broadcast limit
+(about 30 messages per second per bot), retrying transient failures with
+backoff. Run it next to the web process with
+
+    python -m services.notification_service [--loop SECONDS]
+
+Delivery is at-least-once: a worker that dies after sending but before
+recording the result sends that message again once its lease expires.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError
+
+from extensions import db
+from models import GroupMembership, NotificationOutbox, User
+from utils.db_routing import mark_written
+from utils.translation_system import TranslationSystem
+
+logger = logging.getLogger(__name__)
+
+trans = TranslationSystem()
+
+# Stay below Telegram's ~30 messages per second so other bot traffic still fits.
+SEND_RATE_PER_SECOND = float(os.getenv("NOTIFY_SEND_RATE", "25"))
+CLAIM_BATCH_SIZE = 200
+# How long a claimed row is hidden from other workers; must exceed one batch's delivery time.
+CLAIM_LEASE = timedelta(seconds=120)
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 5.0
+BACKOFF_CAP = 600.0
+
+
+class AsyncRateLimiter:
+    """
+    Spaces acquisitions at least period/rate seconds apart across all tasks
+    on one event loop, like aiolimiter's AsyncLimiter without the burst.
+    """
+
+    def __init__(self, rate: float, period: float = 1.0):
+        self.interval = period / rate
+        self._next_slot = 0.0
+
+    def defer(self, seconds: float) -> None:
+        """Holds every acquisition back for `seconds`, e.g. after a flood-control error."""
+        loop = asyncio.get_running_loop()
+        self._next_slot = max(self._next_slot, loop.time() + seconds)
+
+    async def acquire(self) -> None:
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+def enqueue(connection, rows: list[dict]) -> int:
+    """
+    Queues outbox rows on `connection`, skipping those whose idempotency
+    key is already queued.
+
+    Returns:
+        The number of rows queued.
+    """
+    if not rows:
+        return 0
+    table = NotificationOutbox.__table__
+    if connection.dialect.name in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if connection.dialect.name == 'postgresql' else sqlite.insert
+        stmt = insert(table).values(rows).on_conflict_do_nothing(index_elements=['idempotency_key'])
+        return connection.execute(stmt).rowcount
+    existing = set(connection.execute(
+        select(table.c.idempotency_key).where(table.c.idempotency_key.in_([r['idempotency_key'] for r in rows]))
+    ).scalars())
+    new_rows = [row for row in rows if row['idempotency_key'] not in existing]
+    if new_rows:
+        connection.execute(table.insert(), new_rows)
+    return len(new_rows)
+
+
+def enqueue_homework_notifications(homework) -> int:
+    """
+    Queues a 'new homework' message to every member of the homework's group.
+    Call it after flushing the Homework and before committing, so both are
+    written in one transaction.
+
+    Returns:
+        The number of notifications queued.
+    """
+    members = db.session.execute(
+        select(User.id, User.user_id, User.preferred_language)
+        .join(GroupMembership, GroupMembership.student_id == User.id)
+        .where(GroupMembership.group_id == homework.group_id)
+    ).all()
+    if not members:
+        return 0
+
+    params = {
+        'exercise_title': homework.exercise.title,
+        'group_name': homework.group.name,
+        'due_date': homework.due_date.strftime('%Y-%m-%d %H:%M') if homework.due_date else None,
+    }
+    key = 'assigned_with_due_date' if homework.due_date else 'assigned'
+    texts = {}  # One rendering per language, not per student
+    now = datetime.utcnow()
+    rows = []
+    for user_id, chat_id, language in members:
+        if language not in texts:
+            texts[language] = trans.get_message('homework', key, language or 'en', **params)
+        rows.append({
+            'idempotency_key': f"homework:{homework.id}:user:{user_id}",
+            'chat_id': chat_id,
+            'kind': 'homework_assigned',
+            'text': texts[language],
+            'status': 'pending',
+            'attempts': 0,
+            'next_attempt_at': now,
+            'created_at': now,
+        })
+    queued = enqueue(db.session.connection(), rows)
+    mark_written(db.session)
+    return queued
+
+
+def claim_due(limit: int = CLAIM_BATCH_SIZE) -> list[SimpleNamespace]:
+    """
+    Takes up to `limit` due rows and leases them to this worker for
+    CLAIM_LEASE. Concurrent workers skip each other's locked rows on Postgres.
+    """
+    now = datetime.utcnow()
+    rows = (
+        db.session.query(NotificationOutbox)
+        .filter(NotificationOutbox.status == 'pending', NotificationOutbox.next_attempt_at <= now)
+        .order_by(NotificationOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    claimed = [SimpleNamespace(id=r.id, chat_id=r.chat_id, text=r.text, attempts=r.attempts) for r in rows]
+    for row in rows:
+        row.next_attempt_at = now + CLAIM_LEASE
+    db.session.commit()
+    return claimed
+
+
+def retry_delay(attempts: int) -> float:
+    """Full-jitter exponential backoff after `attempts` failed sends."""
+    return random.uniform(BACKOFF_BASE, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempts))
+
+
+async def _send(bot, item, limiter: AsyncRateLimiter) -> dict:
+    async with limiter:
+        try:
+            await bot.send_message(chat_id=item.chat_id, text=item.text)
+            return {'item': item, 'error': None}
+        except RetryAfter as e:
+            # Flood control applies to the whole bot, so every pending send waits.
+            delay = e.retry_after.total_seconds() if isinstance(e.retry_after, timedelta) else float(e.retry_after)
+            limiter.defer(delay)
+            return {'item': item, 'error': e, 'delay': delay}
+        except (Forbidden, BadRequest) as e:
+            # Blocked the bot, deleted account, bad chat id: retrying cannot help.
+            return {'item': item, 'error': e, 'permanent': True}
+        except TelegramError as e:
+            return {'item': item, 'error': e}
+
+
+def record_results(results: list[dict]) -> None:
+    """Writes the outcome of a batch of sends with one bulk UPDATE."""
+    now = datetime.utcnow()
+    changes = []
+    for result in results:
+        item, error = result['item'], result['error']
+        attempts = item.attempts + 1
+        if error is None:
+            changes.append({'id': item.id, 'status': 'sent', 'attempts': attempts, 'sent_at': now, 'last_error': None})
+        elif result.get('permanent') or attempts >= MAX_ATTEMPTS:
+            changes.append({'id': item.id, 'status': 'failed', 'attempts': attempts, 'last_error': str(error)})
+        else:
+            delay = result.get('delay') or retry_delay(attempts)
+            changes.append({
+                'id': item.id, 'attempts': attempts, 'last_error': str(error),
+                'next_attempt_at': now + timedelta(seconds=delay),
+            })
+    if changes:
+        db.session.execute(update(NotificationOutbox), changes)
+        db.session.commit()
+
+
+async def drain(bot, limiter: AsyncRateLimiter | None = None) -> int:
+    """
+    Delivers every due notification. Needs an app context.
+
+    Returns:
+        The number of messages sent.
+    """
+    limiter = limiter or AsyncRateLimiter(SEND_RATE_PER_SECOND)
+    sent = 0
+    while True:
+        items = claim_due()
+        if not items:
+            return sent
+        results = await asyncio.gather(*(_send(bot, item, limiter) for item in items))
+        record_results(results)
+        sent += sum(1 for r in results if r['error'] is None)
+
+
+async def run(bot, interval: float) -> None:
+    limiter = AsyncRateLimiter(SEND_RATE_PER_SECOND)
+    async with bot:
+        while True:
+            sent = await drain(bot, limiter)
+            if sent:
+                logger.info(f"Sent {sent} notifications.")
+            if not interval:
+                return
+            await asyncio.sleep(interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Deliver queued Telegram notifications.")
+    parser.add_argument("--loop", type=float, default=0, help="Poll every N seconds instead of draining once.")
+    args = parser.parse_args(argv)
+
+    from telegram import Bot
+    from app import create_app
+    app = create_app(os.getenv("FLASK_CONFIG") or "default")
+    bot = Bot(os.environ["TELEGRAM_BOT_TOKEN"])
+    with app.app_context():
+        asyncio.run(run(bot, args.loop))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
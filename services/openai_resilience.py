@@ -0,0 +1,266 @@
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import openai
+
+from services import metrics_service
+
+logger = logging.getLogger(__name__)
+
+# Wall-clock deadline in seconds for one OpenAIService call, retries included.
+METHOD_DEADLINES = {
+    "speech_to_text": 40.0,
+    "generate_speaking_feedback": 35.0,
+    "provide_writing_feedback": 45.0,
+    "generate_explanation": 20.0,
+    "generate_definition": 15.0,
+    "generate_speaking_question": 12.0,
+    "generate_writing_task": 12.0,
+}
+DEFAULT_DEADLINE = 30.0
+
+# Retries after the first attempt, for 429, 5xx, timeouts and connection errors.
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+
+# Upstream calls allowed in flight per worker, and how long a caller waits for a slot.
+MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+SLOT_WAIT = 5.0
+
+
+class AIServiceBusyError(Exception):
+    """Raised when a call is refused because the upstream is failing or saturated."""
+
+
+class StreamDeadlineError(TimeoutError):
+    """Raised when a streamed response is still running at its method's deadline."""
+
+
+def is_retryable(error: Exception) -> bool:
+    """Checks whether an error says more about upstream health than about the request."""
+    if isinstance(error, openai.APIConnectionError):  # includes APITimeoutError
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def _retry_after(error: Exception) -> float | None:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: float | None = None) -> float:
+    """
+    Full-jitter exponential backoff, so workers that failed together do not
+    retry together. A server-sent Retry-After is honoured up to the cap.
+    """
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, BACKOFF_CAP))
+    return delay
+
+
+class CircuitBreaker:
+    """
+    Opens when the failure rate over a sliding window reaches a threshold,
+    rejecting calls for a cooldown period. After the cooldown a single probe
+    call is let through: success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, failure_rate: float = 0.5, min_calls: int = 10,
+                 window: float = 30.0, cooldown: float = 30.0):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self._events = deque()  # (timestamp, failed)
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.cooldown:
+                return "open"
+            return "half_open"
+
+    def allow(self) -> bool:
+        """Checks whether a call may go upstream now."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record(self, failed: bool) -> None:
+        """Records the outcome of a call that was allowed through."""
+        now = time.monotonic()
+        with self._lock:
+            if self._opened_at is not None:
+                if not self._probing:
+                    return  # A straggler from before the circuit opened.
+                self._probing = False
+                if failed:
+                    self._opened_at = now
+                else:
+                    self._opened_at = None
+                    self._events.clear()
+                    logger.info("OpenAI circuit closed after a successful probe.")
+                return
+
+            self._events.append((now, failed))
+            while self._events and self._events[0][0] < now - self.window:
+                self._events.popleft()
+            failures = sum(1 for _, f in self._events if f)
+            if len(self._events) >= self.min_calls and failures / len(self._events) >= self.failure_rate:
+                self._opened_at = now
+                logger.warning(
+                    f"OpenAI circuit opened: {failures}/{len(self._events)} calls failed in the last {self.window:.0f}s."
+                )
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight upstream calls so a slow upstream cannot absorb every worker thread."""
+
+    def __init__(self, limit: int, wait: float):
+        self.limit = limit
+        self.wait = wait
+        self._slots = threading.BoundedSemaphore(limit)
+
+    @contextmanager
+    def slot(self):
+        if not self._slots.acquire(timeout=self.wait):
+            raise AIServiceBusyError(f"All {self.limit} upstream slots are busy.")
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+
+# One breaker and one limiter per worker process, shared by every OpenAIService instance.
+upstream_breaker = CircuitBreaker()
+upstream_slots = ConcurrencyLimiter(MAX_CONCURRENCY, SLOT_WAIT)
+
+
+def call_upstream(method: str, attempt_fn):
+    """
+    Runs an upstream call under the method's deadline, with retries, the
+    circuit breaker and the concurrency cap. Waiting for a slot and backing
+    off both block, so bot handlers call it from a worker thread
+    (asyncio.to_thread or utils.progressive_message.iterate_in_thread).
+
+    Args:
+        method: The OpenAIService method name, used for deadlines and metrics.
+        attempt_fn: Called as `attempt_fn(timeout)` for each attempt, where
+            `timeout` is the time left before the deadline.
+
+    Returns:
+        Whatever `attempt_fn` returns.
+
+    Raises:
+        AIServiceBusyError: If the circuit is open or no slot frees up in time.
+        The last upstream error, once retries or the deadline run out.
+    """
+    deadline = time.monotonic() + METHOD_DEADLINES.get(method, DEFAULT_DEADLINE)
+    attempt = 0
+    while True:
+        try:
+            # The slot is taken first: a half-open probe that lost the slot
+            # race would otherwise never report back and keep the circuit open.
+            with upstream_slots.slot():
+                if not upstream_breaker.allow():
+                    raise AIServiceBusyError(f"OpenAI circuit is open; {method} was not attempted.")
+                result = attempt_fn(max(deadline - time.monotonic(), 0.1))
+        except AIServiceBusyError:
+            raise
+        except Exception as e:
+            time.sleep(_backoff_or_raise(method, e, attempt, deadline))
+            attempt += 1
+            continue
+        upstream_breaker.record(failed=False)
+        return result
+
+
+def stream_upstream(method: str, open_fn):
+    """
+    Streaming counterpart of `call_upstream`. Opening the stream is retried
+    like any other call; once it is open, the slot stays taken until the
+    caller stops iterating, the deadline is checked between chunks, and a
+    failure mid-stream counts against the circuit breaker. Nothing is
+    retried after the first chunk, since the caller has already used it.
+
+    Args:
+        method: The OpenAIService method name, used for deadlines and metrics.
+        open_fn: Called as `open_fn(timeout)` to open the stream, where
+            `timeout` is the time left before the deadline.
+
+    Yields:
+        The chunks of the stream `open_fn` returns.
+
+    Raises:
+        AIServiceBusyError: If the circuit is open or no slot frees up in time.
+        StreamDeadlineError: If the stream is still running at the deadline.
+        The last upstream error, once retries or the deadline run out.
+    """
+    deadline = time.monotonic() + METHOD_DEADLINES.get(method, DEFAULT_DEADLINE)
+    attempt = 0
+    while True:
+        delay = None
+        with upstream_slots.slot():
+            if not upstream_breaker.allow():
+                raise AIServiceBusyError(f"OpenAI circuit is open; {method} was not attempted.")
+            try:
+                stream = open_fn(max(deadline - time.monotonic(), 0.1))
+            except Exception as e:
+                delay = _backoff_or_raise(method, e, attempt, deadline)
+            else:
+                failed = False
+                try:
+                    for chunk in stream:
+                        if time.monotonic() > deadline:
+                            raise StreamDeadlineError(f"OpenAI {method} stream ran past its deadline.")
+                        yield chunk
+                except Exception as e:
+                    failed = isinstance(e, StreamDeadlineError) or is_retryable(e)
+                    raise
+                finally:
+                    # Also reached when the caller stops iterating early, which
+                    # says nothing bad about the upstream.
+                    close = getattr(stream, "close", None)
+                    if close is not None:
+                        close()
+                    upstream_breaker.record(failed=failed)
+                return
+        time.sleep(delay)
+        attempt += 1
+
+
+def _backoff_or_raise(method: str, error: Exception, attempt: int, deadline: float) -> float:
+    """Records a failed attempt and returns how long to wait before the next one, re-raising `error` if there is none."""
+    retryable = is_retryable(error)
+    upstream_breaker.record(failed=retryable)
+    if not retryable or attempt >= MAX_RETRIES:
+        raise error
+    delay = backoff_delay(attempt, _retry_after(error))
+    if time.monotonic() + delay >= deadline:
+        raise error
+    logger.warning(f"OpenAI {method} attempt {attempt + 1} failed ({type(error).__name__}); retrying in {delay:.2f}s.")
+    metrics_service.record_openai_retry(method)
+    return delay
@@ -1,23 +1,214 @@
 import os
 import logging
 import json # For potential JSON parsing if AI returns it
+import random
+import time
+from typing import Iterator
+from cachetools import TTLCache
 from openai import OpenAI, OpenAIError # Import the OpenAI library and OpenAIError
 from dotenv import load_dotenv
 from pydub import AudioSegment
 
+from services import metrics_service, openai_resilience
+from services.ai_usage_service import AIBudgetExceededError, usage_recorder
+from services.openai_resilience import AIServiceBusyError
+from utils.essay_metrics import EssayMetrics, describe_for_examiner
+from utils.speaking_corpus import get_speaking_corpus
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_BASE_URL = 'https://open-ai-proxy-hub-munalombe01.replit.app/api/proxy/v1'
+
+# Product feature each method is billed to in ai_usage_records.
+METHOD_FEATURES = {
+    "speech_to_text": "transcription",
+    "generate_speaking_feedback": "speaking_feedback",
+    "provide_writing_feedback": "writing_feedback",
+    "generate_explanation": "explain",
+    "generate_definition": "define",
+    "generate_speaking_question": "question_gen",
+    "generate_writing_task": "question_gen",
+    "batch_grade_local": "homework_grading",
+}
+
+# Pre-written questions served when a user is over their daily AI budget or the upstream is busy.
+QUESTION_POOL_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "question_pool.json")
+
+# Explanations and definitions are identical for every user, so answers are
+# shared across requests for a day and reused when a user is over budget.
+_answer_cache = TTLCache(maxsize=2048, ttl=24 * 60 * 60)
+
+
+def _load_question_pool() -> dict:
+    try:
+        with open(QUESTION_POOL_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        logger.error(f"Error loading question pool: {e}")
+        return {}
+
+
+def parse_partial_json(text: str) -> dict:
+    """
+    Best-effort parse of a JSON object that is still being streamed.
+
+    Open strings, arrays and objects are closed; if the text stops inside a
+    key or a number, it is cut back to the last complete value.
+
+    Returns:
+        The fields received so far, or an empty dict.
+    """
+    stack = []
+    cuts = []  # (prefix length, closers) where a prefix ends between complete values
+    in_string = escape = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            cuts.append((i + 1, "".join(reversed(stack))))
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+        elif ch == ",":
+            cuts.append((i, "".join(reversed(stack))))
+
+    head = text[:-1] if escape else text
+    candidates = [head + ('"' if in_string else "") + "".join(reversed(stack))]
+    if cuts:
+        end, closers = cuts[-1]
+        candidates.append(text[:end] + closers)
+    for candidate in candidates:
+        try:
+            parsed = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(parsed, dict):
+            return parsed
+    return {}
+
+
 class OpenAIService:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, user_id=None):
+        """
+        Args:
+            api_key: OpenAI API key; defaults to the OPENAI_API_KEY environment variable.
+            user_id: Telegram user ID that calls are accounted and budgeted against.
+        """
+        self.user_id = user_id
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             logger.error("OPENAI_API_KEY not found in environment variables.")
             raise ValueError("OPENAI_API_KEY not found in environment variables.")
+        # Retries are handled by openai_resilience, which also applies the circuit breaker.
         self.client = OpenAI(
             api_key=self.api_key,
-            base_url='https://open-ai-proxy-hub-munalombe01.replit.app/api/proxy/v1'
+            base_url=os.getenv("OPENAI_BASE_URL", DEFAULT_BASE_URL),
+            max_retries=0,
         )
 
+    def _chat_completion(self, method: str, **kwargs):
+        """
+        Sends a chat completion request through openai_resilience (deadline,
+        retries, circuit breaker), recording latency, token usage and errors
+        under the calling method's name.
+
+        Args:
+            method: The name of the public method making the call.
+            **kwargs: Arguments forwarded to `client.chat.completions.create`.
+
+        Returns:
+            The raw completion response.
+        """
+        if usage_recorder.is_over_budget(self.user_id):
+            raise AIBudgetExceededError(self.user_id)
+
+        start = time.perf_counter()
+        response = None
+        outcome = "ok"
+        try:
+            with metrics_service.observe_openai(method):
+                response = openai_resilience.call_upstream(
+                    method, lambda timeout: self.client.chat.completions.create(timeout=timeout, **kwargs)
+                )
+        except Exception as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            usage_recorder.record(
+                method=method,
+                feature=METHOD_FEATURES.get(method, method),
+                model=kwargs.get("model", "unknown"),
+                user_id=self.user_id,
+                usage=getattr(response, "usage", None),
+                latency_ms=(time.perf_counter() - start) * 1000,
+                outcome=outcome,
+            )
+        metrics_service.record_openai_tokens(method, getattr(response, "usage", None))
+        return response
+
+    def _stream_chat_completion(self, method: str, **kwargs) -> Iterator[str]:
+        """
+        Streaming counterpart of `_chat_completion`.
+
+        Retries apply until the stream is opened; once tokens are flowing a
+        failure is raised to the caller as-is. The upstream slot is held and
+        the deadline enforced until the stream ends (see
+        `openai_resilience.stream_upstream`).
+
+        Yields:
+            The response text accumulated so far, once per content chunk.
+        """
+        if usage_recorder.is_over_budget(self.user_id):
+            raise AIBudgetExceededError(self.user_id)
+
+        start = time.perf_counter()
+        usage = None
+        outcome = "ok"
+        text = ""
+        try:
+            with metrics_service.observe_openai(method):
+                stream = openai_resilience.stream_upstream(
+                    method,
+                    lambda timeout: self.client.chat.completions.create(
+                        stream=True, stream_options={"include_usage": True}, timeout=timeout, **kwargs
+                    ),
+                )
+                for chunk in stream:
+                    if chunk.usage is not None:
+                        usage = chunk.usage
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        text += chunk.choices[0].delta.content
+                        yield text
+        except Exception as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            usage_recorder.record(
+                method=method,
+                feature=METHOD_FEATURES.get(method, method),
+                model=kwargs.get("model", "unknown"),
+                user_id=self.user_id,
+                usage=usage,
+                latency_ms=(time.perf_counter() - start) * 1000,
+                outcome=outcome,
+            )
+        metrics_service.record_openai_tokens(method, usage)
+
+    def _pooled_question(self, section: str, number: int, error: Exception) -> dict:
+        """Picks a pre-written question for a section and part/task number, re-raising `error` if there is none."""
+        candidates = _load_question_pool().get(section, {}).get(str(number), [])
+        if not candidates:
+            raise error
+        return dict(random.choice(candidates))
+
     def speech_to_text(self, audio_file_path: str, prompt: str = "") -> str:
         """
         Transcribes audio to text using OpenAI's Whisper model.
@@ -39,12 +230,34 @@ class OpenAIService:
                 audio.export(mp3_path, format="mp3")
                 audio_file_path = mp3_path
 
-            with open(audio_file_path, "rb") as audio_file:
-                transcript = self.client.audio.transcriptions.create(
+            start = time.perf_counter()
+            outcome = "ok"
+            def transcribe(timeout):
+                # Reopened per attempt so a retry uploads the file from the start.
+                with open(audio_file_path, "rb") as audio_file:
+                    return self.client.audio.transcriptions.create(
+                        model="whisper-1",
+                        file=audio_file,
+                        language="en",
+                        prompt=prompt,
+                        timeout=timeout,
+                    )
+
+            try:
+                with metrics_service.observe_openai("speech_to_text"):
+                    transcript = openai_resilience.call_upstream("speech_to_text", transcribe)
+            except Exception as e:
+                outcome = type(e).__name__
+                raise
+            finally:
+                usage_recorder.record(
+                    method="speech_to_text",
+                    feature=METHOD_FEATURES["speech_to_text"],
                     model="whisper-1",
-                    file=audio_file,
-                    language="en",
-                    prompt=prompt
+                    user_id=self.user_id,
+                    usage=None,
+                    latency_ms=(time.perf_counter() - start) * 1000,
+                    outcome=outcome,
                 )
             return transcript.text
         except FileNotFoundError:
@@ -93,7 +306,8 @@ Provide your feedback in a structured JSON format with the following keys:
 - "estimated_band": A float representing the estimated band score for this specific response, from 6.0 to 9.0.
 """
         try:
-            response = self.client.chat.completions.create(
+            response = self._chat_completion(
+                "generate_speaking_feedback",
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": system_message}
@@ -110,6 +324,30 @@ Provide your feedback in a structured JSON format with the following keys:
             logger.error(f"Failed to parse JSON feedback from OpenAI: {e}")
             raise
 
+    @staticmethod
+    def _explanation_messages(query: str, context: str, language: str) -> list:
+        prompt = (
+            f"You are an expert IELTS tutor. Explain the concept of '{query}' "
+            f"in the context of '{context}' for an IELTS student. "
+            f"Provide clear examples. The explanation should be in {language}."
+        )
+        return [
+            {"role": "system", "content": "You are a helpful IELTS preparation assistant."},
+            {"role": "user", "content": prompt}
+        ]
+
+    @staticmethod
+    def _definition_messages(word: str, language: str) -> list:
+        prompt = (
+            f"You are an expert IELTS tutor. Provide a clear definition for the word '{word}'. "
+            f"Include its part of speech, and at least two example sentences relevant to the IELTS exam. "
+            f"The response should be in {language}."
+        )
+        return [
+            {"role": "system", "content": "You are a helpful IELTS preparation assistant."},
+            {"role": "user", "content": prompt}
+        ]
+
     def generate_explanation(self, query: str, context: str, language: str = 'en') -> str:
         """
         Generates an AI-powered explanation for an IELTS concept.
@@ -122,23 +360,20 @@ Provide your feedback in a structured JSON format with the following keys:
         Returns:
             A string containing the explanation.
         """
+        cache_key = ("explain", query.strip().lower(), context.strip().lower(), language)
+        if cache_key in _answer_cache:
+            return _answer_cache[cache_key]
         try:
-            prompt = (
-                f"You are an expert IELTS tutor. Explain the concept of '{query}' "
-                f"in the context of '{context}' for an IELTS student. "
-                f"Provide clear examples. The explanation should be in {language}."
-            )
-            
-            response = self.client.chat.completions.create(
+            response = self._chat_completion(
+                "generate_explanation",
                 model="gpt-4o",  # As per project rules
-                messages=[
-                    {"role": "system", "content": "You are a helpful IELTS preparation assistant."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self._explanation_messages(query, context, language),
                 max_tokens=500,
                 temperature=0.7,
             )
-            return response.choices[0].message.content.strip()
+            explanation = response.choices[0].message.content.strip()
+            _answer_cache[cache_key] = explanation
+            return explanation
         except OpenAIError as e:
             logger.error(f"OpenAI API error during explanation generation: {e}")
             raise  # Re-raise to be caught by safe_handler
@@ -154,30 +389,73 @@ Provide your feedback in a structured JSON format with the following keys:
         Returns:
             A string containing the definition, part of speech, and examples.
         """
+        cache_key = ("define", word.strip().lower(), language)
+        if cache_key in _answer_cache:
+            return _answer_cache[cache_key]
         try:
-            prompt = (
-                f"You are an expert IELTS tutor. Provide a clear definition for the word '{word}'. "
-                f"Include its part of speech, and at least two example sentences relevant to the IELTS exam. "
-                f"The response should be in {language}."
-            )
-            
-            response = self.client.chat.completions.create(
+            response = self._chat_completion(
+                "generate_definition",
                 model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are a helpful IELTS preparation assistant."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=self._definition_messages(word, language),
                 max_tokens=300,
                 temperature=0.5,
             )
-            return response.choices[0].message.content.strip()
+            definition = response.choices[0].message.content.strip()
+            _answer_cache[cache_key] = definition
+            return definition
         except OpenAIError as e:
             logger.error(f"OpenAI API error during definition generation: {e}")
             raise
 
+    def stream_explanation(self, query: str, context: str, language: str = 'en') -> Iterator[str]:
+        """
+        Streams an explanation for an IELTS concept; see `generate_explanation`.
+
+        Yields:
+            The explanation accumulated so far.
+        """
+        cache_key = ("explain", query.strip().lower(), context.strip().lower(), language)
+        if cache_key in _answer_cache:
+            yield _answer_cache[cache_key]
+            return
+        text = ""
+        for text in self._stream_chat_completion(
+            "generate_explanation",
+            model="gpt-4o",
+            messages=self._explanation_messages(query, context, language),
+            max_tokens=500,
+            temperature=0.7,
+        ):
+            yield text
+        _answer_cache[cache_key] = text.strip()
+
+    def stream_definition(self, word: str, language: str = 'en') -> Iterator[str]:
+        """
+        Streams a definition for a word; see `generate_definition`.
+
+        Yields:
+            The definition accumulated so far.
+        """
+        cache_key = ("define", word.strip().lower(), language)
+        if cache_key in _answer_cache:
+            yield _answer_cache[cache_key]
+            return
+        text = ""
+        for text in self._stream_chat_completion(
+            "generate_definition",
+            model="gpt-4o",
+            messages=self._definition_messages(word, language),
+            max_tokens=300,
+            temperature=0.5,
+        ):
+            yield text
+        _answer_cache[cache_key] = text.strip()
+
     def generate_speaking_question(self, part_number: int, topic: str = None) -> dict:
         """
         Generates a question for a specific part of the IELTS speaking test.
+        Questions from the seed-data corpus are served first, with their model
+        answer and vocabulary; the API is only called when none fits.
 
         Args:
             part_number: The part of the IELTS speaking test (1, 2, or 3).
@@ -187,6 +465,11 @@ Provide your feedback in a structured JSON format with the following keys:
             A dictionary containing the question and topic, e.g., 
             {'topic': 'A hobby you enjoy', 'question': 'Describe a hobby...'}.
         """
+        corpus = get_speaking_corpus()
+        local = corpus.pick(part_number, topic) if corpus is not None else None
+        if local is not None:
+            return local.to_dict()
+
         part_prompts = {
             1: "Generate a common IELTS Speaking Part 1 question. It should be about a familiar topic like home, family, work, studies, or interests.",
             2: "Generate an IELTS Speaking Part 2 cue card. Provide a main topic and 3-4 bullet points of things the student should talk about. The topic should be about a personal experience.",
@@ -207,7 +490,8 @@ Return the response as a JSON object with the following keys:
 - "question": The full question or cue card text to be presented to the student.
 """
         try:
-            response = self.client.chat.completions.create(
+            response = self._chat_completion(
+                "generate_speaking_question",
                 model="gpt-4o",
                 messages=[
                     {"role": "system", "content": system_message}
@@ -217,6 +501,9 @@ Return the response as a JSON object with the following keys:
             )
             question_data = json.loads(response.choices[0].message.content)
             return question_data
+        except (AIBudgetExceededError, AIServiceBusyError) as e:
+            logger.info(f"Serving a pooled speaking question to user {self.user_id}: {e}")
+            return self._pooled_question("speaking", part_number, e)
         except OpenAIError as e:
             logger.error(f"OpenAI API error during question generation: {e}")
             raise
@@ -253,7 +540,8 @@ Return the response as a JSON object with the following keys:
 - "image_url": For Task 1, an optional URL to an image of the chart or graph. For Task 2, this should be null.
 """
         try:
-            response = self.client.chat.completions.create(
+            response = self._chat_completion(
+                "generate_writing_task",
                 model="gpt-4o",
                 messages=[{"role": "system", "content": system_message}],
                 response_format={"type": "json_object"},
@@ -261,6 +549,9 @@ Return the response as a JSON object with the following keys:
             )
             task_data = json.loads(response.choices[0].message.content)
             return task_data
+        except (AIBudgetExceededError, AIServiceBusyError) as e:
+            logger.info(f"Serving a pooled writing task to user {self.user_id}: {e}")
+            return self._pooled_question("writing", task_type, e)
         except OpenAIError as e:
             logger.error(f"OpenAI API error during writing task generation: {e}")
             raise
@@ -268,19 +559,19 @@ Return the response as a JSON object with the following keys:
             logger.error(f"Failed to parse JSON writing task from OpenAI: {e}")
             raise
 
-    def provide_writing_feedback(self, essay_text: str, task_type: int, question: str) -> dict:
+    @staticmethod
+    def writing_feedback_prompt(essay_text: str, task_type: int, question: str, metrics: EssayMetrics = None) -> str:
         """
-        Generates structured feedback for an IELTS writing response.
-
-        Args:
-            essay_text: The user's written response.
-            task_type: The writing task type (1 or 2).
-            question: The question the user was answering.
-
-        Returns:
-            A dictionary containing structured feedback.
+        Builds the examiner prompt shared by interactive and batch essay grading.
+        Local measurements of the essay, if given, are included for calibration.
         """
-        system_message = f"""
+        measurements = ""
+        if metrics is not None:
+            measurements = f"""
+Automated measurements of the essay (use them to calibrate your judgement, not as the only evidence):
+{describe_for_examiner(metrics)}
+"""
+        return f"""
 You are an expert IELTS writing examiner. Your task is to provide constructive feedback on a student's essay for IELTS Writing Task {task_type}.
 The student was responding to the following prompt: "{question}"
 
@@ -288,7 +579,7 @@ Please analyze the following essay:
 ---
 {essay_text}
 ---
-
+{measurements}
 Provide your feedback in a structured JSON format with the following keys:
 - "strengths": [A list of 1-2 specific strengths of the essay.]
 - "areas_for_improvement": [A list of 1-2 specific and actionable areas for improvement.]
@@ -298,8 +589,24 @@ Provide your feedback in a structured JSON format with the following keys:
 - "grammatical_range_accuracy": "A brief comment on the range and accuracy of grammar.",
 - "estimated_band": A float representing the estimated band score for this essay, from 6.0 to 9.0.
 """
+
+    def provide_writing_feedback(self, essay_text: str, task_type: int, question: str, metrics: EssayMetrics = None) -> dict:
+        """
+        Generates structured feedback for an IELTS writing response.
+
+        Args:
+            essay_text: The user's written response.
+            task_type: The writing task type (1 or 2).
+            question: The question the user was answering.
+            metrics: Optional local measurements of the essay to include in the prompt.
+
+        Returns:
+            A dictionary containing structured feedback.
+        """
+        system_message = self.writing_feedback_prompt(essay_text, task_type, question, metrics)
         try:
-            response = self.client.chat.completions.create(
+            response = self._chat_completion(
+                "provide_writing_feedback",
                 model="gpt-4o",
                 messages=[{"role": "system", "content": system_message}],
                 response_format={"type": "json_object"},
@@ -314,6 +621,31 @@ Provide your feedback in a structured JSON format with the following keys:
             logger.error(f"Failed to parse JSON writing feedback from OpenAI: {e}")
             raise
 
+    def stream_writing_feedback(self, essay_text: str, task_type: int, question: str, metrics: EssayMetrics = None) -> Iterator[dict]:
+        """
+        Streams structured writing feedback; see `provide_writing_feedback`.
+
+        Yields:
+            Partial feedback dictionaries as the JSON arrives, then the complete
+            feedback as the last item.
+        """
+        text = ""
+        for text in self._stream_chat_completion(
+            "provide_writing_feedback",
+            model="gpt-4o",
+            messages=[{"role": "system", "content": self.writing_feedback_prompt(essay_text, task_type, question, metrics)}],
+            response_format={"type": "json_object"},
+            temperature=0.7,
+        ):
+            partial = parse_partial_json(text)
+            if partial:
+                yield partial
+        try:
+            yield json.loads(text)
+        except (json.JSONDecodeError, TypeError) as e:
+            logger.error(f"Failed to parse JSON writing feedback from OpenAI: {e}")
+            raise
+
 # Example usage (for testing this file directly)
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO) # Ensure root logger is configured for stream output
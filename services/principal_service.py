@@ -0,0 +1,115 @@
+"""
+The logged-in dashboard teacher and everything they own, for authorization.
+
+A `Principal` is loaded once per request (and kept for PRINCIPAL_TTL seconds
+per login and worker), so route authorization is a set-membership test
+instead of a join per request. A negative answer is confirmed against a
+fresh load before a route denies access, so a group or exercise created
+through another worker is never refused; routes that change ownership in
+this worker invalidate the cached principal immediately.
+"""
+import threading
+from dataclasses import dataclass
+from typing import Callable
+
+from cachetools import TTLCache
+from flask import g, session
+
+from extensions import db
+from models import Group, GroupMembership, Homework, Teacher, TeacherExercise
+
+PRINCIPAL_TTL = 30
+# Keyed by (user id, login id), so logging in again always starts from a fresh principal.
+_principals = TTLCache(maxsize=4096, ttl=PRINCIPAL_TTL)
+_principals_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    A dashboard teacher's identity and owned resources. Dashboard records
+    are keyed by the session's user id (Group.teacher_id,
+    TeacherExercise.creator_id and Homework.assigned_by_id).
+    """
+    user_id: int
+    teacher_id: int | None
+    group_ids: frozenset
+    exercise_ids: frozenset
+    homework_ids: frozenset
+    student_ids: frozenset
+
+    def owns_group(self, group_id: int) -> bool:
+        return group_id in self.group_ids
+
+    def owns_exercise(self, exercise_id: int) -> bool:
+        return exercise_id in self.exercise_ids
+
+    def assigned_homework(self, homework_id: int) -> bool:
+        return homework_id in self.homework_ids
+
+    def teaches_student(self, student_id: int) -> bool:
+        return student_id in self.student_ids
+
+
+def load_principal(user_id: int) -> Principal:
+    """Loads a teacher's principal from the database."""
+    def ids(query):
+        return frozenset(row[0] for row in query)
+
+    return Principal(
+        user_id=user_id,
+        teacher_id=db.session.query(Teacher.id).filter(Teacher.user_id == user_id).scalar(),
+        group_ids=ids(db.session.query(Group.id).filter(Group.teacher_id == user_id)),
+        exercise_ids=ids(db.session.query(TeacherExercise.id).filter(TeacherExercise.creator_id == user_id)),
+        homework_ids=ids(db.session.query(Homework.id).filter(Homework.assigned_by_id == user_id)),
+        student_ids=ids(
+            db.session.query(GroupMembership.student_id).join(Group).filter(Group.teacher_id == user_id).distinct()
+        ),
+    )
+
+
+def current_principal(refresh: bool = False) -> Principal | None:
+    """
+    The principal for the logged-in user, or None if nobody is logged in.
+    Loaded at most once per request unless `refresh` is set.
+    """
+    user_id = session.get('user_id')
+    if user_id is None:
+        return None
+    key = (user_id, session.get('login_id'))
+    # g can outlive a request (e.g. under an outer app context), so only trust it for the same login.
+    principal = None if refresh or g.get('principal_key') != key else g.get('principal')
+    if principal is None and not refresh:
+        with _principals_lock:
+            principal = _principals.get(key)
+    if principal is None:
+        principal = load_principal(user_id)
+        with _principals_lock:
+            _principals[key] = principal
+    g.principal, g.principal_key = principal, key
+    return principal
+
+
+def authorize(check: Callable[[Principal], bool]) -> bool:
+    """
+    Tests `check` against the current principal, reloading it once per
+    request if the cached one says no.
+    """
+    principal = current_principal()
+    if principal is None:
+        return False
+    if check(principal):
+        return True
+    if g.get('principal_refreshed') == g.principal_key:
+        return False
+    g.principal_refreshed = g.principal_key
+    return check(current_principal(refresh=True))
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Drops a user's cached principal after their ownership changes."""
+    with _principals_lock:
+        for key in [key for key in _principals if key[0] == user_id]:
+            _principals.pop(key, None)
+    if g.get('principal') is not None and g.principal.user_id == user_id:
+        g.pop('principal')
@@ -0,0 +1,209 @@
+"""
+Homework due-date reminders, run by APScheduler.
+
+Every REMINDER_TICK seconds one process queues a reminder for each student
+who has not submitted homework that falls due within REMINDER_LEAD. The
+tick reads a single due-date range with one indexed query: from where the
+previous tick stopped (the job's watermark) up to now + REMINDER_LEAD. Each
+homework is therefore scanned once, and a tick costs the same however much
+homework exists. Reminders go through the notification outbox, so they
+are delivered in rate-limited batches by the notification worker. The
+scheduler runs that worker as a second job, and scores free-text homework
+answers (services.homework_service) as a third:
+
+    python -m services.reminder_service
+
+Homework assigned less than REMINDER_LEAD before it is due gets no
+reminder; its assignment notification already shows the due date.
+
+Any number of scheduler processes may run. A lease row in `scheduled_jobs`
+lets only one of them run a tick at a time.
+"""
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from extensions import db
+from models import Group, GroupMembership, Homework, HomeworkSubmission, ScheduledJob, TeacherExercise, User
+from services.homework_service import SCORING_TICK, score_pending
+from services.notification_service import AsyncRateLimiter, SEND_RATE_PER_SECOND, drain, enqueue
+from utils.translation_system import TranslationSystem
+
+logger = logging.getLogger(__name__)
+
+trans = TranslationSystem()
+
+REMINDER_JOB = 'homework_reminders'
+SCORING_JOB = 'homework_scoring'
+REMINDER_LEAD = timedelta(hours=float(os.getenv("REMINDER_LEAD_HOURS", "24")))
+REMINDER_TICK = int(os.getenv("REMINDER_TICK_SECONDS", "300"))
+NOTIFICATION_TICK = int(os.getenv("NOTIFICATION_TICK_SECONDS", "5"))
+# Longer than any tick takes; a crashed holder's lock frees itself after this.
+JOB_LEASE = timedelta(minutes=10)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_lock(name: str, lease: timedelta = JOB_LEASE) -> bool:
+    """Takes the named job's lease unless another live process holds it."""
+    now = datetime.utcnow()
+    table = ScheduledJob.__table__
+    connection = db.session.connection()
+    if connection.dialect.name in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if connection.dialect.name == 'postgresql' else sqlite.insert
+        connection.execute(insert(table).values(name=name).on_conflict_do_nothing(index_elements=['name']))
+    elif db.session.get(ScheduledJob, name) is None:
+        db.session.add(ScheduledJob(name=name))
+        db.session.flush()
+    # A single conditional UPDATE, so two processes can never both see the lease as free.
+    taken = connection.execute(
+        update(table)
+        .where(table.c.name == name, or_(table.c.locked_until.is_(None), table.c.locked_until < now))
+        .values(locked_by=WORKER_ID, locked_until=now + lease)
+    ).rowcount == 1
+    db.session.commit()
+    return taken
+
+
+def release_lock(name: str) -> None:
+    table = ScheduledJob.__table__
+    db.session.execute(
+        update(table).where(table.c.name == name, table.c.locked_by == WORKER_ID)
+        .values(locked_by=None, locked_until=None)
+    )
+    db.session.commit()
+
+
+def run_exclusively(name: str, job):
+    """
+    Runs `job()` if this process gets the named lease.
+
+    Returns:
+        The job's result, or None if another process holds the lease.
+    """
+    if not acquire_lock(name):
+        logger.debug(f"Skipping {name}: another worker holds the lock.")
+        return None
+    try:
+        return job()
+    finally:
+        db.session.rollback()
+        release_lock(name)
+
+
+def due_reminders_query(after: datetime, until: datetime):
+    """Students without a submission for homework due in (after, until]."""
+    return (
+        select(Homework.id, Homework.due_date, TeacherExercise.title, Group.name,
+               User.id, User.user_id, User.preferred_language)
+        .join(TeacherExercise, Homework.exercise_id == TeacherExercise.id)
+        .join(Group, Homework.group_id == Group.id)
+        .join(GroupMembership, GroupMembership.group_id == Homework.group_id)
+        .join(User, GroupMembership.student_id == User.id)
+        .outerjoin(HomeworkSubmission, and_(
+            HomeworkSubmission.homework_id == Homework.id, HomeworkSubmission.student_id == User.id,
+        ))
+        .where(Homework.due_date > after, Homework.due_date <= until, HomeworkSubmission.id.is_(None))
+    )
+
+
+def queue_due_reminders(now: datetime | None = None) -> int:
+    """
+    Queues reminders for the due-date range no earlier tick has covered and
+    advances the watermark, in one transaction. Run it through
+    run_exclusively so ticks never overlap.
+
+    Returns:
+        The number of reminders queued.
+    """
+    now = now or datetime.utcnow()
+    job = db.session.get(ScheduledJob, REMINDER_JOB)
+    after = max(job.watermark or now, now)
+    until = now + REMINDER_LEAD
+    if after >= until:
+        return 0
+
+    texts = {}  # One rendering per homework and language
+    rows = []
+    for homework_id, due_date, title, group_name, user_id, chat_id, language in db.session.execute(
+        due_reminders_query(after, until)
+    ):
+        if (homework_id, language) not in texts:
+            texts[homework_id, language] = trans.get_message(
+                'homework', 'reminder', language or 'en',
+                exercise_title=title, group_name=group_name, due_date=due_date.strftime('%Y-%m-%d %H:%M'),
+            )
+        rows.append({
+            'idempotency_key': f"reminder:{homework_id}:user:{user_id}",
+            'chat_id': chat_id,
+            'kind': 'homework_reminder',
+            'text': texts[homework_id, language],
+            'status': 'pending',
+            'attempts': 0,
+            'next_attempt_at': now,
+            'created_at': now,
+        })
+    queued = enqueue(db.session.connection(), rows)
+    job.watermark = until
+    job.last_run_at = now
+    db.session.commit()
+    return queued
+
+
+def build_scheduler(app, bot):
+    """
+    An AsyncIOScheduler with the reminder tick, the outbox drain and the
+    homework scoring pass. Start it inside a running event loop, with `bot`
+    initialized.
+    """
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+    limiter = AsyncRateLimiter(SEND_RATE_PER_SECOND)
+
+    def reminder_tick():
+        with app.app_context():
+            queued = run_exclusively(REMINDER_JOB, queue_due_reminders)
+            if queued:
+                logger.info(f"Queued {queued} homework reminders.")
+
+    def scoring_tick():
+        with app.app_context():
+            run_exclusively(SCORING_JOB, score_pending)
+
+    async def notification_tick():
+        with app.app_context():
+            await drain(bot, limiter)
+
+    scheduler = AsyncIOScheduler(job_defaults={'coalesce': True, 'max_instances': 1})
+    scheduler.add_job(reminder_tick, 'interval', seconds=REMINDER_TICK, id=REMINDER_JOB,
+                      next_run_time=datetime.now())
+    scheduler.add_job(notification_tick, 'interval', seconds=NOTIFICATION_TICK, id='notification_outbox')
+    scheduler.add_job(scoring_tick, 'interval', seconds=SCORING_TICK, id=SCORING_JOB)
+    return scheduler
+
+
+async def run(app, bot) -> None:
+    async with bot:
+        scheduler = build_scheduler(app, bot)
+        scheduler.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            scheduler.shutdown(wait=False)
+
+
+def main():
+    from telegram import Bot
+    from app import create_app
+    app = create_app(os.getenv("FLASK_CONFIG") or "default")
+    asyncio.run(run(app, Bot(os.environ["TELEGRAM_BOT_TOKEN"])))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
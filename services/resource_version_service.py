@@ -0,0 +1,133 @@
+"""
+Version counters and conditional GETs for the dashboard list APIs.
+
+Every flush that adds, changes or deletes a Group, TeacherExercise or
+Homework bumps the owning teacher's counter for that kind (for example
+'groups:42') in the same transaction. A list endpoint decorated with
+`conditional('groups')` derives a strong ETag from those counters with one
+primary-key lookup and answers a matching If-None-Match with 304 before the
+view runs, so an unchanged list is never queried or serialized.
+
+Bulk Query.update()/delete() calls bypass the flush and therefore the
+counters; write these models through the ORM.
+"""
+import hashlib
+from functools import wraps
+from itertools import chain
+
+from flask import make_response, request, session as flask_session
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import Group, Homework, ResourceVersion, TeacherExercise
+from utils.compression import ENCODINGS
+
+# Bump when the JSON shape of a versioned endpoint changes, so clients refetch.
+SCHEMA_VERSION = 1
+
+# Model -> (counter kind, column holding the owning teacher's key)
+TRACKED = {
+    Group: ('groups', 'teacher_id'),
+    TeacherExercise: ('exercises', 'creator_id'),
+    Homework: ('homework', 'assigned_by_id'),
+}
+
+
+def _keep_previous_owner(target, value, oldvalue, initiator):
+    pass
+
+
+# Load the previous owner on reassignment even if it was expired, so its list is bumped too.
+for _model, (_kind, _owner_attr) in TRACKED.items():
+    event.listen(getattr(_model, _owner_attr), 'set', _keep_previous_owner, active_history=True)
+
+
+def version_key(kind: str, owner_id) -> str:
+    return f"{kind}:{owner_id}"
+
+
+def changed_keys(session) -> set[str]:
+    """The counters a flush of `session` has to bump."""
+    keys = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        tracked = TRACKED.get(type(obj))
+        if tracked is None or (obj in session.dirty and not session.is_modified(obj)):
+            continue
+        kind, owner_attr = tracked
+        history = inspect(obj).attrs[owner_attr].history
+        # A row moved to another owner changes both owners' lists.
+        for owner_id in chain([getattr(obj, owner_attr)], history.deleted):
+            if owner_id is not None:
+                keys.add(version_key(kind, owner_id))
+    return keys
+
+
+def bump(connection, keys) -> None:
+    """Increments the given counters, creating missing ones, on `connection`."""
+    table = ResourceVersion.__table__
+    rows = [{'key': key, 'version': 1} for key in sorted(keys)]  # Fixed order avoids lock-order deadlocks
+    if connection.dialect.name in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if connection.dialect.name == 'postgresql' else sqlite.insert
+        stmt = insert(table).values(rows)
+        connection.execute(stmt.on_conflict_do_update(index_elements=['key'], set_={'version': table.c.version + 1}))
+        return
+    for row in rows:
+        updated = connection.execute(
+            table.update().where(table.c.key == row['key']).values(version=table.c.version + 1)
+        )
+        if not updated.rowcount:
+            connection.execute(table.insert().values(**row))
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_changed_versions(session, flush_context):
+    keys = changed_keys(session)
+    if keys:
+        bump(session.connection(), keys)
+
+
+def versions_etag(keys) -> str:
+    """A strong ETag for the current values of the given counters."""
+    versions = dict(
+        db.session.query(ResourceVersion.key, ResourceVersion.version).filter(ResourceVersion.key.in_(keys)).all()
+    )
+    raw = f"v{SCHEMA_VERSION};" + ";".join(f"{key}={versions.get(key, 0)}" for key in sorted(keys))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+
+def matching_etag(etag: str) -> str | None:
+    """The tag in the request's If-None-Match that names `etag` in any content encoding, if any."""
+    # Compressed responses carry '<etag>-<encoding>'; see utils.compression.
+    for tag in [etag, *(f"{etag}-{encoding}" for encoding in ENCODINGS)]:
+        if request.if_none_match.contains(tag):
+            return tag
+    return None
+
+
+def conditional(*kinds):
+    """
+    Makes a dashboard list route answer conditional GETs from the logged-in
+    teacher's version counters for `kinds`.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            owner_id = flask_session.get('user_id')
+            etag = versions_etag([version_key(kind, owner_id) for kind in kinds])
+            matched = matching_etag(etag)
+            if matched:
+                # Echo the representation the client holds, compressed or not.
+                response = make_response('', 304)
+                response.set_etag(matched)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                response.set_etag(etag)
+            # Browsers may keep the list but must revalidate it on every use.
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
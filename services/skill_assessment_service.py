@@ -1,38 +1,228 @@
-from models import User, PracticeSession
+"""
+Skill levels from a student's practice history.
+
+Every completed, graded session is reduced to a performance between 0
+and 1: the share of correct answers for reading and listening, band / 9
+for writing and speaking. A student's skill score is the exponentially weighted
+moving average of those results (newest weighted by `alpha`), and the
+skill level is the highest level whose minimum score it reaches. Levels,
+minimums and `alpha` come from data/skill_levels.json, or the file named
+by SKILL_LEVELS_PATH.
+
+Practice handlers fold each session into the stored score as it completes.
+The nightly job rebuilds every score from the session history in one
+vectorized pass, which also corrects scores that drifted from it:
+
+    python -m services.skill_assessment_service [--group GROUP_ID]
+"""
+import argparse
+import json
+import logging
+import os
+from bisect import bisect_right
+
+import numpy as np
+from sqlalchemy import select, update
+
+from extensions import db
+from models import GroupMembership, PracticeSession, User
+
+logger = logging.getLogger(__name__)
+
+SKILL_LEVELS_PATH = os.getenv(
+    "SKILL_LEVELS_PATH", os.path.join(os.path.dirname(__file__), "..", "data", "skill_levels.json")
+)
+MAX_BAND = 9.0
+# Sections scored in IELTS bands; the rest count correct answers.
+BAND_SECTIONS = ("writing", "speaking")
+YIELD_PER = 5000
+
+
+class SkillEngine:
+    """
+    Maps skill scores to levels and keeps the moving average.
+
+    Args:
+        levels: Level name -> minimum score (0-1). One level must start at 0.
+        alpha: Weight of the newest result in the moving average.
+    """
+
+    def __init__(self, levels: dict[str, float], alpha: float):
+        table = sorted(levels.items(), key=lambda item: item[1])
+        if not table or table[0][1] > 0 or not 0 < alpha <= 1:
+            raise ValueError("Skill levels need a level starting at 0 and an alpha in (0, 1].")
+        self.names = tuple(name for name, _ in table)
+        self.minimums = tuple(float(minimum) for _, minimum in table)
+        self.alpha = float(alpha)
+
+    @classmethod
+    def from_file(cls, path: str) -> "SkillEngine":
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        return cls(config["levels"], config["alpha"])
+
+    def level_for(self, score: float) -> str:
+        return self.names[max(bisect_right(self.minimums, score) - 1, 0)]
+
+    def update(self, previous: float | None, performance: float) -> float:
+        """One step of the moving average; the first result starts it."""
+        if previous is None:
+            return performance
+        return self.alpha * performance + (1 - self.alpha) * previous
+
+    def record(self, user: User, performance: float | None) -> str | None:
+        """
+        Folds one result into the user's skill score. The caller commits.
+
+        Returns:
+            The new skill level if it changed, otherwise None.
+        """
+        if performance is None:
+            return None
+        user.skill_score = self.update(user.skill_score, performance)
+        new_level = self.level_for(user.skill_score)
+        if user.skill_level != new_level:
+            user.update_skill_level(new_level)
+            return new_level
+        return None
+
+    def moving_averages(self, owners: np.ndarray, performances: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        The moving average of each owner's results, for results sorted by
+        owner and then by time. Equivalent to calling update() over each
+        owner's results in order.
+
+        Returns:
+            (distinct owners, their averages)
+        """
+        owner_ids, starts, counts = np.unique(owners, return_index=True, return_counts=True)
+        group = np.repeat(np.arange(len(owner_ids)), counts)
+        # How many newer results each one has in its owner's history.
+        newer = (counts[group] - 1) - (np.arange(len(owners)) - starts[group])
+        weights = self.alpha * (1 - self.alpha) ** newer
+        weights[starts] = (1 - self.alpha) ** (counts - 1)
+        return owner_ids, np.bincount(group, weights=weights * performances, minlength=len(owner_ids))
+
+    def level_indexes(self, scores: np.ndarray) -> np.ndarray:
+        """level_for() over an array, as indexes into `names`."""
+        return np.maximum(np.searchsorted(self.minimums, scores, side="right") - 1, 0)
+
+
+skill_engine = SkillEngine.from_file(SKILL_LEVELS_PATH)
+
+
+def band_performance(band) -> float | None:
+    if band is None:
+        return None
+    return min(max(float(band) / MAX_BAND, 0.0), 1.0)
+
+
+def session_performance(session: PracticeSession) -> float | None:
+    """
+    A graded practice session as a 0-1 performance, or None if it has no
+    result yet. Sessions the student abandoned (no completed_at) have none:
+    listening, for one, sets its question count before the answers come in.
+    """
+    if session.completed_at is None:
+        return None
+    if session.section.startswith(BAND_SECTIONS):
+        return band_performance(session.score)
+    if not session.total_questions:
+        return None
+    return (session.correct_answers or 0) / session.total_questions
 
-# Define skill levels and their score thresholds
-SKILL_LEVELS = {
-    "Advanced": 0.81,
-    "Upper-Intermediate": 0.61,
-    "Intermediate": 0.41,
-    "Elementary": 0.21,
-    "Beginner": 0.0,
-}
 
 def update_skill_level_from_session(user: User, session: PracticeSession) -> str | None:
     """
     Updates a user's skill level based on their performance in a practice session.
 
-    Args:
-        user: The User object.
-        session: The PracticeSession object.
+    Returns:
+        The new skill level if it was changed, otherwise None.
+    """
+    return skill_engine.record(user, session_performance(session))
+
+
+def update_skill_level_from_band(user: User, band_score: float | None) -> str | None:
+    """
+    Updates a user's skill level from one band-scored result, such as an essay.
 
     Returns:
         The new skill level if it was changed, otherwise None.
     """
-    if not session.total_questions or session.total_questions == 0:
-        return None
+    return skill_engine.record(user, band_performance(band_score))
+
+
+def _performances(rows) -> tuple[np.ndarray, np.ndarray]:
+    """(user ids, performances) of the graded sessions among (user id, section, correct, total, score) rows."""
+    user_ids, sections, correct, total, score = (np.array(column) for column in zip(*rows))
+    sections = sections.astype(str)
+    banded = np.zeros(len(sections), dtype=bool)
+    for section in BAND_SECTIONS:
+        banded |= np.char.startswith(sections, section)
+    score = np.array([np.nan if s is None else s for s in score], dtype=float)
+    total = total.astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(total > 0, correct.astype(float) / total, np.nan)
+    performances = np.where(banded, np.clip(score / MAX_BAND, 0.0, 1.0), ratio)
+    graded = ~np.isnan(performances)
+    return user_ids[graded].astype(np.int64), performances[graded]
+
+
+def recompute_skill_levels(group_id: int | None = None, engine: SkillEngine = skill_engine) -> int:
+    """
+    Rebuilds the skill score and level of every student in a group, or of
+    every user, from their session history in one pass, and writes the
+    changed ones back with a single bulk UPDATE. Users without a graded
+    session keep their current level.
+
+    Returns:
+        The number of users whose skill level changed.
+    """
+    query = select(
+        PracticeSession.user_id, PracticeSession.section, PracticeSession.correct_answers,
+        PracticeSession.total_questions, PracticeSession.score,
+    ).where(
+        PracticeSession.completed_at.isnot(None)
+    ).order_by(PracticeSession.user_id, PracticeSession.started_at, PracticeSession.id)
+    users = select(User.id, User.skill_level, User.skill_score)
+    if group_id is not None:
+        members = select(GroupMembership.student_id).where(GroupMembership.group_id == group_id)
+        query = query.where(PracticeSession.user_id.in_(members))
+        users = users.where(User.id.in_(members))
+
+    # Streamed in partitions, each turned into arrays straight away.
+    parts = [_performances(p) for p in db.session.execute(query.execution_options(yield_per=YIELD_PER)).partitions()]
+    if not parts:
+        return 0
+    owners, averages = engine.moving_averages(np.concatenate([p[0] for p in parts]),
+                                              np.concatenate([p[1] for p in parts]))
+    levels = [engine.names[i] for i in engine.level_indexes(averages)]
+
+    current = {user_id: (level, score) for user_id, level, score in db.session.execute(users)}
+    rows, changed = [], 0
+    for user_id, average, level in zip(owners.tolist(), averages.tolist(), levels):
+        old_level, old_score = current.get(user_id, (None, None))
+        if old_level != level or old_score is None or not np.isclose(old_score, average):
+            rows.append({"id": user_id, "skill_score": average, "skill_level": level})
+            changed += old_level != level
+    if rows:
+        db.session.execute(update(User), rows)
+    db.session.commit()
+    logger.info(f"Recomputed skill levels for {len(owners)} users; {changed} changed level.")
+    return changed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute skill levels from practice history.")
+    parser.add_argument("--group", type=int, help="Only the students of this group.")
+    args = parser.parse_args(argv)
 
-    score_percent = (session.correct_answers or 0) / session.total_questions
+    from app import create_app
+    app = create_app(os.getenv("FLASK_CONFIG") or "default")
+    with app.app_context():
+        recompute_skill_levels(args.group)
 
-    new_skill_level = "Beginner"
-    for level, threshold in SKILL_LEVELS.items():
-        if score_percent >= threshold:
-            new_skill_level = level
-            break
 
-    if user.skill_level != new_skill_level:
-        user.update_skill_level(new_skill_level)
-        return new_skill_level
-    
-    return None
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
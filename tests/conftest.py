@@ -10,6 +10,8 @@ from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from telegram import Update, User as TelegramUser
 
+# Keep the module-level app in app.py off the development database and background threads.
+os.environ.setdefault('FLASK_CONFIG', 'testing')
 from app import create_app
 from extensions import db
 from models.user import User
@@ -18,6 +20,16 @@ from models import Teacher, TeacherExercise, Group, GroupMembership
 from utils.translation_system import TranslationSystem
 from services.auth_service import AuthService
 
+@pytest.fixture(scope='session', autouse=True)
+def generated_data_files():
+    """Builds the lexicon, spelling index and phrase table up front, as a deploy does."""
+    from utils.lexicon import ensure_lexicon
+    from utils.phrase_index import ensure_phrase_table
+    from utils.spelling import ensure_spelling_index
+    ensure_lexicon()
+    ensure_spelling_index()
+    ensure_phrase_table()
+
 @pytest.fixture(scope='function')
 def app():
     """Create and configure a new app instance for each test function."""
@@ -229,8 +241,8 @@ def mock_openai_service():
     """Mocks the OpenAIService to prevent actual API calls."""
     with patch('handlers.ai_commands_handler.OpenAIService') as mock_service_class:
         mock_instance = mock_service_class.return_value
-        mock_instance.generate_explanation.return_value = "This is a mock explanation."
-        mock_instance.generate_definition.return_value = "This is a mock definition."
+        mock_instance.stream_explanation.return_value = iter(["This is a mock", "This is a mock explanation."])
+        mock_instance.stream_definition.return_value = iter(["This is a mock", "This is a mock definition."])
         yield mock_service_class
 
 @pytest.fixture
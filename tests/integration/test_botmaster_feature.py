@@ -14,6 +14,7 @@ from handlers.botmaster_handler import (
     SELECTING_CONTENT_ACTION,
 )
 from models import User, Teacher, TeacherExercise
+from services.auth_service import AuthService
 
 @pytest.mark.asyncio
 async def test_approve_teacher_start_as_botmaster(
@@ -54,6 +55,7 @@ async def test_approve_pending_teacher_success(
     mock_update.effective_user.id = botmaster_user.user_id
     mock_update.message.text = pending_teacher_user.username
     mock_context.user_data = {}
+    mock_context.bot.send_message = AsyncMock()
 
     assert pending_teacher_user.teacher_profile.is_approved is False
 
@@ -68,6 +70,11 @@ async def test_approve_pending_teacher_success(
     mock_update.message.reply_text.assert_called_once_with(
         text=f"✅ Success! Teacher {pending_teacher_user.username} has been approved."
     )
+    # The teacher is sent the only copy of their token; the database keeps its digest.
+    sent = mock_context.bot.send_message.call_args.kwargs
+    assert sent['chat_id'] == pending_teacher_user.user_id
+    token = sent['text'].split('`')[1]
+    assert AuthService.authenticate(token).user_id == pending_teacher_user.id
 
 @pytest.mark.asyncio
 async def test_approve_already_approved_teacher(
@@ -0,0 +1,116 @@
+import gzip
+import json
+
+import pytest
+from sqlalchemy import event
+
+from extensions import db
+from models import Group, ResourceVersion, TeacherExercise
+
+
+@pytest.fixture
+def logged_in(client, approved_teacher_user):
+    client.post('/login', data={'api_token': 'valid-test-token'})
+    return client
+
+
+@pytest.fixture
+def statements(app):
+    recorded = []
+    record = lambda *args: recorded.append(args[2])
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', record)
+        yield recorded
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def _version(session, key):
+    row = session.get(ResourceVersion, key)
+    return row.version if row else 0
+
+
+def test_unchanged_list_is_answered_with_304_without_querying_it(logged_in, statements):
+    first = logged_in.get('/api/groups')
+    etag = first.headers['ETag']
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    statements.clear()
+    second = logged_in.get('/api/groups', headers={'If-None-Match': etag})
+
+    assert second.status_code == 304
+    assert second.headers['ETag'] == etag
+    assert not [s for s in statements if 'FROM groups' in s]
+
+
+def test_writes_bump_the_owner_version_and_etag(logged_in, session, approved_teacher_user):
+    etag = logged_in.get('/api/groups').headers['ETag']
+    homework_etag = logged_in.get('/api/homework').headers['ETag']
+    key = f"groups:{approved_teacher_user.id}"
+    assert _version(session, key) == 0
+
+    logged_in.post('/api/groups', json={'name': 'Versioned'})
+    assert _version(session, key) == 1
+
+    response = logged_in.get('/api/groups', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert [g['name'] for g in response.get_json()['data']] == ['Versioned']
+    # The homework list shows group names, so it depends on the groups version too.
+    assert logged_in.get('/api/homework', headers={'If-None-Match': homework_etag}).status_code == 200
+
+
+def test_only_tracked_owner_columns_and_real_changes_bump(session, approved_teacher_user):
+    exercise = TeacherExercise(title="T", creator_id=approved_teacher_user.id, exercise_type="reading",
+                               difficulty="easy", content={})
+    session.add(exercise)
+    session.commit()
+    key = f"exercises:{approved_teacher_user.id}"
+    assert _version(session, key) == 1
+
+    exercise.title = exercise.title  # no net change
+    session.commit()
+    assert _version(session, key) == 1
+
+    exercise.creator_id = approved_teacher_user.id + 1
+    session.commit()
+    assert _version(session, key) == 2
+    assert _version(session, f"exercises:{approved_teacher_user.id + 1}") == 1
+
+
+def test_large_lists_are_gzipped_with_an_encoding_specific_etag(logged_in, session, approved_teacher_user):
+    session.add_all([
+        Group(name=f"Group {i}", description="An IELTS preparation group. " * 10, teacher_id=approved_teacher_user.id)
+        for i in range(20)
+    ])
+    session.commit()
+
+    response = logged_in.get('/api/groups', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.headers['ETag'].endswith('-gzip"')
+    assert len(json.loads(gzip.decompress(response.data))['data']) == 20
+
+    etag = response.headers['ETag']
+    revalidated = logged_in.get('/api/groups', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers['ETag'] == etag
+
+
+def test_brotli_is_preferred_when_available(logged_in, session, approved_teacher_user):
+    brotli = pytest.importorskip("brotli")
+    session.add_all([
+        Group(name=f"Group {i}", description="An IELTS preparation group. " * 10, teacher_id=approved_teacher_user.id)
+        for i in range(20)
+    ])
+    session.commit()
+
+    response = logged_in.get('/api/groups', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert len(json.loads(brotli.decompress(response.data))['data']) == 20
+
+
+def test_small_responses_are_not_compressed(logged_in):
+    response = logged_in.get('/api/groups', headers={'Accept-Encoding': 'gzip, br'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_json()['data'] == []
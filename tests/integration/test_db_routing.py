@@ -0,0 +1,122 @@
+"""
+Replica routing against two SQLite databases: the app's in-memory primary
+and a file-backed replica. Each holds a user with the same id but a
+different name, so the name read back shows which database served it.
+"""
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from flask import session as flask_session
+
+from extensions import db
+from models import User
+from services.membership_service import add_members
+from utils.db_routing import LAST_WRITE_KEY, ReplicaRouter, acting_as, read_only, replica_reads
+
+
+def _seed(bind, name):
+    with Session(bind) as s:
+        s.execute(insert(User), [{"id": 1, "user_id": 111, "first_name": name, "joined_at": 0.0}])
+        s.commit()
+
+
+@pytest.fixture
+def router(app, session, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    db.metadata.create_all(engine)
+    _seed(engine, "Replica")
+    _seed(db.engine, "Primary")
+    router = ReplicaRouter(engine, max_staleness=5.0, lag_check_interval=0, lag_probe=lambda e: 0.0)
+    app.extensions['db_replica'] = router
+    yield router
+    app.extensions.pop('db_replica')
+    engine.dispose()
+
+
+def _name(session):
+    name = session.query(User.first_name).filter_by(id=1).scalar()
+    session.commit()
+    return name
+
+
+def test_reads_default_to_primary(router, session):
+    assert _name(session) == "Primary"
+
+
+def test_read_only_scope_uses_replica(router, session):
+    with replica_reads():
+        assert _name(session) == "Replica"
+
+
+def test_stale_or_unreachable_replica_falls_back_to_primary(router, session):
+    router.lag_probe = lambda e: 30.0
+    with replica_reads():
+        assert _name(session) == "Primary"
+
+    def unreachable(engine):
+        raise ConnectionError("replica down")
+    router.lag_probe = unreachable
+    with replica_reads():
+        assert _name(session) == "Primary"
+
+
+def test_writes_and_later_reads_in_the_transaction_stay_on_primary(router, session):
+    with replica_reads():
+        session.add(User(user_id=222, first_name="New", joined_at=0.0))
+        session.flush()
+        assert session.query(User.first_name).filter_by(user_id=222).scalar() == "New"
+        assert session.query(User.first_name).filter_by(id=1).scalar() == "Primary"
+        session.commit()
+        assert _name(session) == "Replica"
+
+
+def test_bulk_updates_in_read_only_scope_go_to_primary(router, session):
+    with replica_reads():
+        session.query(User).filter_by(id=1).update({"first_name": "Renamed"})
+        session.commit()
+    assert _name(session) == "Renamed"
+
+
+def test_commit_makes_reads_sticky_for_the_writer_only(router, session):
+    with acting_as(("telegram", 111)):
+        session.query(User).filter_by(id=1).update({"last_name": "Edited"})
+        session.commit()
+        with replica_reads():
+            assert _name(session) == "Primary"
+
+    with acting_as(("telegram", 999)), replica_reads():
+        assert _name(session) == "Replica"
+
+
+def test_core_inserts_make_reads_sticky(router, session):
+    with acting_as(("telegram", 111)):
+        add_members(1, [1])
+        with replica_reads():
+            assert _name(session) == "Primary"
+
+
+def test_dashboard_stickiness_is_kept_in_the_login_session(app, router, session):
+    with app.test_request_context(), acting_as(("web", 1)):
+        session.query(User).filter_by(id=1).update({"last_name": "Edited"})
+        session.commit()
+        assert LAST_WRITE_KEY in flask_session
+
+        # Another worker has not seen the write, but the session cookie carries it.
+        other_worker = ReplicaRouter(router.engine, max_staleness=5.0, lag_check_interval=0, lag_probe=lambda e: 0.0)
+        app.extensions['db_replica'] = other_worker
+        with replica_reads():
+            assert _name(session) == "Primary"
+        flask_session.pop(LAST_WRITE_KEY)
+        with replica_reads():
+            assert _name(session) == "Replica"
+
+
+@pytest.mark.asyncio
+async def test_read_only_decorator_wraps_handlers(router, session):
+    @read_only
+    async def report():
+        return _name(session)
+
+    assert await report() == "Replica"
+    assert _name(session) == "Primary"
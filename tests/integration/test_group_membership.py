@@ -1,4 +1,5 @@
 import pytest
+from sqlalchemy import event
 from app import db
 from models import User, Group, GroupMembership
 
@@ -105,4 +106,54 @@ def test_remove_member_unauthorized(client, another_teacher_user, regular_user,
     res = client.delete(f'/api/groups/{group.id}/members/{regular_user.id}')
     assert res.status_code == 404 # or 403
     
-    assert db.session.query(GroupMembership).count() == 1 
\ No newline at end of file
+    assert db.session.query(GroupMembership).count() == 1 
+def test_bulk_add_members_reports_each_item(client, approved_teacher_user, regular_user, session):
+    """Test adding a class in one request, with per-item results."""
+    with client.session_transaction() as sess:
+        sess['user_id'] = approved_teacher_user.id
+
+    group = Group(name="Bulk Group", teacher_id=approved_teacher_user.id)
+    students = [User(user_id=5000 + i, first_name=f"Student {i}", username=f"student{i}") for i in range(3)]
+    session.add_all([group, *students])
+    session.flush()
+    session.add(GroupMembership(group_id=group.id, student_id=regular_user.id))
+    session.commit()
+
+    statements = []
+    record = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        res = client.post(f'/api/groups/{group.id}/members/bulk', json={'students': [
+            students[0].id, '@Student1', str(students[2].id), regular_user.id, 'student1', 'ghost', None,
+        ]})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert res.status_code == 200
+    data = res.get_json()['data']
+    assert data['added'] == 3
+    assert [r['status'] for r in data['results']] == [
+        'added', 'added', 'added', 'already_member', 'duplicate', 'not_found', 'invalid',
+    ]
+    assert data['results'][1]['student_id'] == students[1].id
+    assert db.session.query(GroupMembership).filter_by(group_id=group.id).count() == 4
+    # One lookup and one insert, however many students are listed.
+    assert len([s for s in statements if 'lower(users.username) IN' in s]) == 1
+    assert len([s for s in statements if s.startswith('INSERT INTO group_memberships')]) == 1
+
+def test_bulk_add_members_validation(client, another_teacher_user, approved_teacher_user, regular_user, session):
+    """Test that bulk adds need an owned group and a list of students."""
+    group = Group(name="Owned Group", teacher_id=approved_teacher_user.id)
+    session.add(group)
+    session.commit()
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = another_teacher_user.id
+    res = client.post(f'/api/groups/{group.id}/members/bulk', json={'students': [regular_user.id]})
+    assert res.status_code == 404
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = approved_teacher_user.id
+    assert client.post(f'/api/groups/{group.id}/members/bulk', json={'students': []}).status_code == 400
+    assert client.post(f'/api/groups/{group.id}/members/bulk', json={'students': list(range(501))}).status_code == 400
+    assert db.session.query(GroupMembership).count() == 0
@@ -12,7 +12,7 @@ from handlers.practice_handler import (
     practice_section_callback,
     PRACTICE_CALLBACK_READING,
 )
-from handlers.ai_commands_handler import explain_command, define_command
+from handlers.ai_commands_handler import explain_command, define_command, define_suggestion_callback
 from handlers.teacher_handler import (
     create_group_start,
     get_group_name,
@@ -121,7 +121,7 @@ async def test_practice_section_callback(sample_user, mock_update, mock_context)
 async def test_explain_command(mock_openai_service_class, mock_update, mock_context):
     """Test the /explain command with a mocked AI service."""
     mock_service_instance = mock_openai_service_class.return_value
-    mock_service_instance.generate_explanation.return_value = "This is a mock explanation."
+    mock_service_instance.stream_explanation.return_value = iter(["This is a mock", "This is a mock explanation."])
 
     mock_context.args = ["grammar", "present", "perfect"]
     await explain_command(mock_update, mock_context)
@@ -138,7 +138,7 @@ async def test_explain_command(mock_openai_service_class, mock_update, mock_cont
 async def test_define_command(mock_openai_service_class, mock_update, mock_context):
     """Test the /define command with a mocked AI service."""
     mock_service_instance = mock_openai_service_class.return_value
-    mock_service_instance.generate_definition.return_value = "This is a mock definition."
+    mock_service_instance.stream_definition.return_value = iter(["This is a", "This is a mock definition."])
 
     mock_context.args = ["elaborate"]
     await define_command(mock_update, mock_context)
@@ -149,6 +149,47 @@ async def test_define_command(mock_openai_service_class, mock_update, mock_conte
     assert "Definition for *elaborate*:" in call_args[0]
     assert "This is a mock definition." in call_args[0]
 
+@pytest.mark.asyncio
+@patch("handlers.ai_commands_handler.OpenAIService")
+async def test_define_command_rejects_unknown_word(mock_openai_service_class, mock_update, mock_context):
+    """Misspelled words are turned away before any AI call."""
+    mock_context.args = ["qwzxv"]
+    await define_command(mock_update, mock_context)
+
+    mock_update.message.reply_text.assert_called_once()
+    assert "couldn't find" in mock_update.message.reply_text.call_args[0][0]
+    mock_openai_service_class.return_value.stream_definition.assert_not_called()
+
+@pytest.mark.asyncio
+@patch("handlers.ai_commands_handler.OpenAIService")
+async def test_define_command_offers_spelling_suggestions(mock_openai_service_class, mock_update, mock_context):
+    """A near miss gets 'Did you mean' buttons instead of a dead end."""
+    mock_context.args = ["recieve"]
+    await define_command(mock_update, mock_context)
+
+    call_args, call_kwargs = mock_update.message.reply_text.call_args
+    assert "Did you mean" in call_args[0]
+    buttons = call_kwargs["reply_markup"].inline_keyboard[0]
+    assert buttons[0].text == "receive"
+    assert buttons[0].callback_data == "define_receive"
+    mock_openai_service_class.return_value.stream_definition.assert_not_called()
+
+@pytest.mark.asyncio
+@patch("handlers.ai_commands_handler.OpenAIService")
+async def test_define_suggestion_callback(mock_openai_service_class, mock_update, mock_context):
+    """Picking a suggestion streams its definition into the same message."""
+    mock_openai_service_class.return_value.stream_definition.return_value = iter(["To get something."])
+    mock_update.callback_query.data = "define_receive"
+    mock_update.callback_query.message.edit_text = AsyncMock()
+
+    await define_suggestion_callback(mock_update, mock_context)
+
+    mock_update.callback_query.answer.assert_called_once()
+    mock_openai_service_class.return_value.stream_definition.assert_called_once_with(word="receive", language="en")
+    final_text = mock_update.callback_query.message.edit_text.call_args[0][0]
+    assert "Definition for *receive*:" in final_text
+    assert "To get something." in final_text
+
 @pytest.mark.asyncio
 async def test_unknown_command(mock_update, mock_context):
     """Test the unknown command handler."""
@@ -543,4 +584,62 @@ async def test_student_progress_command(mock_update, mock_context, approved_teac
     assert "Reading*: 5/10" in call_kwargs['text']
     assert "Writing Band*: 6.5" in call_kwargs['text']
     assert "Speaking Band*: 7.0" in call_kwargs['text']
-    assert "Listening*: 25/40" in call_kwargs['text']
\ No newline at end of file
+    assert "Listening*: 25/40" in call_kwargs['text']
+    assert "closely match" not in call_kwargs['text']
+
+
+@pytest.mark.asyncio
+async def test_student_progress_flags_near_duplicate_essays(mock_update, mock_context, approved_teacher_user, sample_student_with_group, session):
+    """Essays that closely match another student's are pointed out in the progress report."""
+    from handlers.teacher_handler import show_student_progress
+    from services.essay_dedup_service import fingerprint_essay, record_essay
+
+    student = sample_student_with_group
+    classmate = User(user_id=999001, first_name="Classmate")
+    session.add(classmate)
+    session.commit()
+    essay = (
+        "Many people think that working from home is better for employees, because they save time on "
+        "commuting and can organise their day more freely. However, others feel isolated from colleagues."
+    )
+    record_essay(fingerprint_essay(essay, "Q"), classmate.id)
+    session.commit()
+    record_essay(fingerprint_essay(essay.upper(), "Q"), student.id)
+    session.commit()
+
+    mock_update.callback_query.from_user.id = approved_teacher_user.user_id
+    mock_update.callback_query.data = f"sp_student_{student.id}"
+    await show_student_progress(mock_update, mock_context)
+
+    report = mock_update.callback_query.edit_message_text.call_args.kwargs['text']
+    assert f"1 of {student.first_name}'s essays closely match an earlier essay by another student." in report
+
+@pytest.mark.asyncio
+async def test_add_students_flow_adds_by_telegram_id_and_username(mock_update, mock_context, approved_teacher_user, regular_user, session):
+    """A teacher picks a group and sends a list of students, which is added in one go."""
+    from handlers.teacher_handler import (
+        add_students_start, select_group_for_adding_students, receive_student_list,
+        SELECT_GROUP_FOR_ADDING, RECEIVE_STUDENT_LIST,
+    )
+    group = Group(name="Evening Class", teacher_id=approved_teacher_user.teacher_profile.id)
+    classmate = User(user_id=424242, first_name="Classmate", username="classmate")
+    session.add_all([group, classmate])
+    session.commit()
+
+    mock_update.effective_user.id = approved_teacher_user.user_id
+    assert await add_students_start(mock_update, mock_context) == SELECT_GROUP_FOR_ADDING
+    keyboard = mock_update.message.reply_text.call_args.kwargs['reply_markup'].inline_keyboard
+    assert keyboard[0][0].callback_data == f"as_group_{group.id}"
+
+    mock_update.callback_query.data = f"as_group_{group.id}"
+    assert await select_group_for_adding_students(mock_update, mock_context) == RECEIVE_STUDENT_LIST
+    assert "'Evening Class'" in mock_update.callback_query.edit_message_text.call_args.kwargs['text']
+
+    mock_update.message.text = f"{regular_user.user_id}, @Classmate\nnobody"
+    assert await receive_student_list(mock_update, mock_context) == ConversationHandler.END
+
+    reply = mock_update.message.reply_text.call_args.args[0]
+    assert "2 student(s) added, 0 already in the group." in reply
+    assert "Not found: nobody." in reply
+    assert {m.student_id for m in session.query(GroupMembership).filter_by(group_id=group.id)} == {regular_user.id, classmate.id}
+    assert 'add_students_group_id' not in mock_context.user_data
@@ -10,7 +10,15 @@ from handlers.teacher_handler import (
     SELECTING_GROUP,
     SELECTING_EXERCISE,
 )
-from models import User, Teacher, Group, TeacherExercise, Homework
+from handlers.homework_handler import (
+    my_homework_command,
+    select_homework,
+    receive_choice,
+    receive_text_answer,
+    SELECT_HOMEWORK,
+    ANSWER_QUESTION,
+)
+from models import User, Teacher, Group, TeacherExercise, Homework, GroupMembership, HomeworkSubmission
 
 
 @pytest.mark.asyncio
@@ -102,4 +110,70 @@ async def test_cancel_homework_assignment(
 
     assert result == ConversationHandler.END
     assert "homework_group_id" not in mock_context.user_data
-    assert "assignment has been cancelled" in mock_update.callback_query.edit_message_text.call_args[1]['text'].lower() 
\ No newline at end of file
+    assert "assignment has been cancelled" in mock_update.callback_query.edit_message_text.call_args[1]['text'].lower() 
+
+@pytest.fixture
+def student_with_homework(session, sample_teacher_with_group, regular_user):
+    """Puts regular_user in the teacher's group and assigns a two-question reading exercise."""
+    teacher = sample_teacher_with_group
+    group = session.query(Group).filter_by(name="Test Group").one()
+    exercise = TeacherExercise(
+        title="Skimming", exercise_type="reading", difficulty="easy", is_published=True,
+        creator_id=teacher.teacher_profile.id,
+        content={"questions": [
+            {"text": "Main idea?", "options": ["Cities", "Rivers"], "correct_option_index": 0},
+            {"text": "One word for the author's tone?", "answer": "neutral"},
+        ]},
+    )
+    session.add(exercise)
+    session.flush()
+    homework = Homework(exercise_id=exercise.id, group_id=group.id, assigned_by_id=teacher.teacher_profile.id)
+    session.add_all([homework, GroupMembership(group_id=group.id, student_id=regular_user.id)])
+    session.commit()
+    return homework
+
+
+@pytest.mark.asyncio
+async def test_my_homework_flow_stores_submission_and_acknowledges(
+    mock_update: MagicMock, mock_context: MagicMock, regular_user: User, student_with_homework: Homework, session
+):
+    """The student answers by button and by text; the submission is stored and acknowledged without a score yet."""
+    mock_update.effective_user.id = regular_user.user_id
+    mock_update.callback_query = None
+    assert await my_homework_command(mock_update, mock_context) == SELECT_HOMEWORK
+    keyboard = mock_update.message.reply_text.call_args[1]['reply_markup'].inline_keyboard
+    assert keyboard[0][0].callback_data == f"mh_hw_{student_with_homework.id}"
+
+    query = MagicMock(data=f"mh_hw_{student_with_homework.id}", from_user=mock_update.effective_user)
+    query.answer, query.edit_message_text = AsyncMock(), AsyncMock()
+    mock_update.callback_query = query
+    assert await select_homework(mock_update, mock_context) == ANSWER_QUESTION
+    assert "Question 1/2" in query.edit_message_text.call_args[1]['text']
+
+    assert query.edit_message_text.call_args[1]['reply_markup'].inline_keyboard[1][0].callback_data == "mh_ans_0_1"
+    query.data = "mh_ans_0_0"
+    assert await receive_choice(mock_update, mock_context) == ANSWER_QUESTION
+    assert "Question 2/2" in query.edit_message_text.call_args[1]['text']
+    # A second tap on the first question's buttons does not answer the second question.
+    query.data = "mh_ans_0_1"
+    assert await receive_choice(mock_update, mock_context) == ANSWER_QUESTION
+    assert mock_context.user_data['homework_answers'] == [0]
+
+    mock_update.callback_query = None
+    mock_update.message.text = " Neutral "
+    assert await receive_text_answer(mock_update, mock_context) == ConversationHandler.END
+    assert "submitted" in mock_update.message.reply_text.call_args[1]['text'].lower()
+
+    submission = session.query(HomeworkSubmission).one()
+    assert (submission.student_id, submission.content, submission.score) == (
+        regular_user.id, {"answers": [0, "Neutral"]}, None
+    )
+    assert mock_context.user_data == {}
+
+
+@pytest.mark.asyncio
+async def test_my_homework_with_nothing_pending(mock_update: MagicMock, mock_context: MagicMock, regular_user: User):
+    """A student without outstanding homework is told so and the conversation ends."""
+    mock_update.effective_user.id = regular_user.user_id
+    assert await my_homework_command(mock_update, mock_context) == ConversationHandler.END
+    assert "no homework" in mock_update.message.reply_text.call_args[0][0].lower()
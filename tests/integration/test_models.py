@@ -1,5 +1,6 @@
 import pytest
 import time
+from datetime import datetime
 from models.user import User
 from models.practice_session import PracticeSession
 
@@ -63,7 +64,7 @@ def test_skill_level_updates_from_reading_session(sample_user, session):
     Tests that a user's skill level is correctly updated from 'Beginner'
     to 'Advanced' after a high-scoring reading practice session.
     """
-    from handlers.reading_practice_handler import _update_skill_level as update_skill_from_reading
+    from services.skill_assessment_service import update_skill_level_from_session as update_skill_from_reading
     
     assert sample_user.skill_level == "Beginner"
 
@@ -73,6 +74,7 @@ def test_skill_level_updates_from_reading_session(sample_user, session):
         section="reading",
         total_questions=10,
         correct_answers=9,
+        completed_at=datetime.utcnow(),
     )
     session.add(practice_session)
     session.commit()
@@ -88,7 +90,7 @@ def test_skill_level_updates_from_writing_session(sample_user, session):
     Tests that a user's skill level is correctly updated from 'Beginner'
     to 'Upper-Intermediate' after a good writing practice session.
     """
-    from handlers.writing_practice_handler import _update_skill_level as update_skill_from_writing
+    from services.skill_assessment_service import update_skill_level_from_band as update_skill_from_writing
     
     assert sample_user.skill_level == "Beginner"
 
@@ -104,7 +106,7 @@ def test_skill_level_no_update_for_low_score(sample_user, session):
     """
     Tests that a user's skill level does not change if the score is too low.
     """
-    from handlers.reading_practice_handler import _update_skill_level as update_skill_from_reading
+    from services.skill_assessment_service import update_skill_level_from_session as update_skill_from_reading
 
     assert sample_user.skill_level == "Beginner"
 
@@ -114,6 +116,7 @@ def test_skill_level_no_update_for_low_score(sample_user, session):
         section="reading",
         total_questions=10,
         correct_answers=1,
+        completed_at=datetime.utcnow(),
     )
     session.add(practice_session)
     session.commit()
@@ -0,0 +1,259 @@
+"""
+Query-plan regression tests for the app's hot queries.
+
+Each query below mirrors one the bot or web app runs on a hot path. The
+schema is seeded, statistics are gathered, and the database is asked for
+its plan; a test fails as soon as any table in a plan is read with a full
+scan instead of an index.
+
+SQLite runs everywhere. To check the Postgres plans as well, point
+TEST_POSTGRES_URL at an empty scratch database:
+
+    TEST_POSTGRES_URL=postgresql://localhost/ielts_plans pytest tests/integration/test_query_plans.py
+"""
+import os
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models import (
+    AIUsageRecord,
+    EssayFingerprint,
+    EssayFingerprintBand,
+    GradingBatch,
+    Group,
+    GroupMembership,
+    Homework,
+    HomeworkSubmission,
+    PracticeAttempt,
+    PracticeSession,
+    Teacher,
+    TeacherExercise,
+    User,
+)
+from services.reminder_service import due_reminders_query
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+STUDENTS = 200
+SESSIONS_PER_STUDENT = 10
+SINCE = datetime(2026, 10, 1)
+
+HOT_QUERIES = {
+    # Every bot update: the sender's user row
+    "user_by_telegram_id": lambda: select(User).where(User.user_id == 1000042),
+    # Web logins that miss the token cache
+    "teacher_by_api_token": lambda: (
+        select(Teacher.id, Teacher.is_approved, User.id, User.first_name)
+        .join(User, Teacher.user_id == User.id)
+        .where(Teacher.api_token_hash == "digest-3")
+        .limit(1)
+    ),
+    # Teacher commands: the teacher's groups and their members
+    "groups_by_teacher": lambda: select(Group).where(Group.teacher_id == 3),
+    "members_by_group": lambda: select(GroupMembership).where(GroupMembership.group_id == 7),
+    # /api/students/<id>/progress
+    "student_sessions_by_recency": lambda: (
+        select(PracticeSession).where(PracticeSession.user_id == 42).order_by(PracticeSession.completed_at.desc())
+    ),
+    # /api/analytics/groups/<id> and the /group_analytics command
+    "group_average_score_by_section": lambda: (
+        select(PracticeSession.section, func.avg(PracticeSession.score))
+        .where(PracticeSession.user_id.in_([40, 41, 42, 43]))
+        .group_by(PracticeSession.section)
+    ),
+    "group_homework_stats": lambda: (
+        select(func.count(Homework.id), func.count(HomeworkSubmission.id), func.avg(HomeworkSubmission.score))
+        .select_from(Homework)
+        .outerjoin(HomeworkSubmission, Homework.id == HomeworkSubmission.homework_id)
+        .where(Homework.group_id == 7)
+    ),
+    # /api/analytics/exercises/<id>
+    "submission_scores_by_homework": lambda: (
+        select(HomeworkSubmission.score).where(HomeworkSubmission.homework_id.in_([3, 4, 5]))
+    ),
+    # Batch grader
+    "ungraded_writing_submissions": lambda: (
+        select(HomeworkSubmission.id, HomeworkSubmission.content, TeacherExercise)
+        .join(Homework, HomeworkSubmission.homework_id == Homework.id)
+        .join(TeacherExercise, Homework.exercise_id == TeacherExercise.id)
+        .where(
+            HomeworkSubmission.score.is_(None),
+            HomeworkSubmission.grading_batch_id.is_(None),
+            TeacherExercise.exercise_type == "writing",
+        )
+        .order_by(HomeworkSubmission.id)
+        .limit(500)
+    ),
+    # Reminder scheduler tick: students yet to submit homework due in the next slice
+    "due_homework_reminders": lambda: due_reminders_query(datetime(2026, 10, 19), datetime(2026, 10, 19, 0, 5)),
+    # Every AI call: the user's token spend today
+    "ai_tokens_used_today": lambda: (
+        select(func.sum(AIUsageRecord.prompt_tokens + AIUsageRecord.completion_tokens))
+        .where(AIUsageRecord.user_id == 1000042, AIUsageRecord.created_at >= SINCE)
+    ),
+    # Attempt detail for one session
+    "attempts_by_session": lambda: (
+        select(PracticeAttempt).where(PracticeAttempt.session_id == 420).order_by(PracticeAttempt.ordinal)
+    ),
+    # Every essay: the exact-duplicate and near-duplicate lookups
+    "cached_essay_feedback": lambda: (
+        select(PracticeAttempt)
+        .join(EssayFingerprint, EssayFingerprint.practice_session_id == PracticeAttempt.session_id)
+        .where(EssayFingerprint.prompt_hash == "prompt-3", EssayFingerprint.content_hash == "content-42")
+        .order_by(EssayFingerprint.id.desc())
+        .limit(1)
+    ),
+    "near_duplicate_candidates": lambda: (
+        select(EssayFingerprint)
+        .join(EssayFingerprintBand)
+        .where(EssayFingerprintBand.band_key.in_([42, 4242, 424242]))
+        .distinct()
+        .order_by(EssayFingerprint.id.desc())
+        .limit(50)
+    ),
+}
+
+
+def _seed(session: Session) -> None:
+    """Fills every table a hot query touches with enough rows for the planner to prefer indexes."""
+    rng = random.Random(0)
+    now = datetime(2026, 10, 18)
+    teacher_users = [{"id": i, "user_id": 1000000 + i, "first_name": f"Teacher {i}", "joined_at": 0.0} for i in range(1, 11)]
+    students = [
+        {"id": i, "user_id": 1000000 + i, "first_name": f"Student {i}", "joined_at": 0.0}
+        for i in range(11, 11 + STUDENTS)
+    ]
+    session.execute(insert(User), teacher_users + students)
+    session.execute(insert(Teacher), [
+        {"id": i, "user_id": i, "api_token_hash": f"digest-{i}", "is_approved": True, "created_at": now} for i in range(1, 11)
+    ])
+    session.execute(insert(Group), [
+        {"id": i, "name": f"Group {i}", "teacher_id": 1 + i % 10, "created_at": now} for i in range(1, 41)
+    ])
+    session.execute(insert(GroupMembership), [
+        {"group_id": 1 + (s["id"] + k) % 40, "student_id": s["id"], "joined_at": now} for s in students for k in range(2)
+    ])
+    session.execute(insert(TeacherExercise), [
+        {"id": i, "creator_id": 1 + i % 10, "title": f"Exercise {i}", "exercise_type": rng.choice(["writing", "reading"]),
+         "content": {}, "difficulty": "medium", "created_at": now, "is_published": True}
+        for i in range(1, 51)
+    ])
+    session.execute(insert(Homework), [
+        {"id": i, "exercise_id": 1 + i % 50, "group_id": 1 + i % 40, "assigned_by_id": 1 + i % 10, "assigned_at": now,
+         "due_date": now + timedelta(hours=i)}
+        for i in range(1, 201)
+    ])
+    session.execute(insert(GradingBatch), [
+        {"id": i, "backend": "openai", "provider_batch_id": f"batch-{i}", "status": "completed", "submitted_at": now}
+        for i in range(1, 31)
+    ])
+    # As in production, nearly every submission has been through a grading batch; one in twenty waits for the next.
+    session.execute(insert(HomeworkSubmission), [
+        {"homework_id": 1 + i % 200, "student_id": 11 + (i % 200 + i // 200) % STUDENTS, "submitted_at": now,
+         "content": {"essay": "..."},
+         "score": None if i % 20 == 0 else rng.choice([55, 70, 85]),
+         "grading_batch_id": None if i % 20 == 0 else 1 + i // 100}
+        for i in range(3000)
+    ])
+    sessions = [
+        {"id": s["id"] * SESSIONS_PER_STUDENT + k, "user_id": s["id"], "section": rng.choice(["reading", "writing", "speaking", "listening"]),
+         "score": rng.uniform(4, 9), "total_questions": 1, "correct_answers": 1,
+         "started_at": now - timedelta(days=k), "completed_at": now - timedelta(days=k)}
+        for s in students for k in range(SESSIONS_PER_STUDENT)
+    ]
+    session.execute(insert(PracticeSession), sessions)
+    session.execute(insert(PracticeAttempt), [
+        {"session_id": ps["id"], "ordinal": n, "question": "Q", "answer": "A", "feedback": {}, "band": 6.5, "created_at": now}
+        for ps in sessions for n in (1, 2)
+    ])
+    session.execute(insert(AIUsageRecord), [
+        {"user_id": 1000000 + rng.randrange(11, 11 + STUDENTS), "created_at": now - timedelta(hours=i),
+         "feature": "writing_feedback", "method": "provide_writing_feedback", "model": "gpt-4o",
+         "prompt_tokens": 900, "completion_tokens": 400, "latency_ms": 2500.0, "cost_usd": 0.01, "outcome": "ok"}
+        for i in range(3000)
+    ])
+    session.execute(insert(EssayFingerprint), [
+        {"id": i, "user_id": 11 + i % STUDENTS, "practice_session_id": sessions[i]["id"], "prompt_hash": f"prompt-{i % 20}",
+         "content_hash": f"content-{i}", "signature": b"\0" * 8, "created_at": now}
+        for i in range(1, 1001)
+    ])
+    session.execute(insert(EssayFingerprintBand), [
+        {"band_key": rng.getrandbits(62), "fingerprint_id": i} for i in range(1, 1001) for _ in range(16)
+    ])
+    session.commit()
+
+
+def _compile(connection, statement) -> str:
+    return str(statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+
+
+def sqlite_full_scans(connection, statement) -> list[str]:
+    """The steps of an SQLite plan that read a whole table or index."""
+    plan = connection.execute(text("EXPLAIN QUERY PLAN " + _compile(connection, statement))).fetchall()
+    return [row[3] for row in plan if row[3].startswith("SCAN ")]
+
+
+def postgres_seq_scans(connection, statement) -> list[str]:
+    """
+    The tables a Postgres plan reads sequentially. Sequential scans are
+    discouraged first, so one only appears when no index can serve the query.
+    """
+    connection.execute(text("SET enable_seqscan = off"))
+    plan = connection.execute(text("EXPLAIN (FORMAT JSON) " + _compile(connection, statement))).scalar()
+    scans, nodes = [], [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node["Node Type"] == "Seq Scan":
+            scans.append(node["Relation Name"])
+        nodes.extend(node.get("Plans", []))
+    return scans
+
+
+@pytest.fixture
+def seeded_sqlite(session):
+    _seed(session)
+    session.execute(text("ANALYZE"))
+    yield session.connection()
+
+
+@pytest.fixture(scope="module")
+def seeded_postgres():
+    if not POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    engine = create_engine(POSTGRES_URL)
+    db.metadata.create_all(engine)
+    try:
+        with Session(engine) as session:
+            _seed(session)
+        with engine.connect() as connection:
+            connection.execute(text("ANALYZE"))
+            connection.commit()
+        with engine.connect() as connection:
+            yield connection
+    finally:
+        db.metadata.drop_all(engine)
+        engine.dispose()
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_sqlite_plan_has_no_full_scans(seeded_sqlite, name):
+    scans = sqlite_full_scans(seeded_sqlite, HOT_QUERIES[name]())
+    assert not scans, f"{name} reads without an index: {scans}"
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_postgres_plan_has_no_seq_scans(seeded_postgres, name):
+    scans = postgres_seq_scans(seeded_postgres, HOT_QUERIES[name]())
+    assert not scans, f"{name} sequentially scans {scans}"
+
+
+def test_plan_check_catches_unindexed_filters(seeded_sqlite):
+    """The check itself: a filter on an unindexed column must be reported."""
+    scans = sqlite_full_scans(seeded_sqlite, select(PracticeSession).where(PracticeSession.section == "writing"))
+    assert scans == ["SCAN practice_sessions"]
+
@@ -4,6 +4,7 @@ from telegram import Update
 from telegram.ext import ConversationHandler
 from sqlalchemy.orm import Session
 import os
+import threading
 
 from handlers.speaking_practice_handler import (
     start_speaking_practice,
@@ -14,6 +15,7 @@ from handlers.speaking_practice_handler import (
     AWAITING_VOICE,
 )
 from models import User, PracticeSession
+from services.skill_assessment_service import recompute_skill_levels
 
 
 @pytest.mark.asyncio
@@ -76,6 +78,22 @@ async def test_handle_part_1(mock_update: Update, mock_context: MagicMock):
         mock_update.callback_query.edit_message_text.assert_called_once()
         assert "Test question?" in mock_update.callback_query.edit_message_text.call_args[1]['text']
 
+@pytest.mark.asyncio
+async def test_question_is_generated_off_the_event_loop(mock_update: Update, mock_context: MagicMock):
+    """OpenAI calls block while waiting for a slot or backing off, so they run in a worker thread."""
+    mock_update.callback_query.answer = AsyncMock()
+    mock_update.callback_query.edit_message_text = AsyncMock()
+    threads = []
+
+    def generate(self, **kwargs):
+        threads.append(threading.get_ident())
+        return {"question": "Test question?"}
+
+    with patch('services.openai_service.OpenAIService.generate_speaking_question', generate):
+        await handle_part_1(mock_update, mock_context)
+
+    assert threads and threads[0] != threading.get_ident()
+
 @pytest.mark.asyncio
 @patch("os.remove")
 @patch("os.path.exists", return_value=True)
@@ -132,8 +150,14 @@ async def test_handle_voice_message_part_1(
     session.refresh(practice_session)
     assert practice_session.total_questions == 1
     assert practice_session.score == 7.5
-    assert len(practice_session.session_data) == 1
-    assert practice_session.session_data[0]["transcript"] == "This is a test transcript."
+    assert practice_session.session_data is None
+    assert len(practice_session.attempts) == 1
+    attempt = practice_session.attempts[0]
+    assert attempt.ordinal == 1
+    assert attempt.answer == "This is a test transcript."
+    assert attempt.band == 7.5
+    assert attempt.details["part"] == 1
+    assert attempt.latency_ms >= 0
     
     mock_remove.assert_called_once()
     assert mock_update.message.reply_text.call_count == 3
@@ -197,6 +221,98 @@ async def test_handle_voice_message_sends_recommendation(
     assert reply_markup.inline_keyboard[0][0].callback_data == "practice_writing"
 
 
+@pytest.mark.asyncio
+@patch("os.remove")
+@patch("os.path.exists", return_value=True)
+@patch("builtins.open")
+@patch("services.openai_service.OpenAIService.speech_to_text", return_value="Test transcript.")
+@patch("services.openai_service.OpenAIService.generate_speaking_feedback")
+async def test_handle_voice_message_sends_model_answer(
+    mock_generate_feedback: MagicMock,
+    mock_speech_to_text: MagicMock,
+    mock_open: MagicMock,
+    mock_exists: MagicMock,
+    mock_remove: MagicMock,
+    mock_update: Update,
+    mock_context: MagicMock,
+    sample_user: User,
+    session: Session,
+):
+    """A question served from the seed corpus is followed up with its model answer."""
+    mock_update.message.voice.file_id = "test_file_id"
+    mock_update.message.reply_text = AsyncMock()
+
+    practice_session = PracticeSession(user_id=sample_user.id, section="speaking")
+    session.add(practice_session)
+    session.commit()
+
+    with patch('handlers.speaking_practice_handler.db.session', session):
+        mock_update.message.from_user.id = sample_user.user_id
+        mock_context.user_data = {
+            "practice_session_id": practice_session.id,
+            "speaking_part": 1,
+            "speaking_question": "Do you have a lot of furniture in your home?",
+            "speaking_model_answer": {"answer": "I have quite a bit actually.", "vocabulary": ["quite a bit"]},
+        }
+        mock_context.bot.get_file.return_value = AsyncMock()
+        mock_generate_feedback.return_value = {"estimated_band": 7.0}
+
+        await handle_voice_message(mock_update, mock_context)
+
+    model_answer = mock_update.message.reply_text.call_args_list[2].args[0]
+    assert "model answer" in model_answer
+    assert "I have quite a bit actually." in model_answer
+    assert "Useful vocabulary: quite a bit" in model_answer
+    assert "speaking_model_answer" not in mock_context.user_data
+
+
+@pytest.mark.asyncio
+@patch("handlers.speaking_practice_handler._get_recommendation", return_value="writing")
+@patch("os.remove")
+@patch("os.path.exists", return_value=True)
+@patch("builtins.open")
+@patch("services.openai_service.OpenAIService.generate_speaking_question", return_value={"question": "Why?"})
+@patch("services.openai_service.OpenAIService.speech_to_text", return_value="Test transcript.")
+@patch("services.openai_service.OpenAIService.generate_speaking_feedback")
+async def test_live_skill_updates_match_the_nightly_recompute(
+    mock_generate_feedback: MagicMock,
+    mock_speech_to_text: MagicMock,
+    mock_generate_question: MagicMock,
+    mock_open: MagicMock,
+    mock_exists: MagicMock,
+    mock_remove: MagicMock,
+    mock_get_recommendation: MagicMock,
+    mock_update: Update,
+    mock_context: MagicMock,
+    sample_user: User,
+    session: Session,
+):
+    """A speaking session counts once towards the skill level, however many parts it has."""
+    mock_update.message.reply_text = AsyncMock()
+    mock_update.message.from_user.id = sample_user.user_id
+    mock_context.bot.get_file.return_value = AsyncMock()
+    mock_generate_feedback.side_effect = [{"estimated_band": band} for band in (7.5, 4.0, 6.0)]
+
+    with patch('handlers.speaking_practice_handler.db.session', session):
+        for parts in ([1], [2, 3]):
+            practice_session = PracticeSession(user_id=sample_user.id, section="speaking")
+            session.add(practice_session)
+            session.commit()
+            mock_context.user_data = {"practice_session_id": practice_session.id, "speaking_part": parts[0]}
+            for _ in parts:
+                await handle_voice_message(mock_update, mock_context)
+            assert practice_session.completed_at is not None
+
+    live = (sample_user.skill_level, sample_user.skill_score)
+    sample_user.skill_level, sample_user.skill_score = "Beginner", None
+    session.commit()
+
+    recompute_skill_levels()
+    session.expire_all()
+    assert sample_user.skill_level == live[0]
+    assert sample_user.skill_score == pytest.approx(live[1])
+
+
 @pytest.mark.asyncio
 async def test_cancel_flow(
     mock_update: Update,
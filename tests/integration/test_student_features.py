@@ -91,7 +91,7 @@ async def test_explain_command_with_valid_query(mock_update, mock_context, mock_
     await explain_command(mock_update, mock_context)
     
     # Check that the AI service was called
-    mock_openai_service.return_value.generate_explanation.assert_called_once_with(
+    mock_openai_service.return_value.stream_explanation.assert_called_once_with(
         query="present perfect", context="grammar", language="en"
     )
     
@@ -111,7 +111,7 @@ async def test_define_command_with_valid_word(mock_update, mock_context, mock_op
     await define_command(mock_update, mock_context)
     
     # Check that the AI service was called
-    mock_openai_service.return_value.generate_definition.assert_called_once_with(
+    mock_openai_service.return_value.stream_definition.assert_called_once_with(
         word="elaborate", language="en"
     )
     
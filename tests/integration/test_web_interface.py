@@ -275,6 +275,22 @@ class TestWebInterface:
         updated_exercise = session.get(TeacherExercise, exercise.id)
         assert updated_exercise.is_published is True
 
+    def test_publish_exercise_with_broken_answer_key(self, client, session, approved_teacher_user):
+        """Publishing is refused when the content does not compile into an answer key."""
+        client.post('/login', data={'api_token': 'valid-test-token'})
+        exercise = TeacherExercise(
+            title="Broken Key", creator_id=approved_teacher_user.id,
+            exercise_type='reading', difficulty='medium', is_published=False,
+            content={'questions': [{'text': 'Q1', 'options': ['a', 'b'], 'correct_option_index': 5}]},
+        )
+        session.add(exercise)
+        session.commit()
+
+        response = client.post(f'/api/exercises/{exercise.id}/publish')
+        assert response.status_code == 400
+        assert 'Question 1' in response.get_json()['error']
+        assert session.get(TeacherExercise, exercise.id).is_published is False
+
     def test_get_group_analytics(self, client, session, approved_teacher_user, regular_user):
         client.post('/login', data={'api_token': 'valid-test-token'})
 
@@ -12,6 +12,16 @@ from handlers.writing_practice_handler import (
 )
 from models import User, PracticeSession
 
+ESSAY = (
+    "Some people believe that university education should be free for everyone, while others argue that "
+    "students should pay for their own studies. In this essay I will discuss both views and give my opinion.\n\n"
+    "On the one hand, free education gives every young person the same chance to succeed. For example, students "
+    "from poor families could study medicine or law without taking on large debts. Moreover, society as a whole "
+    "benefits from a more educated workforce, because graduates earn more and pay more tax.\n\n"
+    "On the other hand, universities are expensive to run, and governments have many other priorities such as "
+    "healthcare and transport. Furthermore, when students pay fees they may value their courses more.\n\n"
+) * 2 + "In conclusion, I believe that tuition should be free for those who cannot afford it."
+
 
 @pytest.mark.asyncio
 async def test_start_writing_practice(session, mock_update, mock_context):
@@ -69,7 +79,7 @@ async def test_handle_essay(session, mock_update, mock_context):
     session.commit()
 
     mock_context.user_data = {"writing_session_id": practice_session.id, "writing_question": "Test question"}
-    mock_update.message.text = "This is my essay."
+    mock_update.message.text = ESSAY
     
     with patch('handlers.writing_practice_handler.db.session.query') as mock_query, \
          patch('handlers.writing_practice_handler.OpenAIService') as mock_openai_service, \
@@ -81,23 +91,37 @@ async def test_handle_essay(session, mock_update, mock_context):
             user
         ]
         
-        mock_openai_service.return_value.provide_writing_feedback.return_value = {
-            "estimated_band": 7.5,
-            "strengths": ["Good structure."],
-            "areas_for_improvement": ["More complex vocabulary needed."],
-            "task_achievement": "Achieved",
-            "coherence_cohesion": "Cohesive",
-            "lexical_resource": "Good",
-            "grammatical_range_accuracy": "Accurate"
-        }
+        mock_openai_service.return_value.stream_writing_feedback.return_value = iter([
+            {"strengths": ["Good structure."]},
+            {
+                "estimated_band": 7.5,
+                "strengths": ["Good structure."],
+                "areas_for_improvement": ["More complex vocabulary needed."],
+                "task_achievement": "Achieved",
+                "coherence_cohesion": "Cohesive",
+                "lexical_resource": "Good",
+                "grammatical_range_accuracy": "Accurate"
+            },
+        ])
         
         result = await handle_essay(mock_update, mock_context)
         
         assert result == ConversationHandler.END
         mock_update.message.reply_text.assert_any_call("Thank you. Analyzing your essay now, this may take a moment...")
+
+        # The progress message is replaced with the final feedback
+        final_text, final_kwargs = mock_update.message.reply_text.return_value.edit_text.call_args
+        assert "Achieved" in final_text[0]
+        assert final_kwargs == {"parse_mode": "Markdown"}
         
         # Check that the mock session object was updated
         assert practice_session.score == 7.5
+        [attempt] = practice_session.attempts
+        assert attempt.answer == ESSAY
+        assert attempt.band == 7.5
+        assert attempt.details["metrics"]["word_count"] == 245
+        metrics = mock_openai_service.return_value.stream_writing_feedback.call_args.args[3]
+        assert metrics.problem is None
         assert mock_context.user_data == {}
 
 
@@ -121,7 +145,7 @@ async def test_handle_essay_sends_recommendation(
         "writing_session_id": practice_session.id,
         "writing_question": "Test question",
     }
-    mock_update.message.text = "This is my essay."
+    mock_update.message.text = ESSAY
 
     with patch("handlers.writing_practice_handler.db.session.query") as mock_query, patch(
         "handlers.writing_practice_handler.OpenAIService"
@@ -130,9 +154,9 @@ async def test_handle_essay_sends_recommendation(
             practice_session,
             user,
         ]
-        mock_openai_service.return_value.provide_writing_feedback.return_value = {
-            "estimated_band": 7.0
-        }
+        mock_openai_service.return_value.stream_writing_feedback.return_value = iter([
+            {"estimated_band": 7.0}
+        ])
 
         result = await handle_essay(mock_update, mock_context)
 
@@ -149,4 +173,68 @@ async def test_handle_essay_sends_recommendation(
         assert reply_markup.inline_keyboard[0][0].text == "Start Listening Practice"
         assert (
             reply_markup.inline_keyboard[0][0].callback_data == "practice_listening"
-        ) 
\ No newline at end of file
+        ) 
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("essay, expected", [
+    ("This is my essay.", "Your response has 4 words, but Task 2 asks for at least 250."),
+    ("", "Your response has 0 words"),
+    ("qwzx vbnm plok trew " * 80, "doesn't look like English"),
+])
+async def test_handle_essay_rejects_essays_locally(session, mock_update, mock_context, essay, expected):
+    """Essays that clearly miss the task get instant feedback and no model call."""
+    user = User(user_id=mock_update.effective_user.id, preferred_language="en")
+    session.add(user)
+    session.commit()
+    practice_session = PracticeSession(user_id=user.id, section="writing_task_2", total_questions=1)
+    session.add(practice_session)
+    session.commit()
+
+    mock_context.user_data = {"writing_session_id": practice_session.id, "writing_question": "Test question"}
+    mock_update.message.text = essay
+
+    with patch("handlers.writing_practice_handler.OpenAIService") as mock_openai_service:
+        result = await handle_essay(mock_update, mock_context)
+
+    assert result == AWAITING_ESSAY
+    assert expected in mock_update.message.reply_text.call_args.args[0]
+    mock_openai_service.return_value.stream_writing_feedback.assert_not_called()
+    assert mock_context.user_data["writing_session_id"] == practice_session.id
+
+
+@pytest.mark.asyncio
+async def test_handle_essay_reuses_feedback_for_resubmitted_essay(session, mock_update, mock_context):
+    """An essay already graded for the same prompt gets its earlier feedback without a model call."""
+    from datetime import datetime
+    from models import EssayFingerprint, PracticeAttempt
+    from services.essay_dedup_service import fingerprint_essay, record_essay
+
+    user = User(user_id=mock_update.effective_user.id, preferred_language="en")
+    session.add(user)
+    session.commit()
+    feedback = {"estimated_band": 6.5, "task_achievement": "Addressed both views"}
+    earlier = PracticeSession(user_id=user.id, section="writing_task_2", total_questions=1, completed_at=datetime.utcnow())
+    practice_session = PracticeSession(user_id=user.id, section="writing_task_2", total_questions=1)
+    session.add_all([earlier, practice_session])
+    session.commit()
+    session.add(PracticeAttempt(session_id=earlier.id, ordinal=1, question="Test question", answer=ESSAY, feedback=feedback))
+    session.commit()
+    record_essay(fingerprint_essay(ESSAY, "Test question"), user.id, earlier.id)
+    session.commit()
+
+    mock_context.user_data = {"writing_session_id": practice_session.id, "writing_question": "Test question"}
+    mock_update.message.text = ESSAY
+
+    with patch("handlers.writing_practice_handler.OpenAIService") as mock_openai_service:
+        result = await handle_essay(mock_update, mock_context)
+
+    assert result == ConversationHandler.END
+    mock_openai_service.return_value.stream_writing_feedback.assert_not_called()
+    mock_update.message.reply_text.assert_any_call(
+        "You have already submitted this essay for this task, so here is the feedback it received."
+    )
+    final_text = mock_update.message.reply_text.return_value.edit_text.call_args.args[0]
+    assert "Addressed both views" in final_text
+    assert practice_session.score == 6.5
+    assert practice_session.attempts[0].feedback == feedback
+    assert session.query(EssayFingerprint).filter_by(practice_session_id=practice_session.id).count() == 1
@@ -0,0 +1,88 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from models import AIUsageRecord
+from services import ai_usage_service
+from services.ai_usage_service import AIBudgetExceededError, UsageRecorder, estimate_cost, usage_report
+from services.openai_service import OpenAIService
+
+
+def _record(recorder, user_id=42, feature="explain", prompt=100, completion=50, latency=120.0, outcome="ok"):
+    recorder.record(
+        method="generate_explanation",
+        feature=feature,
+        model="gpt-4o",
+        user_id=user_id,
+        usage=SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion),
+        latency_ms=latency,
+        outcome=outcome,
+    )
+
+
+def test_estimate_cost_uses_model_pricing():
+    assert estimate_cost("gpt-4o", 1_000_000, 0) == pytest.approx(2.50)
+    assert estimate_cost("gpt-4o", 0, 1_000_000) == pytest.approx(10.00)
+    assert estimate_cost("unknown-model", 1000, 1000) == 0.0
+
+
+def test_flush_writes_buffered_records_in_one_batch(app, session):
+    recorder = UsageRecorder()
+    recorder.init_app(app)
+    for _ in range(3):
+        _record(recorder)
+
+    assert session.query(AIUsageRecord).count() == 0
+    assert recorder.flush() == 3
+    assert session.query(AIUsageRecord).count() == 3
+    assert recorder.flush() == 0
+
+    row = session.query(AIUsageRecord).first()
+    assert row.total_tokens == 150
+    assert row.cost_usd == pytest.approx(estimate_cost("gpt-4o", 100, 50))
+
+
+def test_budget_counts_stored_and_pending_tokens(app, session, monkeypatch):
+    monkeypatch.setattr(ai_usage_service, "DAILY_TOKEN_BUDGET", 1000)
+    recorder = UsageRecorder()
+    recorder.init_app(app)
+
+    _record(recorder, prompt=400, completion=200)
+    recorder.flush()
+    assert recorder.tokens_used_today(42) == 600
+    assert not recorder.is_over_budget(42)
+
+    # Cached totals are bumped by new records without another query.
+    _record(recorder, prompt=300, completion=100)
+    assert recorder.is_over_budget(42)
+    assert not recorder.is_over_budget(7)
+    assert not recorder.is_over_budget(None)
+
+
+def test_usage_report_groups_by_feature(app, session):
+    ai_usage_service.usage_recorder._buffer.clear()
+    for latency in (100.0, 200.0, 300.0):
+        _record(ai_usage_service.usage_recorder, feature="writing_feedback", prompt=1000, completion=1000, latency=latency)
+    _record(ai_usage_service.usage_recorder, feature="explain", prompt=10, completion=10, outcome="APITimeoutError")
+
+    report = usage_report(days=7)
+
+    assert [item["feature"] for item in report] == ["writing_feedback", "explain"]
+    writing = report[0]
+    assert writing["calls"] == 3
+    assert writing["tokens"] == 6000
+    assert writing["p50_ms"] == pytest.approx(200.0)
+    assert report[1]["errors"] == 1
+
+
+def test_over_budget_user_gets_pooled_question_without_api_call():
+    service = OpenAIService(api_key="sk-test", user_id=42)
+    service.client = MagicMock()
+
+    with patch.object(ai_usage_service.usage_recorder, "is_over_budget", return_value=True):
+        question = service.generate_speaking_question(part_number=3, topic="space exploration")
+        with pytest.raises(AIBudgetExceededError):
+            service.provide_writing_feedback("An essay.", 2, "A question?")
+
+    assert question["question"]
+    service.client.chat.completions.create.assert_not_called()
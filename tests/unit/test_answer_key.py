@@ -0,0 +1,82 @@
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from utils import answer_key
+from utils.answer_key import AnswerKeyError, compile_answer_key, get_answer_key
+
+CONTENT = {"questions": [
+    {"text": "Main idea?", "options": ["Cities", "Rivers", "Forests"], "correct_option_index": 1},
+    {"text": "Capital of France?", "answer": "Paris", "accepted_answers": ["The  city of PARIS"]},
+    {"text": "When was it built?", "answer_pattern": r"(the )?1[89]th century"},
+    {"text": "Discuss."},
+]}
+
+
+def test_compiles_typed_questions():
+    key = compile_answer_key(CONTENT)
+    choice, text, pattern, open_question = key.questions
+    assert (choice.kind, choice.options, choice.correct_index) == ("choice", ("Cities", "Rivers", "Forests"), 1)
+    assert (text.kind, text.accepted) == ("text", frozenset({"paris", "the city of paris"}))
+    assert pattern.kind == "text" and open_question.kind == "open"
+    assert (len(key), key.gradable, key.all_choice) == (4, 3, False)
+    # Content without a question list (an essay prompt) has nothing to grade.
+    assert compile_answer_key({"prompt": "Write about cities."}).grade(["An essay"]) is None
+
+
+def test_grading_accepts_indexes_typed_options_and_answer_variants():
+    key = compile_answer_key(CONTENT)
+    assert key.grade([1, " paris. ", "The 19th Century", "Because."]) == 100
+    assert key.grade(["B)", "the city of paris!", "18th century"]) == 100
+    assert key.grade(["rivers", "Lyon", "20th century"]) == 33
+    assert key.grade([0]) == 0
+    assert key.grade(None) == 0
+    # Overlong typed answers are not matched at all.
+    assert key.grade([1, "paris " * 100, "19th century"]) == 67
+
+
+@pytest.mark.parametrize("questions, message", [
+    ([], "non-empty list"),
+    ([{"options": ["a", "b"], "correct_option_index": 0}], "Question 1: every question needs a 'text'"),
+    ([{"text": "Q", "options": ["a"], "correct_option_index": 0}], "at least two options"),
+    ([{"text": "Q", "options": ["a", "b"], "correct_option_index": 2}], "between 0 and 1"),
+    ([{"text": "Q", "options": ["a", "b"], "correct_option_index": True}], "between 0 and 1"),
+    ([{"text": "Q", "options": ["a", ""], "correct_option_index": 0}], "'options' must be a list"),
+    ([{"text": "Q"}, {"text": "Q2", "accepted_answers": "yes"}], "Question 2: 'accepted_answers'"),
+    ([{"text": "Q", "answer_pattern": "([a-z"}], "invalid answer_pattern"),
+    # Patterns that can backtrack exponentially would stall the scoring worker.
+    ([{"text": "Q", "answer_pattern": "(a+)+b"}], "may not repeat a group"),
+    ([{"text": "Q", "answer_pattern": "(a|ab)*c"}], "may not repeat a group"),
+    ([{"text": "Q", "answer_pattern": r"(\w)\1"}], "backreferences"),
+    ([{"text": "Q", "answer_pattern": "(?=a)a"}], "plain"),
+    ([{"text": "Q", "answer_pattern": ".*.*.*.*.*x"}], "at most one unbounded repeat"),
+    ([{"text": "Q", "answer_pattern": "a?" * 10 + "x"}], "too many optional"),
+    ([{"text": "Q", "answer_pattern": "a" * 201}], "longer than 200"),
+])
+def test_rejects_malformed_content(questions, message):
+    with pytest.raises(AnswerKeyError, match=message):
+        compile_answer_key({"questions": questions})
+
+
+def test_accepted_patterns_fail_fast_on_long_answers():
+    # The most backtracking a pattern may do: one unbounded repeat and MAX_PATTERN_WAYS splits.
+    key = compile_answer_key({"questions": [{"text": "Q", "answer_pattern": ".*" + "a?" * 9 + "x"}]})
+    start = time.perf_counter()
+    assert key.grade(["a" * answer_key.MAX_ANSWER_LENGTH]) == 0
+    assert time.perf_counter() - start < 0.5
+
+
+def test_compiled_keys_are_cached_per_exercise_version(monkeypatch):
+    compiled = []
+    real_compile = answer_key.compile_answer_key
+    monkeypatch.setattr(answer_key, "compile_answer_key", lambda content: compiled.append(content) or real_compile(content))
+    exercise = SimpleNamespace(id=-1, updated_at=datetime(2026, 1, 1), content=CONTENT)
+
+    first = get_answer_key(exercise)
+    assert get_answer_key(exercise) is first
+    exercise.updated_at = datetime(2026, 1, 2)
+    exercise.content = {"questions": [{"text": "Q", "options": ["a", "b"], "correct_option_index": 0}]}
+    assert get_answer_key(exercise).all_choice
+    assert len(compiled) == 2
@@ -0,0 +1,75 @@
+import hashlib
+
+import pytest
+from sqlalchemy import event
+
+from extensions import db
+from services.auth_service import AuthService
+
+
+@pytest.fixture
+def queries(session):
+    """Records every SQL statement run while the test executes."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def test_tokens_are_stored_as_digests(approved_teacher_user):
+    teacher = approved_teacher_user.teacher_profile
+    assert teacher.api_token_hash == hashlib.sha256(b"valid-test-token").hexdigest()
+    with pytest.raises(AttributeError):
+        teacher.api_token
+
+
+def test_cached_token_validation_runs_no_queries(approved_teacher_user, queries):
+    user_id = approved_teacher_user.id
+    queries.clear()
+
+    owner = AuthService.authenticate("valid-test-token")
+    assert owner.user_id == user_id
+    assert len(queries) == 1
+
+    queries.clear()
+    assert AuthService.authenticate("valid-test-token") == owner
+    assert queries == []
+
+
+def test_unknown_and_unapproved_tokens_are_rejected(non_approved_teacher_user):
+    assert AuthService.authenticate("not-a-token") is None
+    assert AuthService.authenticate("") is None
+    non_approved_teacher_user.teacher_profile.api_token = "pending-token"
+    db.session.commit()
+    assert AuthService.authenticate("pending-token") is None
+
+
+def test_revocation_and_approval_changes_invalidate_the_cache(approved_teacher_user):
+    teacher = approved_teacher_user.teacher_profile
+    assert AuthService.authenticate("valid-test-token") is not None
+
+    teacher.is_approved = False
+    db.session.commit()
+    assert AuthService.authenticate("valid-test-token") is None
+
+    teacher.is_approved = True
+    db.session.commit()
+    assert AuthService.authenticate("valid-test-token") is not None
+
+    AuthService.revoke_token(teacher)
+    assert AuthService.authenticate("valid-test-token") is None
+
+
+def test_new_token_replaces_the_old_one(approved_teacher_user):
+    teacher = approved_teacher_user.teacher_profile
+    assert AuthService.authenticate("valid-test-token") is not None
+
+    token = AuthService.assign_token_to_teacher(teacher)
+
+    assert len(token) == 64
+    assert AuthService.authenticate("valid-test-token") is None
+    assert AuthService.validate_token(token) == approved_teacher_user
@@ -0,0 +1,158 @@
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+
+from models import User, Group, TeacherExercise, Homework, HomeworkSubmission, GradingBatch
+from services.batch_grading_service import (
+    MAX_GRADING_ATTEMPTS,
+    LocalBatchBackend,
+    OpenAIBatchBackend,
+    _parse_result,
+    band_to_score,
+    collect_results,
+    run_once,
+    submit_ungraded,
+)
+from services.homework_service import NEEDS_REVIEW_FEEDBACK
+
+
+@pytest.fixture
+def writing_homework(session, approved_teacher_user):
+    """A writing homework with 100 ungraded essays and one reading submission."""
+    teacher = approved_teacher_user.teacher_profile
+    group = Group(name="Essay Class", teacher_id=teacher.id)
+    writing = TeacherExercise(
+        creator_id=teacher.id, title="Opinion essay", exercise_type="writing", difficulty="medium",
+        content={"question": "Should university be free?", "task_type": 2},
+    )
+    reading = TeacherExercise(
+        creator_id=teacher.id, title="Reading", exercise_type="reading", difficulty="easy", content={"q": "1"},
+    )
+    session.add_all([group, writing, reading])
+    session.flush()
+    homework = Homework(exercise_id=writing.id, group_id=group.id, assigned_by_id=teacher.id)
+    reading_homework = Homework(exercise_id=reading.id, group_id=group.id, assigned_by_id=teacher.id)
+    session.add_all([homework, reading_homework])
+    session.flush()
+
+    students = [User(user_id=10_000 + i, first_name=f"Student {i}") for i in range(100)]
+    session.add_all(students)
+    session.flush()
+    session.add_all([
+        HomeworkSubmission(homework_id=homework.id, student_id=s.id, content={"essay": f"Essay number {i}."})
+        for i, s in enumerate(students)
+    ])
+    session.add(HomeworkSubmission(homework_id=reading_homework.id, student_id=students[0].id, content={"answers": [0]}))
+    session.commit()
+    return homework
+
+
+def _responder(body):
+    return json.dumps({"strengths": ["Clear"], "estimated_band": 7.0})
+
+
+def test_band_to_score():
+    assert band_to_score(9) == 100
+    assert band_to_score(7.0) == 78
+    assert band_to_score(0) == 0
+
+
+def test_class_is_graded_in_one_batch(session, writing_homework, tmp_path):
+    backend = LocalBatchBackend(str(tmp_path), responder=_responder)
+
+    batch = submit_ungraded(backend)
+    assert batch.submission_count == 100
+    assert session.query(HomeworkSubmission).filter_by(grading_batch_id=batch.id).count() == 100
+    # Already queued essays are not submitted twice.
+    assert submit_ungraded(backend) is None
+
+    assert collect_results(backend) == 100
+    session.expire_all()
+    scores = {s.score for s in writing_homework.submissions}
+    assert scores == {78}
+    assert json.loads(writing_homework.submissions[0].feedback)["estimated_band"] == 7.0
+    assert session.get(GradingBatch, batch.id).status == "completed"
+    assert session.query(HomeworkSubmission).filter(HomeworkSubmission.score.is_(None)).count() == 1  # the reading one
+
+    request = json.loads((tmp_path / batch.provider_batch_id / "input.jsonl").read_text().splitlines()[0])
+    assert "Should university be free?" in request["body"]["messages"][0]["content"]
+
+
+def test_failed_requests_are_released_for_the_next_run(session, writing_homework, tmp_path):
+    def flaky(body):
+        if "Essay number 3." in body["messages"][0]["content"]:
+            raise RuntimeError("upstream error")
+        return _responder(body)
+
+    backend = LocalBatchBackend(str(tmp_path), responder=flaky)
+    submit_ungraded(backend)
+    assert collect_results(backend) == 99
+
+    failed = session.query(HomeworkSubmission).filter(
+        HomeworkSubmission.score.is_(None), HomeworkSubmission.content["essay"].as_string() == "Essay number 3."
+    ).one()
+    assert failed.grading_batch_id is None
+
+    backend.responder = _responder
+    run_once(backend)  # resubmits the failed essay
+    assert run_once(backend) == 1
+
+
+def test_empty_and_unusable_essays_are_left_for_the_teacher(session, writing_homework, tmp_path):
+    def essay(text):
+        return session.query(HomeworkSubmission).filter(
+            HomeworkSubmission.content["essay"].as_string() == text
+        ).one()
+
+    empty, unusable = essay("Essay number 0."), essay("Essay number 1.")
+    empty.content = {"essay": "  "}
+    session.commit()
+
+    def responder(body):
+        if "Essay number 1." in body["messages"][0]["content"]:
+            return "Sorry, I cannot grade this."
+        return _responder(body)
+
+    backend = LocalBatchBackend(str(tmp_path), responder=responder)
+    batch = submit_ungraded(backend)
+    assert batch.submission_count == 99
+    assert empty.feedback == NEEDS_REVIEW_FEEDBACK
+
+    for _ in range(MAX_GRADING_ATTEMPTS):
+        run_once(backend)
+    session.expire_all()
+    assert (unusable.score, unusable.feedback, unusable.grading_attempts) == (None, NEEDS_REVIEW_FEEDBACK, MAX_GRADING_ATTEMPTS)
+    assert unusable.grading_batch_id is None
+    assert session.query(GradingBatch).count() == MAX_GRADING_ATTEMPTS
+    assert submit_ungraded(backend) is None
+
+
+def test_usage_is_recorded_once(session, writing_homework, tmp_path):
+    backend = LocalBatchBackend(str(tmp_path), responder=_responder)
+    batch = submit_ungraded(backend)
+    backend.status(batch.provider_batch_id)
+    line = backend.results(batch.provider_batch_id)[0]
+
+    with patch("services.batch_grading_service.usage_recorder") as recorder:
+        # Local completions go through OpenAIService, which records them itself.
+        assert collect_results(backend) == 100
+        recorder.record.assert_not_called()
+
+        # Batch API results are recorded here, at the batch price.
+        assert _parse_result(line)["score"] == 78
+        assert recorder.record.call_args.kwargs["price_factor"] == 0.5
+
+
+def test_openai_backend_uses_batch_api():
+    client = MagicMock()
+    client.files.create.return_value.id = "file-in"
+    client.batches.create.return_value.id = "batch_123"
+    client.batches.retrieve.return_value.output_file_id = "file-out"
+    client.batches.retrieve.return_value.error_file_id = None
+    client.files.content.return_value.text = json.dumps({"custom_id": "submission-1"}) + "\n"
+
+    backend = OpenAIBatchBackend(client=client)
+    assert backend.submit([{"custom_id": "submission-1"}]) == "batch_123"
+    assert client.files.create.call_args.kwargs["purpose"] == "batch"
+    assert client.batches.create.call_args.kwargs["endpoint"] == "/v1/chat/completions"
+    assert backend.results("batch_123") == [{"custom_id": "submission-1"}]
@@ -0,0 +1,117 @@
+import time
+from datetime import datetime
+
+import numpy as np
+
+from models import EssayFingerprint, EssayFingerprintBand, PracticeAttempt, PracticeSession, User
+from services.essay_dedup_service import (
+    BANDS,
+    NUM_PERM,
+    find_cached_feedback,
+    find_near_duplicates,
+    fingerprint_essay,
+    flagged_essay_count,
+    record_essay,
+)
+
+ESSAY = (
+    "Some people believe that university education should be free for everyone, while others argue that "
+    "students should pay for their own studies. On the one hand, free education gives every young person the "
+    "same chance to succeed, and society benefits from a more educated workforce. On the other hand, "
+    "universities are expensive to run and governments have many other priorities such as healthcare. "
+    "In conclusion, I believe that tuition should be free for those who cannot afford it."
+)
+# The same essay with a few words changed: a near-duplicate.
+EDITED = ESSAY.replace("such as healthcare", "such as hospitals").replace("In conclusion", "To conclude")
+OTHER = (
+    "The chart shows how many tourists visited three European cities between 2000 and 2020. Overall, "
+    "visitor numbers rose in all three cities, although Paris remained by far the most popular destination "
+    "throughout the period, while Rome overtook Berlin in the final five years."
+)
+
+
+def _make_user(session, telegram_id):
+    user = User(user_id=telegram_id, first_name=f"Student {telegram_id}")
+    session.add(user)
+    session.commit()
+    return user
+
+
+def _graded_session(session, user, essay, feedback):
+    practice_session = PracticeSession(user_id=user.id, section="writing_task_2", completed_at=datetime.utcnow())
+    session.add(practice_session)
+    session.commit()
+    session.add(PracticeAttempt(session_id=practice_session.id, ordinal=1, answer=essay, feedback=feedback))
+    session.commit()
+    return practice_session
+
+
+def test_fingerprint_ignores_case_spacing_and_punctuation():
+    a = fingerprint_essay(ESSAY, "Should university be free?")
+    b = fingerprint_essay(ESSAY.upper().replace(",", "").replace(" ", "  "), "should university be free")
+    assert a.content_hash == b.content_hash
+    assert a.prompt_hash == b.prompt_hash
+    assert a.signature.dtype == np.dtype("<u4") and a.signature.shape == (NUM_PERM,)
+    assert np.array_equal(a.signature, b.signature)
+    assert len(a.band_keys()) == BANDS
+    assert all(0 <= key < 2**63 for key in a.band_keys())
+
+
+def test_signature_similarity_tracks_overlap():
+    base = fingerprint_essay(ESSAY, None).signature
+    assert (base == fingerprint_essay(EDITED, None).signature).mean() >= 0.8
+    assert (base == fingerprint_essay(OTHER, None).signature).mean() < 0.1
+
+
+def test_find_cached_feedback_matches_prompt_and_text(session):
+    user = _make_user(session, 1)
+    feedback = {"estimated_band": 6.5}
+    practice_session = _graded_session(session, user, ESSAY, feedback)
+    record_essay(fingerprint_essay(ESSAY, "Question A"), user.id, practice_session.id)
+    session.commit()
+
+    assert find_cached_feedback(fingerprint_essay(ESSAY + "  ", "Question A")) == feedback
+    assert find_cached_feedback(fingerprint_essay(ESSAY, "Question B")) is None
+    assert find_cached_feedback(fingerprint_essay(EDITED, "Question A")) is None
+
+
+def test_record_essay_flags_copies_from_other_students(session):
+    first, second = _make_user(session, 1), _make_user(session, 2)
+    original = record_essay(fingerprint_essay(ESSAY, "Q"), first.id)
+    record_essay(fingerprint_essay(OTHER, "Q"), first.id)
+    session.commit()
+
+    # Resubmitting your own essay is not copying.
+    own = record_essay(fingerprint_essay(EDITED, "Q"), first.id)
+    copy = record_essay(fingerprint_essay(EDITED, "Q"), second.id)
+    session.commit()
+
+    assert own.near_duplicate_of_id is None
+    assert copy.near_duplicate_of_id is not None
+    assert copy.near_duplicate_of.user_id == first.id
+    assert copy.similarity >= 0.8
+    assert flagged_essay_count(second.id) == 1
+    assert flagged_essay_count(first.id) == 0
+    assert session.query(EssayFingerprintBand).filter_by(fingerprint_id=original.id).count() == BANDS
+
+
+def test_near_duplicate_lookup_stays_fast_as_the_index_grows(session):
+    user = _make_user(session, 1)
+    rng = np.random.default_rng(0)
+    vocabulary = np.array(OTHER.lower().replace(",", "").replace(".", "").split())
+    for _ in range(500):
+        record_essay(fingerprint_essay(" ".join(rng.choice(vocabulary, 120)), "Q"), user.id)
+    session.commit()
+    record_essay(fingerprint_essay(ESSAY, "Q"), user.id)
+    session.commit()
+
+    query = fingerprint_essay(EDITED, "Q")
+    find_near_duplicates(query)  # warm up
+    start = time.perf_counter()
+    matches = find_near_duplicates(query)
+    elapsed = time.perf_counter() - start
+
+    assert [m.user_id for _, m in matches] == [user.id]
+    assert session.query(EssayFingerprint).count() == 501
+    # Index lookup plus verification; generous to allow for slow CI machines.
+    assert elapsed < 0.05
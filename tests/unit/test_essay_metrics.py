@@ -0,0 +1,46 @@
+import pytest
+
+from services.openai_service import OpenAIService
+from utils.essay_metrics import analyze_essay, describe_for_examiner
+
+ESSAY = (
+    "Some people think that cities are crowded. However, others disagree.\n\n"
+    "For example, many cities have large parks. As a result, people can relax. In conclusion, cities are fine!"
+)
+
+
+def test_lexical_metrics():
+    metrics = analyze_essay(ESSAY, task_type=1)
+    assert metrics.word_count == 28
+    assert metrics.minimum_words == 150
+    assert metrics.sentence_count == 5
+    assert metrics.paragraph_count == 2
+    assert metrics.type_token_ratio == pytest.approx(24 / 28, abs=1e-3)
+    assert 3.5 < metrics.average_word_length < 6
+    assert metrics.unknown_word_share == 0.0
+    # however, for example, as a result, in conclusion
+    assert metrics.linking_word_density == pytest.approx(4 / 28 * 100, abs=0.01)
+
+
+@pytest.mark.parametrize("text, task_type, problem", [
+    ("", 2, "too_short"),
+    (ESSAY, 1, "too_short"),
+    (ESSAY * 3, 1, None),  # 84 words is over half of Task 1's 150
+    ("xqzt plomv wrrk " * 60, 2, "not_english"),
+])
+def test_problems(text, task_type, problem):
+    assert analyze_essay(text, task_type).problem == problem
+
+
+def test_numbers_count_as_words_but_are_not_spell_checked():
+    metrics = analyze_essay("Sales rose by 25 pounds in 2020.", task_type=1)
+    assert metrics.word_count == 7
+    assert metrics.unknown_word_share == 0.0
+
+
+def test_metrics_are_added_to_the_examiner_prompt():
+    metrics = analyze_essay(ESSAY, task_type=2)
+    prompt = OpenAIService.writing_feedback_prompt(ESSAY, 2, "Are cities good places to live?", metrics)
+    assert describe_for_examiner(metrics) in prompt
+    assert "Words: 28 (task minimum 250)" in prompt
+    assert "Automated measurements" not in OpenAIService.writing_feedback_prompt(ESSAY, 2, "Question?")
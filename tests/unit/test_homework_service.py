@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from extensions import db
+from models import Group, GroupMembership, Homework, HomeworkSubmission, TeacherExercise, User
+from services.batch_grading_service import essay_text
+from services.homework_service import NEEDS_REVIEW_FEEDBACK, get_assignment, pending_homework, score_pending, submit
+
+MCQ = {"questions": [
+    {"text": "Q1", "options": ["a", "b", "c"], "correct_option_index": 1},
+    {"text": "Q2", "options": ["a", "b"], "correct_option_index": 0},
+]}
+MIXED = {"questions": [
+    {"text": "Q1", "options": ["a", "b"], "correct_option_index": 1},
+    {"text": "Capital of France?", "answer": "Paris", "accepted_answers": ["the city of Paris"]},
+    {"text": "Why?"},
+]}
+
+
+@pytest.fixture
+def assign(session, approved_teacher_user):
+    group = Group(name="Evening Class", teacher_id=approved_teacher_user.id)
+    student = User(user_id=90001, first_name="Student")
+    session.add_all([group, student])
+    session.flush()
+    session.add(GroupMembership(group_id=group.id, student_id=student.id))
+    session.commit()
+
+    def create(content, exercise_type="reading", due_in=None):
+        exercise = TeacherExercise(title=f"{exercise_type} task", creator_id=approved_teacher_user.id,
+                                   exercise_type=exercise_type, difficulty="easy", content=content)
+        session.add(exercise)
+        session.flush()
+        homework = Homework(exercise_id=exercise.id, group_id=group.id, assigned_by_id=approved_teacher_user.id,
+                            due_date=datetime.utcnow() + due_in if due_in else None)
+        session.add(homework)
+        session.commit()
+        return homework
+    create.student = student
+    return create
+
+
+def test_multiple_choice_homework_is_scored_on_submission(session, assign):
+    homework = assign(MCQ)
+    submission = submit(homework, assign.student.id, [1, 1])
+    assert submission.score == 50
+    assert submission.content == {"answers": [1, 1]}
+    # Already scored, so the background worker has nothing to do.
+    assert score_pending() == 0
+
+
+def test_a_second_submission_of_the_same_homework_is_refused(session, assign):
+    homework = assign(MCQ)
+    assert submit(homework, assign.student.id, [1, 0]).score == 100
+    # A finish that raced the first one got past get_assignment, but not the unique constraint.
+    assert submit(homework, assign.student.id, [0, 0]) is None
+    assert session.query(HomeworkSubmission).filter_by(homework_id=homework.id).count() == 1
+
+
+def test_typed_answers_are_scored_by_the_worker_in_one_update(session, assign):
+    homework = assign(MIXED)
+    right = submit(homework, assign.student.id, [1, "  the CITY of paris ", "Because."])
+    other = User(user_id=90002, first_name="Other")
+    session.add(other)
+    session.flush()
+    session.add(GroupMembership(group_id=homework.group_id, student_id=other.id))
+    wrong = submit(homework, other.id, [0, "Lyon", ""])
+    assert right.score is None and wrong.score is None
+
+    statements = []
+    record = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        assert score_pending() == 2
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert len([s for s in statements if s.startswith('UPDATE homework_submissions')]) == 1
+    session.expire_all()
+    # The open question has no key, so only the first two count.
+    assert (right.score, wrong.score) == (100, 0)
+
+
+def test_submissions_without_an_answer_key_are_left_for_review(session, assign):
+    essay = submit(assign({"questions": [{"text": "Discuss."}]}, exercise_type="writing"),
+                   assign.student.id, ["An essay about cities."])
+    open_ended = submit(assign({"question": "Summarise the passage."}), assign.student.id, ["A summary."])
+
+    assert score_pending() == 0
+    session.expire_all()
+    assert open_ended.feedback == NEEDS_REVIEW_FEEDBACK and open_ended.score is None
+    # Essays stay with the batch grader, which reads the typed answer.
+    assert essay.feedback is None and essay_text(essay.content) == "An essay about cities."
+
+
+def test_pending_homework_lists_unsubmitted_work_soonest_first(session, assign):
+    later = assign(MCQ, due_in=timedelta(days=3))
+    undated = assign(MCQ)
+    sooner = assign(MCQ, due_in=timedelta(days=1))
+    done = assign(MCQ, due_in=timedelta(hours=1))
+    submit(done, assign.student.id, [0, 0])
+
+    assert [hw.id for hw, _, _ in pending_homework(assign.student.id)] == [sooner.id, later.id, undated.id]
+    assert get_assignment(done.id, assign.student.id) is None
+
+    outsider = User(user_id=90003, first_name="Outsider")
+    session.add(outsider)
+    session.commit()
+    assert pending_homework(outsider.id) == []
+    assert get_assignment(sooner.id, outsider.id) is None
+    assert session.query(HomeworkSubmission).count() == 1
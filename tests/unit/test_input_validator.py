@@ -17,4 +17,12 @@ def test_validate_user_id_non_integer():
     """Test that a non-integer input is considered invalid."""
     assert InputValidator.validate_user_id("not_an_id") is None
     assert InputValidator.validate_user_id(None) is None
-    assert InputValidator.validate_user_id(123.45) is None 
\ No newline at end of file
+    assert InputValidator.validate_user_id(123.45) is None
+
+def test_validate_exercise_content_rejects_a_broken_answer_key():
+    """Test that content whose answer key does not compile is considered invalid."""
+    valid = '{"questions": [{"text": "Q1", "options": ["a", "b"], "correct_option_index": 1}]}'
+    assert InputValidator.validate_exercise_content(valid)["questions"][0]["correct_option_index"] == 1
+    assert InputValidator.validate_exercise_content(
+        '{"questions": [{"text": "Q1", "options": ["a", "b"], "correct_option_index": 2}]}'
+    ) is None
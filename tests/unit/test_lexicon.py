@@ -0,0 +1,73 @@
+import time
+import pytest
+
+from utils import lexicon as lexicon_module
+from utils.background_build import BackgroundBuild
+from utils.lexicon import Lexicon, build_lexicon, get_lexicon
+
+
+@pytest.fixture
+def small_lexicon(tmp_path):
+    source = tmp_path / "dictionaries"
+    source.mkdir()
+    (source / "a.csv").write_bytes(b"apple \napple \napply \nAbout \nanti\x96war \n")
+    (source / "r.csv").write_bytes(b"receive \nrun \nstudy \nmake \nwell \nknown \n")
+    path = tmp_path / "lexicon.bin"
+    assert build_lexicon(str(source), str(path)) == 10
+    return Lexicon(str(path))
+
+
+def test_membership_is_exact_and_case_insensitive(small_lexicon):
+    assert "apple" in small_lexicon
+    assert "About" in small_lexicon
+    assert "anti-war" in small_lexicon
+    assert "appl" not in small_lexicon
+    assert "zebra" not in small_lexicon
+    assert list(small_lexicon)[:3] == ["about", "anti-war", "apple"]
+
+
+def test_prefix_lookup(small_lexicon):
+    assert small_lexicon.words_with_prefix("app") == ["apple", "apply"]
+    assert small_lexicon.has_prefix("rec")
+    assert not small_lexicon.has_prefix("xy")
+
+
+@pytest.mark.parametrize("word, lemma", [
+    ("receives", "receive"),
+    ("received", "receive"),
+    ("studies", "study"),
+    ("making", "make"),
+    ("running", "run"),
+    ("recieve", None),
+])
+def test_inflections_resolve_to_dictionary_form(small_lexicon, word, lemma):
+    assert small_lexicon.lemma(word) == lemma
+
+
+def test_hyphenated_compounds_of_known_words(small_lexicon):
+    assert small_lexicon.is_known_word("well-known")
+    assert not small_lexicon.is_known_word("well-knwn")
+
+
+def test_shipped_dictionaries_load_quickly():
+    lexicon = get_lexicon()
+    assert len(lexicon) > 100_000
+    assert lexicon.is_known_word("elaborate")
+    assert not lexicon.is_known_word("qwzxv")
+
+    start = time.perf_counter()
+    Lexicon(lexicon_module.LEXICON_PATH)
+    assert time.perf_counter() - start < 0.05
+
+
+def test_missing_lexicon_is_built_off_the_request_path(tmp_path, monkeypatch):
+    (tmp_path / "a.csv").write_bytes(b"apple \n")
+    monkeypatch.setattr(lexicon_module, "DICTIONARY_DIR", str(tmp_path))
+    monkeypatch.setattr(lexicon_module, "LEXICON_PATH", str(tmp_path / "lexicon.bin"))
+    monkeypatch.setattr(lexicon_module, "_lexicon", None)
+    monkeypatch.setattr(lexicon_module, "_rebuild", BackgroundBuild("lexicon", lexicon_module.ensure_lexicon))
+
+    # Callers fail open while the file is built in the background.
+    assert get_lexicon() is None
+    lexicon_module._rebuild.join(timeout=10)
+    assert "apple" in get_lexicon()
@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from handlers.decorators import error_handler
+from services import metrics_service
+from services.openai_service import OpenAIService
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+
+def _sample(name, labels):
+    from prometheus_client import REGISTRY
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.asyncio
+async def test_error_handler_records_latency(mock_update, mock_context):
+    @error_handler
+    async def metrics_probe_handler(update, context):
+        return "done"
+
+    before = _sample('ielts_bot_handler_latency_seconds_count', {'handler': 'metrics_probe_handler', 'outcome': 'ok'})
+    assert await metrics_probe_handler(mock_update, mock_context) == "done"
+    after = _sample('ielts_bot_handler_latency_seconds_count', {'handler': 'metrics_probe_handler', 'outcome': 'ok'})
+    assert after == before + 1
+
+
+@pytest.mark.asyncio
+async def test_error_handler_records_failures(mock_update, mock_context):
+    @error_handler
+    async def metrics_failing_handler(update, context):
+        raise RuntimeError("boom")
+
+    await metrics_failing_handler(mock_update, mock_context)
+    assert _sample('ielts_bot_handler_latency_seconds_count', {'handler': 'metrics_failing_handler', 'outcome': 'error'}) >= 1
+
+
+def test_metrics_endpoint_reports_routes(client):
+    client.get('/login')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    assert 'ielts_http_request_latency_seconds_count{method="GET",route="/login",status="200"}' in body
+    assert 'ielts_process_resident_memory_bytes' in body
+
+
+def test_chat_completion_records_tokens_and_errors():
+    service = OpenAIService(api_key="sk-test")
+    service.client = MagicMock()
+    service.client.chat.completions.create.return_value = SimpleNamespace(
+        usage=SimpleNamespace(prompt_tokens=12, completion_tokens=30)
+    )
+
+    before = _sample('ielts_openai_tokens_total', {'method': 'metrics_probe', 'kind': 'completion'})
+    service._chat_completion("metrics_probe", model="gpt-4o", messages=[])
+    assert _sample('ielts_openai_tokens_total', {'method': 'metrics_probe', 'kind': 'completion'}) == before + 30
+
+    service.client.chat.completions.create.side_effect = TimeoutError()
+    with pytest.raises(TimeoutError):
+        service._chat_completion("metrics_probe", model="gpt-4o", messages=[])
+    assert _sample('ielts_openai_errors_total', {'method': 'metrics_probe', 'error_type': 'TimeoutError'}) >= 1
+
+
+def test_multiprocess_directory_is_aggregated(tmp_path, monkeypatch):
+    """Two separate 'workers' write to the shared directory; one scrape sees both."""
+    worker_script = (
+        "from services import metrics_service\n"
+        "metrics_service.observe_handler('shared_handler', 0.2)\n"
+    )
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path), PYTHONPATH=PROJECT_ROOT)
+    for _ in range(2):
+        subprocess.run([sys.executable, '-c', worker_script], check=True, env=env, cwd=PROJECT_ROOT)
+
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path))
+    body = metrics_service.render_metrics().decode()
+    assert 'ielts_bot_handler_latency_seconds_count{handler="shared_handler",outcome="ok"} 2.0' in body
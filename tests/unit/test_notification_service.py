@@ -0,0 +1,125 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import event
+from telegram.error import Forbidden, NetworkError, RetryAfter
+
+from extensions import db
+from models import Group, GroupMembership, Homework, NotificationOutbox, TeacherExercise, User
+from services import notification_service
+from services.notification_service import AsyncRateLimiter, drain, enqueue_homework_notifications
+
+
+@pytest.fixture
+def class_of(session, approved_teacher_user):
+    def create(size):
+        group = Group(name="Big Class", teacher_id=approved_teacher_user.id)
+        exercise = TeacherExercise(title="Task 2 essay", creator_id=approved_teacher_user.id,
+                                   exercise_type="writing", difficulty="medium", content={})
+        students = [User(user_id=70000 + i, first_name=f"S{i}", preferred_language="es" if i % 2 else "en")
+                    for i in range(size)]
+        session.add_all([group, exercise, *students])
+        session.flush()
+        session.add_all([GroupMembership(group_id=group.id, student_id=s.id) for s in students])
+        session.commit()
+        return group, exercise
+    return create
+
+
+@pytest.fixture
+def fast_limiter():
+    return AsyncRateLimiter(rate=10000)
+
+
+def test_assignment_queues_one_notification_per_student_in_one_insert(client, session, approved_teacher_user, class_of):
+    group, exercise = class_of(500)
+    with client.session_transaction() as sess:
+        sess['user_id'] = approved_teacher_user.id
+
+    statements = []
+    record = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        res = client.post('/api/homework', json={'exercise_id': exercise.id, 'group_id': group.id,
+                                                 'due_date': '2026-11-01T18:00:00'})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert res.status_code == 201
+    assert len([s for s in statements if s.startswith('INSERT INTO notification_outbox')]) == 1
+    rows = session.query(NotificationOutbox).all()
+    assert len(rows) == 500 and {r.status for r in rows} == {'pending'}
+    assert {r.text for r in rows} == {
+        '📚 New homework in Big Class: "Task 2 essay". Due: 2026-11-01 18:00 (UTC).',
+        '📚 Nueva tarea en Big Class: "Task 2 essay". Fecha límite: 2026-11-01 18:00 (UTC).',
+    }
+
+    # Enqueuing the same assignment again is a no-op thanks to the idempotency keys.
+    homework = session.get(Homework, res.get_json()['data']['id'])
+    assert enqueue_homework_notifications(homework) == 0
+    assert session.query(NotificationOutbox).count() == 500
+
+
+@pytest.mark.asyncio
+async def test_drain_records_sent_failed_and_retried_messages(session, approved_teacher_user, class_of, fast_limiter):
+    group, exercise = class_of(3)
+    homework = Homework(exercise_id=exercise.id, group_id=group.id, assigned_by_id=approved_teacher_user.id)
+    session.add(homework)
+    session.flush()
+    enqueue_homework_notifications(homework)
+    session.commit()
+
+    bot = AsyncMock()
+    bot.send_message.side_effect = [None, Forbidden("bot was blocked by the user"), NetworkError("reset")]
+    assert await drain(bot, fast_limiter) == 1
+
+    rows = session.query(NotificationOutbox).order_by(NotificationOutbox.id).all()
+    assert [(r.status, r.attempts) for r in rows] == [('sent', 1), ('failed', 1), ('pending', 1)]
+    assert rows[0].sent_at is not None
+    assert rows[2].next_attempt_at > datetime.utcnow()
+
+    # Nothing is due again until the backoff has passed.
+    assert await drain(bot, fast_limiter) == 0
+    rows[2].next_attempt_at = datetime.utcnow()
+    session.commit()
+    bot.send_message.side_effect = None
+    assert await drain(bot, fast_limiter) == 1
+    assert bot.send_message.await_count == 4
+
+
+@pytest.mark.asyncio
+async def test_flood_control_defers_the_message_and_gives_up_after_max_attempts(session, approved_teacher_user,
+                                                                                class_of, fast_limiter):
+    group, exercise = class_of(1)
+    homework = Homework(exercise_id=exercise.id, group_id=group.id, assigned_by_id=approved_teacher_user.id)
+    session.add(homework)
+    session.flush()
+    enqueue_homework_notifications(homework)
+    session.commit()
+
+    bot = AsyncMock()
+    bot.send_message.side_effect = RetryAfter(30)
+    await drain(bot, fast_limiter)
+    row = session.query(NotificationOutbox).one()
+    assert row.status == 'pending'
+    assert timedelta(seconds=25) < row.next_attempt_at - datetime.utcnow() <= timedelta(seconds=30)
+
+    # The whole limiter is held back too, so carry on with a fresh one.
+    limiter = AsyncRateLimiter(rate=10000)
+    bot.send_message.side_effect = NetworkError("down")
+    for _ in range(notification_service.MAX_ATTEMPTS - 1):
+        row.next_attempt_at = datetime.utcnow()
+        session.commit()
+        await drain(bot, limiter)
+    assert (row.status, row.attempts) == ('failed', notification_service.MAX_ATTEMPTS)
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_spaces_sends():
+    limiter = AsyncRateLimiter(rate=100)
+    start = time.monotonic()
+    await asyncio.gather(*(limiter.acquire() for _ in range(21)))
+    assert time.monotonic() - start >= 0.19
@@ -0,0 +1,237 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import openai
+import pytest
+
+from services import openai_resilience
+from services.openai_resilience import AIServiceBusyError, CircuitBreaker, ConcurrencyLimiter, StreamDeadlineError
+from services.openai_service import OpenAIService
+
+COMPLETION = {
+    "id": "chatcmpl-stub",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "stubbed"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7},
+}
+STREAM_WORDS = ["streamed ", "in ", "parts"]
+
+
+class FaultInjectingServer(ThreadingHTTPServer):
+    """
+    A local stand-in for the OpenAI proxy. Each request consumes the next
+    (status, delay) fault from `script`; the last one repeats forever. A
+    successful streaming request sends its chunks `delay` seconds apart.
+    """
+    daemon_threads = True
+    block_on_close = False
+
+    def __init__(self, script):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.script = list(script)
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def next_fault(self):
+        with self.lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            return self.script.pop(0) if len(self.script) > 1 else self.script[0]
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        status, delay = self.server.next_fault()
+        try:
+            if status == 200 and request.get("stream"):
+                self._stream(delay)
+                return
+            time.sleep(delay)
+            body = json.dumps(COMPLETION if status == 200 else {"error": {"message": "injected", "type": "server_error"}}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client gave up on a slow response.
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+    def _stream(self, delay):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        base = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": 0, "model": "gpt-4o"}
+        for word in STREAM_WORDS:
+            time.sleep(delay)
+            chunk = {**base, "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        chunk = {**base, "choices": [], "usage": COMPLETION["usage"]}
+        self.wfile.write(f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n".encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_upstream(monkeypatch):
+    """Points OpenAIService at a fault-injecting server and resets the shared breaker and limiter."""
+    servers = []
+
+    def start(*script):
+        server = FaultInjectingServer(script)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}/v1")
+        return server
+
+    monkeypatch.setattr(openai_resilience, "upstream_breaker", CircuitBreaker(min_calls=3, cooldown=60))
+    monkeypatch.setattr(openai_resilience, "upstream_slots", ConcurrencyLimiter(8, wait=1.0))
+    monkeypatch.setattr(openai_resilience, "BACKOFF_BASE", 0.01)
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _ask(service):
+    return service._chat_completion("generate_definition", model="gpt-4o", messages=[{"role": "user", "content": "hi"}])
+
+
+def test_transient_errors_are_retried(stub_upstream):
+    server = stub_upstream((503, 0), (429, 0), (200, 0))
+
+    response = _ask(OpenAIService(api_key="sk-test"))
+
+    assert response.choices[0].message.content == "stubbed"
+    assert server.requests == 3
+
+
+def test_client_errors_are_not_retried(stub_upstream):
+    server = stub_upstream((400, 0))
+
+    with pytest.raises(openai.BadRequestError):
+        _ask(OpenAIService(api_key="sk-test"))
+    assert server.requests == 1
+
+
+def test_slow_upstream_is_cut_off_at_the_method_deadline(stub_upstream, monkeypatch):
+    stub_upstream((200, 3))
+    monkeypatch.setitem(openai_resilience.METHOD_DEADLINES, "generate_definition", 0.5)
+
+    start = time.monotonic()
+    with pytest.raises(openai.APITimeoutError):
+        _ask(OpenAIService(api_key="sk-test"))
+    assert time.monotonic() - start < 2
+
+
+def test_circuit_opens_and_fails_fast(stub_upstream, monkeypatch):
+    server = stub_upstream((500, 0))
+    monkeypatch.setattr(openai_resilience, "MAX_RETRIES", 0)
+    service = OpenAIService(api_key="sk-test")
+
+    for _ in range(3):
+        with pytest.raises(openai.InternalServerError):
+            _ask(service)
+    assert openai_resilience.upstream_breaker.state == "open"
+
+    with pytest.raises(AIServiceBusyError):
+        _ask(service)
+    assert server.requests == 3
+
+    # Question generation degrades to the pooled questions instead of failing.
+    question = service.generate_speaking_question(part_number=3, topic="space exploration")
+    assert question["question"]
+    assert server.requests == 3
+
+
+def test_concurrency_cap_rejects_excess_calls(stub_upstream, monkeypatch):
+    server = stub_upstream((200, 0.5))
+    monkeypatch.setattr(openai_resilience, "upstream_slots", ConcurrencyLimiter(1, wait=0.05))
+    service = OpenAIService(api_key="sk-test")
+
+    first = threading.Thread(target=_ask, args=(service,))
+    first.start()
+    time.sleep(0.1)
+    with pytest.raises(AIServiceBusyError):
+        _ask(service)
+    first.join()
+
+    assert server.max_in_flight == 1
+
+
+def _stream(service):
+    return list(service._stream_chat_completion("generate_definition", model="gpt-4o", messages=[{"role": "user", "content": "hi"}]))
+
+
+def test_stream_holds_its_slot_until_it_ends(stub_upstream, monkeypatch):
+    stub_upstream((200, 0.2))
+    monkeypatch.setattr(openai_resilience, "upstream_slots", ConcurrencyLimiter(1, wait=0.05))
+    service = OpenAIService(api_key="sk-test")
+    texts = []
+
+    first = threading.Thread(target=lambda: texts.extend(_stream(service)))
+    first.start()
+    time.sleep(0.3)  # The stream is open and its first chunk has arrived.
+    with pytest.raises(AIServiceBusyError):
+        _ask(service)
+    first.join()
+
+    assert texts[-1] == "".join(STREAM_WORDS)
+    assert openai_resilience.upstream_breaker.state == "closed"
+
+
+def test_stream_is_cut_off_at_the_method_deadline(stub_upstream, monkeypatch):
+    stub_upstream((200, 0.3))
+    monkeypatch.setitem(openai_resilience.METHOD_DEADLINES, "generate_definition", 0.5)
+    monkeypatch.setattr(openai_resilience, "upstream_breaker", CircuitBreaker(min_calls=1, cooldown=60))
+
+    start = time.monotonic()
+    with pytest.raises(StreamDeadlineError):
+        _stream(OpenAIService(api_key="sk-test"))
+    assert time.monotonic() - start < 1.5
+    assert openai_resilience.upstream_breaker.state == "open"
+
+
+def test_half_open_probe_closes_circuit():
+    breaker = CircuitBreaker(min_calls=2, cooldown=0.05)
+    breaker.record(failed=True)
+    breaker.record(failed=True)
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # Only one probe at a time.
+    breaker.record(failed=False)
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_half_open_probe_that_loses_the_slot_race_does_not_wedge_the_circuit(monkeypatch):
+    breaker = CircuitBreaker(min_calls=2, cooldown=0.05)
+    slots = ConcurrencyLimiter(1, wait=0.05)
+    monkeypatch.setattr(openai_resilience, "upstream_breaker", breaker)
+    monkeypatch.setattr(openai_resilience, "upstream_slots", slots)
+    breaker.record(failed=True)
+    breaker.record(failed=True)
+    time.sleep(0.06)
+
+    with slots.slot():
+        with pytest.raises(AIServiceBusyError):
+            openai_resilience.call_upstream("generate_definition", lambda timeout: "unreachable")
+    assert breaker.state == "half_open"
+
+    assert openai_resilience.call_upstream("generate_definition", lambda timeout: "probed") == "probed"
+    assert breaker.state == "closed"
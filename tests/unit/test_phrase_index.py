@@ -0,0 +1,64 @@
+import json
+import pytest
+
+from utils.phrase_index import (
+    AhoCorasick,
+    PhraseIndex,
+    build_phrase_table,
+    format_phrase_review,
+    get_phrase_index,
+)
+from utils.speaking_corpus import SpeakingCorpus
+
+FURNITURE = """#### 1. What kind of furniture would you like to buy?
+**Ideally**, I'd like a swivel chair. I would like to **splurge on** something **top-of-the-line** for once.
+
+---
+#### 2. Do you have a lot of furniture?
+I have **quite a bit** actually, including **a big sofa**.
+"""
+
+
+@pytest.fixture
+def phrase_index(tmp_path):
+    (tmp_path / "001-furniture.md").write_text(FURNITURE)
+    path = tmp_path / "phrase_table.json"
+    assert build_phrase_table(SpeakingCorpus.from_directory(str(tmp_path)), str(path)) == 5
+    return PhraseIndex.load(str(path))
+
+
+def test_automaton_finds_overlapping_patterns():
+    automaton = AhoCorasick([tuple("he"), tuple("she"), tuple("his"), tuple("hers")])
+    matches = sorted(automaton.find("ushers"))
+    assert matches == [(3, 0), (3, 1), (5, 3)]
+
+
+def test_phrase_table_keeps_topic_and_source_sentence(tmp_path, phrase_index):
+    row = next(r for r in json.loads((tmp_path / "phrase_table.json").read_text()) if r["text"] == "splurge on")
+    assert row == {
+        "text": "splurge on",
+        "topic": "Furniture",
+        "sentence": "I would like to splurge on something top-of-the-line for once.",
+    }
+
+
+def test_used_phrases_match_whole_words_and_inflections(phrase_index):
+    used = phrase_index.used("Last year I splurged on a top-of-the-line laptop, quite a bit of money.")
+    assert [p.text for p in used] == ["splurge on", "top-of-the-line", "quite a bit"]
+    assert phrase_index.used("A bigger sofa would be nice.") == []
+
+
+def test_review_suggests_unused_phrases_for_the_topic(phrase_index):
+    review = phrase_index.review("I have quite a bit of furniture.", "What furniture do you have at home?")
+    assert [p.text for p in review["used"]] == ["quite a bit"]
+    assert "quite a bit" not in [p.text for p in review["suggested"]]
+
+    message = format_phrase_review(review, "en")
+    assert "Target phrases you used: quite a bit" in message
+    assert format_phrase_review({"used": [], "suggested": []}, "en") is None
+
+
+def test_shipped_phrase_index():
+    index = get_phrase_index()
+    assert len(index.phrases) > 500
+    assert "top-of-the-line" in [p.text for p in index.used("I bought a top-of-the-line phone.")]
@@ -0,0 +1,86 @@
+from contextlib import contextmanager
+
+import pytest
+from flask import session as flask_session
+from sqlalchemy import event
+
+from extensions import db
+from models import Group, GroupMembership, TeacherExercise
+from services.principal_service import authorize, current_principal, invalidate_principal
+
+
+@pytest.fixture
+def teacher_with_group(session, approved_teacher_user, regular_user):
+    group = Group(name="Owned", teacher_id=approved_teacher_user.id)
+    exercise = TeacherExercise(title="Owned", creator_id=approved_teacher_user.id, exercise_type="reading",
+                               difficulty="easy", content={})
+    session.add_all([group, exercise])
+    session.flush()
+    session.add(GroupMembership(group_id=group.id, student_id=regular_user.id))
+    session.commit()
+    return approved_teacher_user.id, group.id, exercise.id, regular_user.id
+
+
+@contextmanager
+def _request(app, user_id, login_id):
+    with app.test_request_context():
+        flask_session['user_id'] = user_id
+        flask_session['login_id'] = login_id
+        yield
+
+
+def test_principal_holds_owned_resources(app, teacher_with_group):
+    user_id, group_id, exercise_id, student_id = teacher_with_group
+    with _request(app, user_id, "owned"):
+        principal = current_principal()
+    assert principal.owns_group(group_id) and principal.owns_exercise(exercise_id)
+    assert principal.teaches_student(student_id)
+    assert not principal.owns_group(group_id + 1)
+
+
+def test_cached_principal_authorizes_without_queries(app, teacher_with_group):
+    user_id, group_id, _, student_id = teacher_with_group
+    with _request(app, user_id, "cached"):
+        current_principal()
+
+    statements = []
+    record = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        with _request(app, user_id, "cached"):
+            assert authorize(lambda p: p.owns_group(group_id) and p.teaches_student(student_id))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert statements == []
+
+
+def test_denial_is_confirmed_against_a_fresh_load(app, session, teacher_with_group):
+    user_id = teacher_with_group[0]
+    with _request(app, user_id, "stale"):
+        current_principal()
+
+    # Created elsewhere, so this worker's cached principal does not know about it yet.
+    group = Group(name="Created elsewhere", teacher_id=user_id)
+    session.add(group)
+    session.commit()
+
+    with _request(app, user_id, "stale"):
+        assert authorize(lambda p: p.owns_group(group.id))
+        assert not authorize(lambda p: p.owns_group(group.id + 100))
+
+
+def test_invalidation_drops_every_login_of_the_user(app, session, teacher_with_group):
+    user_id, group_id, _, _ = teacher_with_group
+    for login_id in ("tab-1", "tab-2"):
+        with _request(app, user_id, login_id):
+            assert current_principal().owns_group(group_id)
+
+    session.query(GroupMembership).delete()
+    session.query(Group).delete()
+    session.commit()
+    with _request(app, user_id, "tab-1"):
+        invalidate_principal(user_id)
+
+    for login_id in ("tab-1", "tab-2"):
+        with _request(app, user_id, login_id):
+            assert not current_principal().owns_group(group_id)
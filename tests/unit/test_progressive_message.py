@@ -0,0 +1,84 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from telegram.error import RetryAfter
+
+from services import ai_usage_service
+from services.openai_service import OpenAIService, parse_partial_json
+from utils import progressive_message
+from utils.progressive_message import ProgressiveMessage, iterate_in_thread
+
+
+def _chunk(content=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content is not None else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+@pytest.mark.asyncio
+async def test_updates_are_throttled_and_final_text_always_sent():
+    message = MagicMock()
+    message.edit_text = AsyncMock()
+    clock = iter([0.0, 0.2, 1.1, 1.5, 2.3])
+
+    with patch.object(progressive_message.time, "monotonic", side_effect=lambda: next(clock)):
+        progress = ProgressiveMessage(message, interval=1.0)  # t=0.0
+        await progress.update("a")      # t=0.2, inside the first window
+        await progress.update("ab")     # t=1.1, shown
+        await progress.update("abc")    # t=1.5, dropped
+        await progress.update("abcd")   # t=2.3, shown
+    await progress.finish("abcd")        # unchanged, so no extra edit
+    await progress.finish("abcd", parse_mode="Markdown")
+
+    assert [c.args[0] for c in message.edit_text.call_args_list] == ["ab", "abcd", "abcd"]
+    assert message.edit_text.call_args.kwargs == {"parse_mode": "Markdown"}
+
+
+@pytest.mark.asyncio
+async def test_retry_after_pauses_progressive_edits():
+    message = MagicMock()
+    message.edit_text = AsyncMock(side_effect=[RetryAfter(30), None])
+
+    progress = ProgressiveMessage(message, interval=0)
+    await progress.update("first")
+    await progress.update("second")  # still inside the 30s pause
+    await progress.finish("done")
+
+    assert [c.args[0] for c in message.edit_text.call_args_list] == ["first", "done"]
+
+
+@pytest.mark.asyncio
+async def test_iterate_in_thread_yields_every_item():
+    assert [item async for item in iterate_in_thread(x * 2 for x in range(5))] == [0, 2, 4, 6, 8]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"strengths": ["Clear thesis", "Good link', {"strengths": ["Clear thesis", "Good link"]}),
+    ('{"strengths": ["Clear thesis"], "task_achie', {"strengths": ["Clear thesis"]}),
+    ('{"task_achievement": "Addresses both \\', {"task_achievement": "Addresses both "}),
+    ('{"lexical_resource": "Wide", "estimated_band": 7.', {"lexical_resource": "Wide"}),
+    ('', {}),
+])
+def test_parse_partial_json(text, expected):
+    assert parse_partial_json(text) == expected
+
+
+def test_stream_writing_feedback_yields_partials_then_full_feedback(app):
+    service = OpenAIService(api_key="sk-test", user_id=None)
+    service.client = MagicMock()
+    service.client.chat.completions.create.return_value = iter([
+        _chunk('{"strengths": ["Clear'),
+        _chunk(' thesis"], "estimated'),
+        _chunk('_band": 7.5}'),
+        _chunk(usage=SimpleNamespace(prompt_tokens=300, completion_tokens=20)),
+    ])
+    ai_usage_service.usage_recorder._buffer.clear()
+
+    items = list(service.stream_writing_feedback("An essay.", 2, "A question?"))
+
+    assert items[0] == {"strengths": ["Clear"]}
+    assert items[-1] == {"strengths": ["Clear thesis"], "estimated_band": 7.5}
+    assert service.client.chat.completions.create.call_args.kwargs["stream"] is True
+    recorded = ai_usage_service.usage_recorder._buffer[-1]
+    assert recorded["feature"] == "writing_feedback"
+    assert recorded["completion_tokens"] == 20
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from extensions import db
+from models import (
+    Group, GroupMembership, Homework, HomeworkSubmission, NotificationOutbox, ScheduledJob, TeacherExercise, User,
+)
+from services import reminder_service
+from services.reminder_service import REMINDER_JOB, acquire_lock, queue_due_reminders, release_lock, run_exclusively
+
+NOW = datetime(2026, 10, 20, 12, 0)
+
+
+@pytest.fixture
+def homework_due(session, approved_teacher_user):
+    group = Group(name="Morning Class", teacher_id=approved_teacher_user.id)
+    exercise = TeacherExercise(title="Task 1 report", creator_id=approved_teacher_user.id,
+                               exercise_type="writing", difficulty="easy", content={})
+    students = [User(user_id=80000 + i, first_name=f"S{i}") for i in range(3)]
+    session.add_all([group, exercise, *students])
+    session.flush()
+    session.add_all([GroupMembership(group_id=group.id, student_id=s.id) for s in students])
+    session.commit()
+
+    def create(due_in: timedelta, submitted_by=()):
+        homework = Homework(exercise_id=exercise.id, group_id=group.id, assigned_by_id=approved_teacher_user.id,
+                            due_date=NOW + due_in)
+        session.add(homework)
+        session.flush()
+        session.add_all([HomeworkSubmission(homework_id=homework.id, student_id=students[i].id, content={})
+                         for i in submitted_by])
+        session.commit()
+        return homework
+    create.students = students
+    return create
+
+
+def _tick(now):
+    return run_exclusively(REMINDER_JOB, lambda: queue_due_reminders(now))
+
+
+def test_reminds_students_without_a_submission_once(session, homework_due):
+    soon = homework_due(timedelta(hours=10), submitted_by=[0])
+    homework_due(timedelta(hours=48))
+    homework_due(-timedelta(hours=1))
+
+    assert _tick(NOW) == 2
+    rows = session.query(NotificationOutbox).all()
+    assert {r.chat_id for r in rows} == {s.user_id for s in homework_due.students[1:]}
+    assert {r.idempotency_key.split(':')[1] for r in rows} == {str(soon.id)}
+    assert rows[0].text.startswith('⏰ Reminder: "Task 1 report" for Morning Class is due 2026-10-20 22:00 (UTC)')
+
+    # The next tick only covers the newly entered slice of the due-date range.
+    assert _tick(NOW + timedelta(minutes=5)) == 0
+    assert _tick(NOW + timedelta(hours=25)) == 3
+    assert session.query(NotificationOutbox).count() == 5
+
+
+def test_tick_cost_does_not_grow_with_homework_count(session, homework_due):
+    homework_due(timedelta(hours=3))
+    _tick(NOW)
+    for days in range(2, 102):
+        homework_due(timedelta(days=days))
+
+    statements = []
+    record = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        _tick(NOW + timedelta(minutes=5))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert len([s for s in statements if 'FROM homework' in s]) == 1
+    assert len(statements) <= 8
+
+
+def test_only_one_worker_holds_the_lock(session, monkeypatch):
+    assert acquire_lock(REMINDER_JOB)
+    monkeypatch.setattr(reminder_service, 'WORKER_ID', 'other-host:1')
+    assert not acquire_lock(REMINDER_JOB)
+    assert run_exclusively(REMINDER_JOB, lambda: 'ran') is None
+
+    # A holder that died without releasing loses the lock when its lease runs out.
+    job = session.get(ScheduledJob, REMINDER_JOB)
+    job.locked_until = datetime.utcnow() - timedelta(seconds=1)
+    session.commit()
+    assert run_exclusively(REMINDER_JOB, lambda: 'ran') == 'ran'
+    session.refresh(job)
+    assert job.locked_by is None
+
+
+def test_scheduler_has_reminder_and_delivery_jobs(app):
+    scheduler = reminder_service.build_scheduler(app, bot=None)
+    assert {job.id for job in scheduler.get_jobs()} == {REMINDER_JOB, reminder_service.SCORING_JOB, 'notification_outbox'}
@@ -0,0 +1,139 @@
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import event
+
+from extensions import db
+from models import Group, GroupMembership, PracticeSession, User
+from services.skill_assessment_service import (
+    SkillEngine, recompute_skill_levels, session_performance, skill_engine, update_skill_level_from_session,
+)
+
+START = datetime(2026, 10, 1, 9, 0)
+
+
+def test_levels_come_from_the_threshold_table_by_bisection(tmp_path):
+    assert [skill_engine.level_for(s) for s in (0.0, 0.2, 0.21, 0.6, 0.61, 0.81, 1.0)] == [
+        "Beginner", "Beginner", "Elementary", "Intermediate", "Upper-Intermediate", "Advanced", "Advanced",
+    ]
+    path = tmp_path / "levels.json"
+    path.write_text(json.dumps({"alpha": 0.5, "levels": {"B2": 0.6, "A1": 0.0, "C1": 0.85}}))
+    engine = SkillEngine.from_file(str(path))
+    assert (engine.names, engine.alpha) == (("A1", "B2", "C1"), 0.5)
+    assert list(engine.level_indexes(np.array([0.1, 0.6, 0.9]))) == [0, 1, 2]
+    with pytest.raises(ValueError):
+        SkillEngine({"B2": 0.6}, alpha=0.3)
+
+
+def test_level_follows_a_moving_average_of_results(session, sample_user):
+    def practice(correct):
+        practice_session = PracticeSession(user_id=sample_user.id, section="reading", completed_at=START,
+                                           total_questions=10, correct_answers=correct)
+        return update_skill_level_from_session(sample_user, practice_session)
+
+    assert practice(9) == "Advanced"
+    # One poor session lowers the average without wiping out the history.
+    assert practice(1) == "Upper-Intermediate"
+    assert sample_user.skill_score == pytest.approx(0.3 * 0.1 + 0.7 * 0.9)
+    assert practice(7) is None
+
+
+def test_sessions_are_scored_on_their_own_scale():
+    def performance(**columns):
+        return session_performance(PracticeSession(completed_at=START, **columns))
+
+    assert performance(section="listening", total_questions=4, correct_answers=3) == 0.75
+    assert performance(section="writing_task_2", total_questions=1, score=6.3) == pytest.approx(0.7)
+    assert performance(section="speaking", total_questions=2, score=None) is None
+    assert performance(section="reading", total_questions=0) is None
+    # An abandoned session has its question count but no result.
+    assert session_performance(PracticeSession(section="listening", total_questions=4, correct_answers=0)) is None
+
+
+@pytest.fixture
+def history(session, approved_teacher_user):
+    """Students with a month of mixed practice, the first two in a group."""
+    rng = np.random.default_rng(7)
+    students = [User(user_id=60000 + i, first_name=f"S{i}") for i in range(6)]
+    group = Group(name="Batch Group", teacher_id=approved_teacher_user.id)
+    session.add_all([group, *students])
+    session.flush()
+    session.add_all([GroupMembership(group_id=group.id, student_id=s.id) for s in students[:2]])
+    sessions = []
+    for student in students:
+        for day in range(int(rng.integers(1, 12))):
+            section = rng.choice(["reading", "listening", "writing_task_2", "speaking"])
+            started = START + timedelta(days=day)
+            if section in ("reading", "listening"):
+                sessions.append(PracticeSession(user_id=student.id, section=section, started_at=started,
+                                                completed_at=started, total_questions=5,
+                                                correct_answers=int(rng.integers(0, 6))))
+            else:
+                sessions.append(PracticeSession(user_id=student.id, section=section, started_at=started,
+                                                completed_at=started, total_questions=1,
+                                                score=float(rng.integers(3, 10))))
+    # Unfinished sessions carry no result and are skipped.
+    sessions.append(PracticeSession(user_id=students[0].id, section="reading", started_at=START, total_questions=0))
+    sessions.append(PracticeSession(user_id=students[1].id, section="listening", started_at=START,
+                                    total_questions=5, correct_answers=0))
+    session.add_all(sessions)
+    session.commit()
+    return group, students
+
+
+def test_batch_recompute_matches_recording_each_session_in_turn(session, history):
+    group, students = history
+    expected = {}
+    for student in students:
+        replay = User(skill_level="Beginner")
+        for practice_session in sorted(student.practice_sessions, key=lambda s: (s.started_at, s.id)):
+            update_skill_level_from_session(replay, practice_session)
+        expected[student.id] = (replay.skill_level, replay.skill_score)
+
+    statements = []
+    record = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        changed = recompute_skill_levels()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    session.expire_all()
+    for student in students:
+        level, score = expected[student.id]
+        assert student.skill_level == level
+        assert student.skill_score == pytest.approx(score)
+    assert changed == sum(level != "Beginner" for level, _ in expected.values())
+    assert len([s for s in statements if s.startswith('UPDATE users')]) == 1
+    # Nothing has changed since, so a second run changes no levels.
+    assert recompute_skill_levels() == 0
+
+
+def test_batch_recompute_for_one_group(session, history):
+    group, students = history
+    for student in students:
+        student.skill_level, student.skill_score = "Beginner", None
+    session.commit()
+
+    recompute_skill_levels(group.id)
+    session.expire_all()
+    assert all(s.skill_score is not None for s in students[:2])
+    assert all(s.skill_score is None for s in students[2:])
+
+
+def test_batch_recompute_ignores_abandoned_sessions(session, sample_user):
+    finished = PracticeSession(user_id=sample_user.id, section="reading", started_at=START,
+                               completed_at=START, total_questions=5, correct_answers=5)
+    abandoned = [
+        PracticeSession(user_id=sample_user.id, section="listening", started_at=START + timedelta(days=day),
+                        total_questions=5, correct_answers=0)
+        for day in range(1, 4)
+    ]
+    session.add_all([finished, *abandoned])
+    session.commit()
+
+    assert recompute_skill_levels() == 1
+    session.expire_all()
+    assert (sample_user.skill_level, sample_user.skill_score) == ("Advanced", 1.0)
@@ -0,0 +1,127 @@
+import time
+import pytest
+from unittest.mock import MagicMock
+
+from services.openai_service import OpenAIService
+from utils import speaking_corpus
+from utils.lexicon import get_lexicon
+from utils.speaking_corpus import SpeakingCorpus, get_speaking_corpus, parse_topic_file, tokenize
+
+PART_1 = """#### 1. Do you have a lot of **furniture** in your home?
+I have **quite a bit** actually, including a big **wardrobe**.
+
+---
+#### 2. What kind of furniture would you like to buy?
+**Ideally**, a swivel chair.
+
+---
+"""
+
+PART_2_AND_3 = """### PART 2
+
+**Describe a city where you'd like to stay for a short time.**
+- **What city is**
+- **Who you will go there with**
+
+#### what city is:
+I would like to go to a city with rainy weather.
+
+#### who you will go there with
+My partner.
+
+### PART 3
+
+#### 1. **Why are historical cities popular?**
+They have the heritage of past generations in them.
+"""
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    (tmp_path / "001-furniture.md").write_text(PART_1)
+    (tmp_path / "0030-city.md").write_text(PART_2_AND_3)
+    (tmp_path / "028-concentration.md").write_text("")
+    (tmp_path / "README.md").write_text("#### List of Contents:\n")
+    return SpeakingCorpus.from_directory(str(tmp_path))
+
+
+def test_parses_questions_answers_and_vocabulary(tmp_path):
+    path = tmp_path / "008-hurrying-&-rushing.md"
+    path.write_text(PART_1)
+    first, second = parse_topic_file(str(path))
+
+    assert first.topic == "Hurrying & Rushing"
+    assert first.part == 1
+    assert first.question == "Do you have a lot of furniture in your home?"
+    assert first.model_answer == "I have quite a bit actually, including a big wardrobe."
+    assert first.vocabulary == ("quite a bit", "wardrobe")
+    assert second.vocabulary == ("ideally",)
+
+
+def test_parses_cue_cards_and_part_3(corpus):
+    assert len(corpus) == 4
+    cue_card = next(q for q in corpus.questions if q.part == 2)
+    assert cue_card.question == (
+        "Describe a city where you'd like to stay for a short time.\n- What city is\n- Who you will go there with"
+    )
+    assert "rainy weather" in cue_card.model_answer and "My partner." in cue_card.model_answer
+    part_3 = next(q for q in corpus.questions if q.part == 3)
+    assert part_3.question == "Why are historical cities popular?"
+    assert corpus.topics() == ["City", "Furniture"]
+
+
+def test_search_ranks_by_bm25(corpus):
+    results = corpus.search("buying furniture")
+    assert [q.question for _, q in results][:2] == [
+        "What kind of furniture would you like to buy?",
+        "Do you have a lot of furniture in your home?",
+    ]
+    assert results[0][0] > results[1][0]
+    # Plurals match through the lexicon's dictionary forms.
+    assert corpus.search("popular city", part=3)[0][1].question == "Why are historical cities popular?"
+    assert corpus.search("astronomy") == []
+
+
+def test_pick_requires_a_relevant_match(corpus):
+    assert corpus.pick(2).part == 2
+    assert corpus.pick(3, topic="A historical city").question == "Why are historical cities popular?"
+    assert corpus.pick(3, topic="space exploration") is None
+    assert corpus.pick(3, topic="rainy weather") is None  # only mentioned in an answer
+
+
+def test_shipped_corpus_searches_quickly():
+    corpus = get_speaking_corpus()
+    assert len(corpus) > 100
+    corpus.search("a city you would like to visit")
+
+    start = time.perf_counter()
+    for _ in range(100):
+        corpus.search("a city you would like to visit")
+    assert (time.perf_counter() - start) / 100 < 0.001
+
+
+def test_corpus_is_reindexed_once_the_lexicon_loads(monkeypatch):
+    monkeypatch.setattr(speaking_corpus, "_corpus", None)
+    monkeypatch.setattr(speaking_corpus, "get_lexicon", lambda: None)  # Still being rebuilt
+    assert tokenize("past generations") == ["past", "generations"]
+    raw = get_speaking_corpus()
+    assert get_speaking_corpus() is raw
+
+    monkeypatch.setattr(speaking_corpus, "get_lexicon", get_lexicon)
+    assert tokenize("past generations") == ["past", "generation"]
+    corpus = get_speaking_corpus()
+    assert corpus is not raw
+    assert get_speaking_corpus() is corpus
+    assert "generation" in corpus._idf and "generations" not in corpus._idf
+
+
+def test_speaking_questions_come_from_the_corpus_first():
+    service = OpenAIService(api_key="sk-test")
+    service.client = MagicMock()
+
+    question = service.generate_speaking_question(part_number=2)
+    assert question["question"].startswith("Describe")
+    assert question["model_answer"]
+    follow_up = service.generate_speaking_question(part_number=3, topic=question["topic"])
+    assert follow_up["topic"] == question["topic"]
+    service.client.chat.completions.create.assert_not_called()
@@ -0,0 +1,74 @@
+import random
+import pytest
+
+from utils.lexicon import Lexicon, build_lexicon
+from utils.spelling import (
+    SpellingIndex,
+    batch_distances,
+    build_spelling_index,
+    damerau_levenshtein,
+    get_spelling_index,
+)
+
+
+@pytest.fixture
+def small_index(tmp_path):
+    source = tmp_path / "dictionaries"
+    source.mkdir()
+    # 'receive' is listed twice (two senses), so it outranks 'relieve' at the same distance.
+    (source / "words.csv").write_bytes(
+        b"receive \nreceive \nrelieve \nreceiver \ntheir \ntier \nenvironment \nwell known \n"
+    )
+    lexicon_path = tmp_path / "lexicon.bin"
+    build_lexicon(str(source), str(lexicon_path))
+    lexicon = Lexicon(str(lexicon_path))
+    index_path = tmp_path / "spelling.bin"
+    build_spelling_index(lexicon, str(index_path), str(source))
+    return SpellingIndex(lexicon, str(index_path))
+
+
+@pytest.mark.parametrize("a, b, distance", [
+    ("receive", "receive", 0),
+    ("recieve", "receive", 1),   # transposition
+    ("enviroment", "environment", 1),
+    ("recive", "relieve", 2),
+    ("cat", "receive", 3),       # capped at max_distance + 1
+])
+def test_damerau_levenshtein(a, b, distance):
+    assert damerau_levenshtein(a, b) == distance
+
+
+def test_batch_distances_match_scalar():
+    random.seed(7)
+    words = ["".join(random.choices("abcde", k=random.randint(1, 8))) for _ in range(300)]
+    for query in ["abcd", "badc", "e", "abcdeabc"]:
+        expected = [damerau_levenshtein(query, w, max_distance=20) for w in words]
+        assert batch_distances(query, words).tolist() == expected
+
+
+def test_suggestions_are_ranked(small_index):
+    assert small_index.suggest("recieve") == ["receive", "relieve", "receiver"]
+    assert small_index.suggest("thier") == ["their", "tier"]
+    assert small_index.suggest("Enviroment") == ["environment"]
+
+
+def test_no_suggestions_for_gibberish_or_exact_words(small_index):
+    assert small_index.suggest("qwzxv") == []
+    assert "receive" not in small_index.suggest("receive")
+    # Multiword entries are not indexed.
+    assert small_index.suggest("well knwn") == []
+
+
+def test_index_must_match_lexicon(small_index, tmp_path):
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "words.csv").write_bytes(b"apple \n")
+    build_lexicon(str(other), str(other / "lexicon.bin"))
+    with pytest.raises(ValueError):
+        SpellingIndex(Lexicon(str(other / "lexicon.bin")), str(tmp_path / "spelling.bin"))
+
+
+def test_shipped_index_corrects_common_misspellings():
+    index = get_spelling_index()
+    assert index.suggest("goverment")[0] == "government"
+    assert index.suggest("definately")[0] == "definitely"
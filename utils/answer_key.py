@@ -0,0 +1,368 @@
+"""
+Compiled answer keys for TeacherExercise content.
+
+Exercise content is free-form JSON. Before an exercise is published its
+questions are compiled into an AnswerKey: option lists and correct indexes
+are checked, accepted free-text answers are normalized, and every
+auto-gradable question gets one precompiled regex. Grading a submission is
+then a single loop over prebuilt checks, with no JSON walking.
+
+A question is one of:
+
+* multiple choice: `options` (two or more strings) and `correct_option_index`;
+* free text: `answer` and/or `accepted_answers`, optionally with an
+  `answer_pattern` regex for answers that are easier to describe than list
+  ('1[89]th century'). Patterns run in the scoring worker against student
+  text, so they are kept to a subset that cannot backtrack badly:
+  literals, character sets, groups, alternation and quantifiers, with no
+  repeated group that itself repeats or alternates ('(a+)+', '(a|ab)*'),
+  at most one unbounded repeat ('.*.*x' is refused), at most
+  MAX_PATTERN_WAYS ways to split an answer between the bounded ones, and
+  at most MAX_PATTERN_LENGTH characters. Typed answers longer than
+  MAX_ANSWER_LENGTH are not matched at all;
+* open: just `text`, left for a teacher or the essay grader.
+
+Compiled keys are cached per process by (exercise id, updated_at), so an
+edited exercise is recompiled on first use and never graded against a
+stale key.
+"""
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+CACHE_SIZE = 1024
+MAX_PATTERN_LENGTH = 200
+MAX_ANSWER_LENGTH = 200
+# Ways a pattern's bounded repeats and alternatives can split one answer between them.
+MAX_PATTERN_WAYS = 1000
+
+_SPACES = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s.,;:!?]+$")
+
+
+class AnswerKeyError(ValueError):
+    """Exercise content that cannot be compiled into an answer key."""
+
+
+def normalize_answer(text: str) -> str:
+    """Casefolds, collapses whitespace and drops trailing punctuation."""
+    return _TRAILING_PUNCTUATION.sub("", _SPACES.sub(" ", text.strip()).casefold())
+
+
+@dataclass(frozen=True)
+class QuestionKey:
+    text: str
+    options: tuple[str, ...] = ()
+    correct_index: int | None = None
+    accepted: frozenset[str] = frozenset()
+    # Full-match regex over a normalized typed answer; None for open questions.
+    pattern: re.Pattern | None = None
+
+    @property
+    def kind(self) -> str:
+        if self.options:
+            return "choice"
+        return "text" if self.pattern else "open"
+
+
+def _choice_check(correct: int, pattern: re.Pattern):
+    match = pattern.fullmatch
+
+    def check(answer) -> bool:
+        if isinstance(answer, str):
+            return match(normalize_answer(answer)) is not None
+        return answer == correct
+    return check
+
+
+def _text_check(pattern: re.Pattern):
+    match = pattern.fullmatch
+
+    def check(answer) -> bool:
+        return (isinstance(answer, str) and len(answer) <= MAX_ANSWER_LENGTH
+                and match(normalize_answer(answer)) is not None)
+    return check
+
+
+class AnswerKey:
+    """The compiled questions of one exercise and a check per gradable question."""
+    __slots__ = ("questions", "_checks")
+
+    def __init__(self, questions: tuple[QuestionKey, ...]):
+        self.questions = questions
+        self._checks = tuple(
+            (i, _choice_check(q.correct_index, q.pattern) if q.kind == "choice" else _text_check(q.pattern))
+            for i, q in enumerate(questions) if q.kind != "open"
+        )
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    @property
+    def gradable(self) -> int:
+        return len(self._checks)
+
+    @property
+    def all_choice(self) -> bool:
+        return bool(self.questions) and all(q.kind == "choice" for q in self.questions)
+
+    def grade(self, answers) -> int | None:
+        """
+        Scores `answers` (one per question: option index, typed text or None)
+        as a percentage of the gradable questions. Returns None if there are none.
+        """
+        if not self._checks:
+            return None
+        if not isinstance(answers, (list, tuple)):
+            answers = ()
+        count = len(answers)
+        correct = 0
+        for i, check in self._checks:
+            if i < count and check(answers[i]):
+                correct += 1
+        return round(100 * correct / len(self._checks))
+
+
+def _strings(value, field: str, number: int) -> list[str]:
+    if not isinstance(value, list) or not all(isinstance(v, str) and v.strip() for v in value):
+        raise AnswerKeyError(f"Question {number}: '{field}' must be a list of non-empty strings.")
+    return value
+
+
+def _compile_pattern(alternatives: list[str], number: int) -> re.Pattern:
+    try:
+        return re.compile("|".join(f"(?:{a})" for a in alternatives), re.IGNORECASE)
+    except re.error as e:
+        raise AnswerKeyError(f"Question {number}: invalid answer_pattern ({e}).") from e
+
+
+class _PatternParser:
+    """
+    Parses the regex subset allowed in answer_pattern into nested
+    alternatives: a list of sequences of (group or None, min, max) items,
+    where a group is itself a list of sequences and max is None if unbounded.
+    """
+    _QUANTIFIER = re.compile(r"\{(\d+)(?:(,)(\d*))?\}")
+    _ESCAPES = set("dDwWsSbBAZtnrfv")
+
+    def __init__(self, pattern: str, number: int):
+        self.pattern = pattern
+        self.number = number
+        self.pos = 0
+
+    def parse(self) -> list:
+        alternatives = self._alternatives()
+        if self.pos < len(self.pattern):
+            self._fail("unbalanced parenthesis")
+        return alternatives
+
+    def _fail(self, problem: str):
+        raise AnswerKeyError(f"Question {self.number}: invalid answer_pattern ({problem}).")
+
+    def _peek(self) -> str:
+        return self.pattern[self.pos] if self.pos < len(self.pattern) else ""
+
+    def _alternatives(self) -> list:
+        alternatives = [self._sequence()]
+        while self._peek() == "|":
+            self.pos += 1
+            alternatives.append(self._sequence())
+        return alternatives
+
+    def _sequence(self) -> list:
+        items = []
+        while self._peek() not in ("", "|", ")"):
+            group = self._atom()
+            items.append((group, *self._quantifier()))
+        return items
+
+    def _escape(self) -> None:
+        char = self.pattern[self.pos + 1:self.pos + 2]
+        if not char:
+            self._fail("trailing backslash")
+        if char.isalnum() and char not in self._ESCAPES:
+            raise AnswerKeyError(
+                f"Question {self.number}: 'answer_pattern' may not use backreferences or the escape \\{char}."
+            )
+        self.pos += 2
+
+    def _atom(self):
+        char = self._peek()
+        if char == "(":
+            self.pos += 1
+            if self._peek() == "?":
+                if not self.pattern.startswith("?:", self.pos):
+                    raise AnswerKeyError(
+                        f"Question {self.number}: 'answer_pattern' may only use plain (...) and (?:...) groups."
+                    )
+                self.pos += 2
+            group = self._alternatives()
+            if self._peek() != ")":
+                self._fail("missing )")
+            self.pos += 1
+            return group
+        if char == "[":
+            self.pos += 1
+            if self._peek() == "^":
+                self.pos += 1
+            if self._peek() == "]":
+                self.pos += 1
+            while self._peek() not in ("", "]"):
+                if self._peek() == "\\":
+                    self._escape()
+                else:
+                    self.pos += 1
+            if not self._peek():
+                self._fail("unterminated character set")
+            self.pos += 1
+            return None
+        if char == "\\":
+            self._escape()
+            return None
+        if char in "*+?":
+            self._fail("nothing to repeat")
+        self.pos += 1
+        return None
+
+    def _quantifier(self) -> tuple[int, int | None]:
+        char = self._peek()
+        if char in ("?", "*", "+"):
+            self.pos += 1
+            bounds = {"?": (0, 1), "*": (0, None), "+": (1, None)}[char]
+        else:
+            match = self._QUANTIFIER.match(self.pattern, self.pos)
+            if not match:
+                return 1, 1
+            self.pos = match.end()
+            low = int(match.group(1))
+            high = low if not match.group(2) else (int(match.group(3)) if match.group(3) else None)
+            bounds = (low, high)
+        if self._peek() in ("?", "+"):  # lazy or possessive
+            self.pos += 1
+        return bounds
+
+
+def _backtracking(alternatives: list, number: int, repeated: bool = False) -> tuple[int, int]:
+    """
+    Bounds how much a parsed pattern can backtrack, as (unbounded repeats,
+    ways to split a match between the bounded ones).
+
+    Raises:
+        AnswerKeyError: if a repeated group itself repeats or alternates.
+    """
+    if repeated and len(alternatives) > 1:
+        raise AnswerKeyError(f"Question {number}: 'answer_pattern' may not repeat a group that alternates, as in (a|ab)*.")
+    unbounded, ways = 0, 0
+    for sequence in alternatives:
+        sequence_ways = 1
+        for group, low, high in sequence:
+            variable = high is None or high > low
+            if repeated and variable:
+                raise AnswerKeyError(f"Question {number}: 'answer_pattern' may not repeat a group that repeats, as in (a+)+.")
+            if group is not None:
+                inner_unbounded, inner_ways = _backtracking(group, number, repeated=high is None or high > 1)
+                unbounded += inner_unbounded
+                sequence_ways *= inner_ways
+            if high is None:
+                unbounded += 1
+            elif variable:
+                sequence_ways *= high - low + 1
+        ways += sequence_ways
+    return unbounded, ways
+
+
+def _answer_pattern(question, number: int) -> str:
+    pattern = question["answer_pattern"]
+    if not isinstance(pattern, str) or not pattern:
+        raise AnswerKeyError(f"Question {number}: 'answer_pattern' must be a non-empty string.")
+    if len(pattern) > MAX_PATTERN_LENGTH:
+        raise AnswerKeyError(f"Question {number}: 'answer_pattern' is longer than {MAX_PATTERN_LENGTH} characters.")
+    unbounded, ways = _backtracking(_PatternParser(pattern, number).parse(), number)
+    # Two unbounded repeats ('.*.*x') already make a failed match quadratic in the answer length.
+    if unbounded > 1:
+        raise AnswerKeyError(f"Question {number}: 'answer_pattern' may use at most one unbounded repeat (*, + or {{n,}}).")
+    if ways > MAX_PATTERN_WAYS:
+        raise AnswerKeyError(f"Question {number}: 'answer_pattern' has too many optional or variable-length parts.")
+    return pattern
+
+
+def _literal(text: str) -> str:
+    return re.escape(normalize_answer(text))
+
+
+def _compile_question(question, number: int) -> QuestionKey:
+    if not isinstance(question, dict) or not isinstance(question.get("text"), str) or not question["text"].strip():
+        raise AnswerKeyError(f"Question {number}: every question needs a 'text'.")
+    text = question["text"]
+
+    if "options" in question:
+        options = tuple(_strings(question["options"], "options", number))
+        correct = question.get("correct_option_index")
+        if len(options) < 2:
+            raise AnswerKeyError(f"Question {number}: a multiple-choice question needs at least two options.")
+        if isinstance(correct, bool) or not isinstance(correct, int) or not 0 <= correct < len(options):
+            raise AnswerKeyError(f"Question {number}: 'correct_option_index' must be between 0 and {len(options) - 1}.")
+        # A typed reply may give the letter ('b', 'b)'), the number ('2') or the option's text.
+        letter = chr(ord("a") + correct)
+        pattern = _compile_pattern([rf"\(?{letter}\)?", str(correct + 1), _literal(options[correct])], number)
+        return QuestionKey(text, options=options, correct_index=correct, pattern=pattern)
+
+    accepted = list(_strings(question.get("accepted_answers", []), "accepted_answers", number))
+    if "answer" in question:
+        accepted = _strings([question["answer"]], "answer", number) + accepted
+    variants = frozenset(normalize_answer(a) for a in accepted)
+    alternatives = [re.escape(v) for v in sorted(variants, key=len, reverse=True)]
+    if "answer_pattern" in question:
+        alternatives.append(_answer_pattern(question, number))
+    pattern = _compile_pattern(alternatives, number) if alternatives else None
+    return QuestionKey(text, accepted=variants, pattern=pattern)
+
+
+def compile_answer_key(content) -> AnswerKey:
+    """
+    Validates exercise content and compiles its answer key. Content without
+    a `questions` list (an essay prompt, say) compiles to an empty key.
+
+    Raises:
+        AnswerKeyError: naming the first question that is malformed.
+    """
+    if not isinstance(content, dict):
+        raise AnswerKeyError("Exercise content must be a JSON object.")
+    if "questions" not in content:
+        return AnswerKey(())
+    questions = content["questions"]
+    if not isinstance(questions, list) or not questions:
+        raise AnswerKeyError("'questions' must be a non-empty list.")
+    return AnswerKey(tuple(_compile_question(q, n) for n, q in enumerate(questions, start=1)))
+
+
+_cache: OrderedDict = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_answer_key(exercise) -> AnswerKey:
+    """
+    The exercise's compiled answer key, compiled at most once per version.
+
+    Raises:
+        AnswerKeyError: if the content is malformed.
+    """
+    version = exercise.updated_at
+    with _cache_lock:
+        cached = _cache.get(exercise.id)
+        if cached and cached[0] == version:
+            _cache.move_to_end(exercise.id)
+            return cached[1]
+    key = compile_answer_key(exercise.content)
+    remember_answer_key(exercise, key)
+    return key
+
+
+def remember_answer_key(exercise, key: AnswerKey) -> None:
+    """Caches a key compiled before the exercise was saved, under its saved version."""
+    with _cache_lock:
+        _cache[exercise.id] = (exercise.updated_at, key)
+        _cache.move_to_end(exercise.id)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
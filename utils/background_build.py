@@ -0,0 +1,52 @@
+"""
+Rebuilds of generated data files (the lexicon, the spelling index and the
+phrase table) off the request path.
+
+The files are built at deploy time:
+
+    python -m utils.lexicon && python -m utils.spelling && python -m utils.phrase_index
+
+If one is missing or stale at runtime anyway, its getter starts a
+BackgroundBuild and returns None until the file is ready, so callers fail
+open instead of holding up the event loop for seconds.
+"""
+import logging
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundBuild:
+    """
+    Runs `build` in a daemon thread, one run at a time. A run that fails is
+    not retried in this process, so a broken source is not rebuilt on every
+    request.
+    """
+
+    def __init__(self, name: str, build: Callable[[], None]):
+        self.name = name
+        self._build = build
+        self._thread = None
+        self._failed = False
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._failed or (self._thread is not None and self._thread.is_alive()):
+                return
+            logger.warning(f"The {self.name} is missing or stale; rebuilding it in the background.")
+            self._thread = threading.Thread(target=self._run, name=f"build-{self.name}", daemon=True)
+            self._thread.start()
+
+    def join(self, timeout: float | None = None) -> None:
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        try:
+            self._build()
+        except Exception as e:
+            self._failed = True
+            logger.error(f"Could not build the {self.name}: {e}")
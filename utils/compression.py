@@ -0,0 +1,62 @@
+"""
+Response compression for the dashboard's JSON APIs.
+
+JSON responses of at least COMPRESS_MIN_BYTES are compressed with brotli
+when the client accepts it and the Brotli package is installed, otherwise
+with gzip. A strong ETag is suffixed with the encoding ('<etag>-br'), since
+the compressed bytes are a different representation.
+"""
+import gzip
+
+try:
+    import brotli
+except ImportError:  # Optional: fall back to gzip
+    brotli = None
+
+# Below this, compression saves less than the extra CPU and headers cost.
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Fast enough to run per response; higher levels are for static assets
+
+ENCODINGS = ('br', 'gzip')
+
+
+def choose_encoding(accept_encodings) -> str | None:
+    """The best encoding both sides support, from a request's Accept-Encoding."""
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def init_app(app):
+    """Compresses large JSON responses after each request."""
+    from flask import request
+
+    @app.after_request
+    def _compress_response(response):
+        if (
+            response.mimetype != 'application/json'
+            or response.status_code != 200
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+        ):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None or response.content_length is None or response.content_length < COMPRESS_MIN_BYTES:
+            return response
+
+        response.set_data(compress(response.get_data(), encoding))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f"{etag}-{encoding}")
+        return response
@@ -0,0 +1,112 @@
+"""
+Connection pool setup beyond what SQLALCHEMY_ENGINE_OPTIONS can express,
+and a stress benchmark for the pool profiles in config.py.
+
+With DB_PGBOUNCER=1 the app talks to PgBouncer in transaction pooling mode:
+a server connection belongs to a client only for one transaction, so
+session-level SETs and startup options do not stick. The statement timeout
+is then set with SET LOCAL at the start of every transaction instead.
+
+    python -m utils.db_pool --profile production --handlers 64 --hold-ms 50
+    python -m utils.db_pool --profile production --url postgresql://localhost/ielts_bench
+"""
+import argparse
+import logging
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, event, exc
+
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+
+def init_app(app):
+    """Installs the per-transaction statement timeout when running behind PgBouncer."""
+    if not app.config.get('DB_PGBOUNCER') or not app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgres'):
+        return
+    with app.app_context():
+        install_statement_timeout(db.engine, app.config['DB_STATEMENT_TIMEOUT_MS'])
+    logger.info("PgBouncer mode: statement_timeout=%sms per transaction", app.config['DB_STATEMENT_TIMEOUT_MS'])
+
+
+def install_statement_timeout(engine, timeout_ms: int) -> None:
+    """Runs SET LOCAL statement_timeout at the start of every transaction on `engine`."""
+    statement = f"SET LOCAL statement_timeout = {int(timeout_ms)}"
+
+    @event.listens_for(engine, "begin")
+    def _set_statement_timeout(conn):
+        conn.exec_driver_sql(statement)
+
+
+def benchmark_pool(engine, handlers: int, requests: int, hold_ms: float) -> dict:
+    """
+    Simulates `handlers` concurrent bot handlers, each checking out a
+    connection, running a query and holding the connection for `hold_ms`,
+    for `requests` checkouts in total.
+
+    Returns:
+        Checkout wait percentiles in milliseconds, the number of checkouts
+        that gave up after pool_timeout, and the peak connections in use.
+    """
+    lock = threading.Lock()
+    in_use = peak = 0
+
+    def handle(_):
+        nonlocal in_use, peak
+        start = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                waited = time.perf_counter() - start
+                with lock:
+                    in_use += 1
+                    peak = max(peak, in_use)
+                conn.exec_driver_sql("SELECT 1")
+                time.sleep(hold_ms / 1000)
+                with lock:
+                    in_use -= 1
+        except exc.TimeoutError:
+            return None
+        return waited * 1000
+
+    with ThreadPoolExecutor(max_workers=handlers) as pool:
+        results = list(pool.map(handle, range(requests)))
+    waits = sorted(w for w in results if w is not None)
+    if not waits:
+        return {"p50_ms": None, "p95_ms": None, "max_ms": None, "timeouts": requests, "peak_connections": peak}
+    return {
+        "p50_ms": statistics.median(waits),
+        "p95_ms": waits[min(len(waits) - 1, int(len(waits) * 0.95))],
+        "max_ms": waits[-1],
+        "timeouts": len(results) - len(waits),
+        "peak_connections": peak,
+    }
+
+
+if __name__ == "__main__":
+    from config import config, engine_options
+
+    parser = argparse.ArgumentParser(description="Measure connection checkout wait under concurrent handlers.")
+    parser.add_argument("--profile", default="production", choices=sorted(config))
+    parser.add_argument("--handlers", type=int, default=64, help="concurrent handlers")
+    parser.add_argument("--requests", type=int, default=2000, help="total checkouts")
+    parser.add_argument("--hold-ms", type=float, default=50.0, help="time each handler keeps its connection")
+    parser.add_argument("--url", help="database to benchmark instead of the profile's own")
+    args = parser.parse_args()
+
+    profile = config[args.profile]
+    url = args.url or profile.SQLALCHEMY_DATABASE_URI
+    engine = create_engine(url, **engine_options(url, **profile.POOL_PROFILE))
+    if profile.DB_PGBOUNCER and engine.dialect.name == "postgresql":
+        install_statement_timeout(engine, profile.DB_STATEMENT_TIMEOUT_MS)
+    print(f"{args.profile}: {engine.url.render_as_string()} pool={engine.pool.status()}")
+    start = time.perf_counter()
+    result = benchmark_pool(engine, args.handlers, args.requests, args.hold_ms)
+    elapsed = time.perf_counter() - start
+    print(f"{args.requests} checkouts by {args.handlers} handlers in {elapsed:.1f}s ({args.requests / elapsed:.0f}/s)")
+    for key, value in result.items():
+        print(f"  {key}: {value if value is None or isinstance(value, int) else f'{value:.1f}'}")
+    engine.dispose()
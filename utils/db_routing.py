@@ -0,0 +1,210 @@
+"""
+Read-replica routing for the Flask-SQLAlchemy session.
+
+Reports and analytics read a lot and write nothing, so when
+SQLALCHEMY_REPLICA_URI is set, queries made inside `replica_reads()` (or a
+function decorated with `read_only`) are sent to the replica instead of the
+primary. Everything else stays on the primary, including flushes and any
+read after the session has written in the current transaction.
+
+The replica is only used while it is fresh enough and the reader has not
+just written:
+
+- Bounded staleness: the replica's replay lag is sampled at most every
+  REPLICA_LAG_CHECK_INTERVAL seconds. If it exceeds REPLICA_MAX_STALENESS,
+  or cannot be measured, reads go to the primary.
+- Read-your-writes: after a principal (a bot user or a dashboard login)
+  commits, their reads stay on the primary until the replica is guaranteed
+  to have caught up. A dashboard login's last write time is kept in its
+  Flask session cookie, so this holds whichever worker serves the next
+  request; bot users are tracked per process, as the bot runs in one.
+
+Writes made with Core on `db.session.connection()` bypass the ORM events
+that notice writes, so the code making them calls `mark_written()`.
+"""
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from cachetools import TTLCache
+from flask import current_app, g, has_app_context, has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+
+logger = logging.getLogger(__name__)
+
+# Postgres standby lag; zero when it has replayed everything it has received.
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+# Flask session key holding the wall-clock time of the login's last commit.
+LAST_WRITE_KEY = 'db_last_write'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_principal = ContextVar('db_principal', default=None)
+
+
+def _measure_lag(engine) -> float:
+    if engine.dialect.name != 'postgresql':
+        return 0.0
+    with engine.connect() as conn:
+        return float(conn.execute(POSTGRES_LAG_QUERY).scalar() or 0.0)
+
+
+class ReplicaRouter:
+    """Decides, per read, whether the replica is fresh enough for the current principal."""
+
+    def __init__(self, engine, max_staleness: float = 5.0, lag_check_interval: float = 1.0, lag_probe=_measure_lag):
+        self.engine = engine
+        self.max_staleness = max_staleness
+        self.lag_check_interval = lag_check_interval
+        self.lag_probe = lag_probe
+        self._lag = None
+        self._lag_checked_at = float('-inf')
+        self._lock = threading.Lock()
+        # The lag can be up to max_staleness when last sampled and grow until the next sample.
+        self._recent_writers = TTLCache(maxsize=100000, ttl=max_staleness + lag_check_interval)
+
+    def lag(self) -> float | None:
+        """The replica's replay lag in seconds, or None if it could not be measured."""
+        now = time.monotonic()
+        if now - self._lag_checked_at >= self.lag_check_interval:
+            with self._lock:
+                if now - self._lag_checked_at >= self.lag_check_interval:
+                    try:
+                        self._lag = self.lag_probe(self.engine)
+                    except Exception as e:
+                        logger.warning(f"Replica lag check failed, reading from the primary: {e}")
+                        self._lag = None
+                    self._lag_checked_at = now
+        return self._lag
+
+    def record_write(self, principal) -> None:
+        with self._lock:
+            self._recent_writers[principal] = True
+
+    def usable_for(self, principal) -> bool:
+        if principal is not None:
+            with self._lock:
+                if principal in self._recent_writers:
+                    return False
+        if has_request_context() and time.time() - flask_session.get(LAST_WRITE_KEY, 0) < self._recent_writers.ttl:
+            return False
+        lag = self.lag()
+        return lag is not None and lag <= self.max_staleness
+
+
+class RoutingSession(Session):
+    """The app's session class; sends reads made under `replica_reads()` to the replica when allowed."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        is_write = self._flushing or getattr(clause, 'is_dml', False)
+        if bind is None and _replica_reads.get() and not is_write and not self.info.get('wrote'):
+            router = current_app.extensions.get('db_replica') if has_app_context() else None
+            if router is not None and router.usable_for(_principal.get()):
+                return router.engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_written(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _mark_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _remember_writer(session):
+    if session.info.pop('wrote', False) and has_app_context():
+        router = current_app.extensions.get('db_replica')
+        principal = _principal.get()
+        if router is not None and principal is not None:
+            router.record_write(principal)
+        if router is not None and has_request_context():
+            flask_session[LAST_WRITE_KEY] = time.time()
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_write(session):
+    session.info.pop('wrote', None)
+
+
+def mark_written(session) -> None:
+    """Records a Core write made on the session's connection, which the ORM events above do not see."""
+    session.info['wrote'] = True
+
+
+@contextmanager
+def replica_reads():
+    """Queries made inside this block may be served by the replica."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def acting_as(principal):
+    """Attributes commits and reads inside this block to `principal` for read-your-writes."""
+    token = _principal.set(principal)
+    try:
+        yield
+    finally:
+        _principal.reset(token)
+
+
+def read_only(func):
+    """Runs a route or bot handler under `replica_reads()`."""
+    if asyncio.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with replica_reads():
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def init_app(app):
+    """Sets up the replica engine when SQLALCHEMY_REPLICA_URI is configured."""
+    @app.before_request
+    def _set_principal():
+        user_id = flask_session.get('user_id')
+        g.db_principal_token = _principal.set(('web', user_id)) if user_id is not None else None
+
+    @app.teardown_request
+    def _reset_principal(exc=None):
+        token = g.pop('db_principal_token', None)
+        if token is not None:
+            _principal.reset(token)
+
+    uri = app.config.get('SQLALCHEMY_REPLICA_URI')
+    if not uri:
+        return
+    from config import engine_options
+    from utils.db_pool import install_statement_timeout
+
+    engine = create_engine(uri, **engine_options(uri, **app.config['POOL_PROFILE']))
+    if app.config.get('DB_PGBOUNCER') and engine.dialect.name == 'postgresql':
+        install_statement_timeout(engine, app.config['DB_STATEMENT_TIMEOUT_MS'])
+    app.extensions['db_replica'] = ReplicaRouter(
+        engine,
+        max_staleness=app.config['REPLICA_MAX_STALENESS'],
+        lag_check_interval=app.config['REPLICA_LAG_CHECK_INTERVAL'],
+    )
+    logger.info(f"Read replica enabled: {engine.url.render_as_string()}")
@@ -0,0 +1,124 @@
+"""
+Local lexical analysis of IELTS Writing responses.
+
+Runs before an essay is sent for grading: essays that clearly cannot meet
+the task (far too short, or not English) get instant feedback instead of a
+model call, and the measurements of the rest are added to the examiner
+prompt and stored with the practice session.
+"""
+import re
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from utils.lexicon import get_lexicon
+
+# IELTS minimum word counts per task.
+MIN_WORDS = {1: 150, 2: 250}
+# Below this share of the minimum an essay is not worth grading yet.
+REJECT_WORD_SHARE = 0.5
+# Above this share of unrecognised words the text is not English prose.
+REJECT_UNKNOWN_SHARE = 0.5
+
+LINKING_WORDS = frozenset("""
+also although besides but consequently conversely finally firstly furthermore hence however
+likewise meanwhile moreover nevertheless nonetheless overall secondly similarly subsequently
+therefore thus whereas while yet
+""".split())
+LINKING_PHRASES = frozenset({
+    "as a result", "as well as", "due to", "even though", "for example", "for instance",
+    "in addition", "in conclusion", "in contrast", "in fact", "in other words", "in particular",
+    "in summary", "on the contrary", "on the other hand", "such as", "to conclude", "to sum up",
+})
+
+_WORD = re.compile(r"[a-z0-9]+(?:['’-][a-z0-9]+)*")
+_SENTENCE = re.compile(r"[^.!?]*[a-z0-9][^.!?]*(?:[.!?]+|$)")
+
+
+@dataclass(frozen=True)
+class EssayMetrics:
+    task_type: int
+    word_count: int
+    minimum_words: int
+    sentence_count: int
+    paragraph_count: int
+    type_token_ratio: float
+    average_word_length: float
+    unknown_word_share: float
+    linking_word_density: float  # linking words and phrases per 100 words
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @property
+    def problem(self) -> str | None:
+        """
+        Why the essay should not be graded yet: 'too_short' or 'not_english',
+        or None if it can go to the examiner.
+        """
+        if self.word_count < self.minimum_words * REJECT_WORD_SHARE:
+            return "too_short"
+        if self.unknown_word_share > REJECT_UNKNOWN_SHARE:
+            return "not_english"
+        return None
+
+
+def _ngrams(tokens: np.ndarray, n: int) -> np.ndarray:
+    grams = tokens[:len(tokens) - n + 1]
+    for offset in range(1, n):
+        grams = np.char.add(np.char.add(grams, " "), tokens[offset:len(tokens) - n + 1 + offset])
+    return grams
+
+
+def analyze_essay(text: str, task_type: int) -> EssayMetrics:
+    """Measures an essay; everything after tokenizing is vectorized over the token array."""
+    text = (text or "").lower()
+    tokens = np.array(_WORD.findall(text), dtype=str)
+    word_count = len(tokens)
+    minimum = MIN_WORDS.get(task_type, MIN_WORDS[2])
+    sentences = len(_SENTENCE.findall(text))
+    paragraphs = len([p for p in re.split(r"\n\s*\n", text) if p.strip()])
+    if word_count == 0:
+        return EssayMetrics(task_type, 0, minimum, 0, 0, 0.0, 0.0, 0.0, 0.0)
+
+    letters_only = np.char.replace(np.char.replace(np.char.replace(tokens, "-", ""), "'", ""), "’", "")
+    is_word = np.char.isalpha(letters_only)
+    words = tokens[is_word]
+    lengths = np.char.str_len(letters_only[is_word])
+
+    # Each distinct word is looked up once and the result broadcast back.
+    unknown_share = 0.0
+    lexicon = get_lexicon()
+    if lexicon is not None and len(words):
+        distinct, inverse = np.unique(words, return_inverse=True)
+        known = np.fromiter((lexicon.is_known_word(w) for w in distinct), dtype=bool, count=len(distinct))
+        unknown_share = float(1.0 - known[inverse].mean())
+
+    linking = int(np.isin(tokens, list(LINKING_WORDS)).sum())
+    for n in (2, 3, 4):
+        if word_count >= n:
+            linking += int(np.isin(_ngrams(tokens, n), list(LINKING_PHRASES)).sum())
+
+    return EssayMetrics(
+        task_type=task_type,
+        word_count=word_count,
+        minimum_words=minimum,
+        sentence_count=sentences,
+        paragraph_count=paragraphs,
+        type_token_ratio=round(len(np.unique(words)) / len(words), 3) if len(words) else 0.0,
+        average_word_length=round(float(lengths.mean()), 2) if len(words) else 0.0,
+        unknown_word_share=round(unknown_share, 3),
+        linking_word_density=round(linking / word_count * 100, 2),
+    )
+
+
+def describe_for_examiner(metrics: EssayMetrics) -> str:
+    """The measurements as prompt lines for the grading model."""
+    return (
+        f"- Words: {metrics.word_count} (task minimum {metrics.minimum_words})\n"
+        f"- Sentences: {metrics.sentence_count}, paragraphs: {metrics.paragraph_count}\n"
+        f"- Type-token ratio: {metrics.type_token_ratio}\n"
+        f"- Average word length: {metrics.average_word_length} letters\n"
+        f"- Words not in an English dictionary: {metrics.unknown_word_share:.0%}\n"
+        f"- Linking words per 100 words: {metrics.linking_word_density}"
+    )
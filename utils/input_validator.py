@@ -1,6 +1,8 @@
 import json
 import re
 
+from utils.answer_key import AnswerKeyError, compile_answer_key
+
 class InputValidator:
     """A utility class for validating and sanitizing user inputs."""
 
@@ -74,5 +76,11 @@ class InputValidator:
             # For now, we just require a 'text' field. This can be expanded.
             if 'text' not in question or not question['text']:
                 return None
-        
+
+        # Options, correct indexes and accepted answers must compile into an answer key.
+        try:
+            compile_answer_key(content)
+        except AnswerKeyError:
+            return None
+
         return content 
\ No newline at end of file
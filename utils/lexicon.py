@@ -0,0 +1,223 @@
+"""
+Compact, memory-mapped English word list built from data/dictionaries.
+
+The CSVs are normalized, de-duplicated and sorted once into a binary file:
+
+    header   8-byte magic, uint32 word count
+    offsets  uint32[count + 1] in native byte order, offset of each word in the blob
+    blob     the UTF-8 words, concatenated in sorted order
+
+Loading maps the file instead of reading it, so startup is a few
+milliseconds and the pages are shared between worker processes. Lookups
+bisect the offsets table: O(log n) for membership and prefix queries.
+
+The file is built at deploy time with `python -m utils.lexicon`. If it
+is missing or a CSV is newer than it, it is rebuilt in the background
+(utils.background_build) and get_lexicon() returns None until it is ready.
+"""
+import bisect
+import glob
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+
+from utils.background_build import BackgroundBuild
+
+logger = logging.getLogger(__name__)
+
+DICTIONARY_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "dictionaries")
+LEXICON_PATH = os.path.join(DICTIONARY_DIR, "lexicon.bin")
+
+MAGIC = b"IELTSLX1"
+HEADER = struct.Struct("<8sI")
+
+# (suffix, replacements) tried in order to find the dictionary form of an
+# inflected word, e.g. 'studies' -> 'study', 'making' -> 'make'.
+_SUFFIX_RULES = (
+    ("'s", ("",)),
+    ("ies", ("y",)),
+    ("ied", ("y",)),
+    ("es", ("", "e")),
+    ("s", ("",)),
+    ("ed", ("", "e")),
+    ("ing", ("", "e")),
+    ("est", ("", "e")),
+    ("er", ("", "e")),
+    ("ly", ("",)),
+)
+
+
+def normalize(word: str) -> str:
+    """Lowercases, unifies dashes and collapses whitespace; dictionary entries may be multiword."""
+    return " ".join(word.strip().lower().replace("\u2013", "-").split())
+
+
+def build_lexicon(source_dir: str = DICTIONARY_DIR, path: str = LEXICON_PATH) -> int:
+    """
+    Builds the binary lexicon from every CSV in `source_dir`.
+
+    Returns:
+        The number of distinct words written.
+    """
+    words = set()
+    for csv_path in sorted(glob.glob(os.path.join(source_dir, "*.csv"))):
+        # The lists are ASCII apart from a few Windows-1252 en dashes.
+        with open(csv_path, encoding="cp1252") as f:
+            for line in f:
+                word = normalize(line)
+                if word:
+                    words.add(word.encode("utf-8"))
+    ordered = sorted(words)
+
+    offsets = array("I", [0])
+    total = 0
+    for word in ordered:
+        total += len(word)
+        offsets.append(total)
+
+    # Written to a temporary file and renamed, so workers never map a partial file.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(ordered)))
+        f.write(offsets.tobytes())
+        f.write(b"".join(ordered))
+    os.replace(tmp_path, path)
+    return len(ordered)
+
+
+class Lexicon:
+    """Read-only view over a lexicon file built by `build_lexicon`."""
+
+    def __init__(self, path: str = LEXICON_PATH):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a lexicon file")
+        blob_start = HEADER.size + 4 * (self._count + 1)
+        self._offsets = memoryview(self._mm)[HEADER.size:blob_start].cast("I")
+        self._blob = memoryview(self._mm)[blob_start:]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _word(self, i: int) -> bytes:
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]])
+
+    def __getitem__(self, i: int) -> str:
+        return self._word(i).decode("utf-8")
+
+    def _bisect(self, key: bytes) -> int:
+        return bisect.bisect_left(range(self._count), key, key=self._word)
+
+    def __contains__(self, word: str) -> bool:
+        key = normalize(word).encode("utf-8")
+        i = self._bisect(key)
+        return i < self._count and self._word(i) == key
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self._word(i).decode("utf-8")
+
+    def words_with_prefix(self, prefix: str, limit: int = 10) -> list[str]:
+        """Returns up to `limit` words starting with `prefix`, in sorted order."""
+        key = normalize(prefix).encode("utf-8")
+        words = []
+        i = self._bisect(key)
+        while i < self._count and len(words) < limit:
+            word = self._word(i)
+            if not word.startswith(key):
+                break
+            words.append(word.decode("utf-8"))
+            i += 1
+        return words
+
+    def has_prefix(self, prefix: str) -> bool:
+        return bool(self.words_with_prefix(prefix, limit=1))
+
+    def lemma(self, word: str) -> str | None:
+        """
+        Finds the dictionary entry for a word or a regular inflection of it.
+
+        Returns:
+            The matching entry, or None if the word is not recognised.
+        """
+        word = normalize(word)
+        if word in self:
+            return word
+        for suffix, replacements in _SUFFIX_RULES:
+            if not word.endswith(suffix) or len(word) - len(suffix) < 2:
+                continue
+            stem = word[:-len(suffix)]
+            for replacement in replacements:
+                if stem + replacement in self:
+                    return stem + replacement
+            # Doubled final consonant: 'running' -> 'run', 'stopped' -> 'stop'.
+            if len(stem) > 2 and stem[-1] == stem[-2] and stem[:-1] in self:
+                return stem[:-1]
+        return None
+
+    def is_known_word(self, word: str) -> bool:
+        """Checks a word, allowing regular inflections and hyphenated compounds of known words."""
+        word = normalize(word)
+        if not word:
+            return False
+        if self.lemma(word):
+            return True
+        parts = [p for p in word.replace("-", " ").split() if p]
+        return len(parts) > 1 and all(self.lemma(p) for p in parts)
+
+
+_lexicon = None
+_lexicon_lock = threading.Lock()
+
+
+def _is_stale(path: str, source_dir: str) -> bool:
+    if not os.path.exists(path):
+        return True
+    built_at = os.path.getmtime(path)
+    return any(os.path.getmtime(p) > built_at for p in glob.glob(os.path.join(source_dir, "*.csv")))
+
+
+def ensure_lexicon() -> None:
+    """Builds the lexicon file if it is missing or older than a dictionary CSV."""
+    if _is_stale(LEXICON_PATH, DICTIONARY_DIR):
+        count = build_lexicon(DICTIONARY_DIR, LEXICON_PATH)
+        logger.info(f"Built lexicon with {count} words at {LEXICON_PATH}.")
+
+
+_rebuild = BackgroundBuild("lexicon", ensure_lexicon)
+
+
+def get_lexicon() -> Lexicon | None:
+    """
+    Returns the shared lexicon, or None while the file is being rebuilt or
+    if the dictionaries are unavailable, so callers can fail open.
+    """
+    global _lexicon
+    if _lexicon is None:
+        with _lexicon_lock:
+            if _lexicon is None:
+                try:
+                    if _is_stale(LEXICON_PATH, DICTIONARY_DIR):
+                        _rebuild.start()
+                        return None
+                    _lexicon = Lexicon(LEXICON_PATH)
+                except (OSError, ValueError) as e:
+                    logger.error(f"Could not load the lexicon: {e}")
+                    return None
+    return _lexicon
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    count = build_lexicon()
+    print(f"Built {count} words into {LEXICON_PATH} ({os.path.getsize(LEXICON_PATH) / 1024:.0f} KiB) "
+          f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+    start = time.perf_counter()
+    lexicon = Lexicon()
+    print(f"Mapped in {(time.perf_counter() - start) * 1000:.2f} ms")
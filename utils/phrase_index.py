@@ -0,0 +1,219 @@
+"""
+Target phrases from the seed-data model answers and a matcher for them.
+
+The bolded collocations in the speaking answers ('**splurge**',
+'**top-of-the-line**') are extracted with their topic and source sentence
+into a phrase table at data/phrase_table.json, built at deploy time with
+`python -m utils.phrase_index` and rebuilt in the background if the seed
+data changes.
+
+The phrases are compiled into an Aho-Corasick automaton over word tokens,
+so a transcript or essay is checked against every phrase in one linear
+pass. Tokens are reduced to dictionary forms first, so 'splurged on'
+still counts as using 'splurge on'.
+"""
+import glob
+import json
+import logging
+import os
+import re
+import threading
+from collections import deque
+from dataclasses import asdict, dataclass
+
+from utils.background_build import BackgroundBuild
+from utils.speaking_corpus import SEED_DATA_DIR, SpeakingCorpus, get_speaking_corpus, words
+from utils.translation_system import TranslationSystem
+
+logger = logging.getLogger(__name__)
+
+PHRASE_TABLE_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "phrase_table.json")
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_MARKDOWN = re.compile(r"[*_`\[\]]")
+
+
+@dataclass(frozen=True)
+class Phrase:
+    text: str
+    topic: str
+    sentence: str
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher over sequences of hashable symbols.
+
+    Args:
+        patterns: The symbol sequences to find; match ids are their positions.
+    """
+
+    def __init__(self, patterns: list[tuple]):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pattern_id, pattern in enumerate(patterns):
+            node = 0
+            for symbol in pattern:
+                if symbol not in self._goto[node]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[node][symbol] = len(self._goto) - 1
+                node = self._goto[node][symbol]
+            if pattern:
+                self._out[node].append(pattern_id)
+
+        # Breadth-first, so every failure link points at an already finished node.
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for symbol, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and symbol not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(symbol, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+    def find(self, symbols):
+        """Yields (end position, pattern id) for every occurrence, overlapping ones included."""
+        node = 0
+        for position, symbol in enumerate(symbols):
+            while node and symbol not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(symbol, 0)
+            for pattern_id in self._out[node]:
+                yield position, pattern_id
+
+
+def _source_sentence(answer: str, phrase: str) -> str:
+    for sentence in _SENTENCE_END.split(answer):
+        if phrase in sentence.lower():
+            return sentence.strip()
+    return ""
+
+
+def build_phrase_table(corpus: SpeakingCorpus, path: str = PHRASE_TABLE_PATH) -> int:
+    """
+    Writes every distinct highlighted phrase in `corpus`, with the topic and
+    sentence it first appears in, to a JSON phrase table.
+
+    Returns:
+        The number of phrases written.
+    """
+    phrases = {}
+    for question in corpus.questions:
+        for text in question.vocabulary:
+            if text not in phrases:
+                phrases[text] = Phrase(text, question.topic, _source_sentence(question.model_answer, text))
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump([asdict(p) for p in phrases.values()], f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+    return len(phrases)
+
+
+class PhraseIndex:
+    """The phrase table with an automaton over its tokenized phrases."""
+
+    def __init__(self, phrases: list[Phrase]):
+        self.phrases = phrases
+        self._automaton = AhoCorasick([tuple(words(p.text)) for p in phrases])
+
+    @classmethod
+    def load(cls, path: str = PHRASE_TABLE_PATH) -> "PhraseIndex":
+        with open(path, encoding="utf-8") as f:
+            return cls([Phrase(**row) for row in json.load(f)])
+
+    def used(self, text: str) -> list[Phrase]:
+        """The target phrases found in `text`, in order of first use."""
+        found = dict.fromkeys(pattern_id for _, pattern_id in self._automaton.find(words(text)))
+        return [self.phrases[i] for i in found]
+
+    def review(self, text: str, prompt: str, limit: int = 5) -> dict:
+        """
+        Checks a graded answer for target phrases.
+
+        Args:
+            text: The transcript or essay.
+            prompt: The question it answers, used to find the related topics.
+            limit: How many unused phrases to recommend.
+
+        Returns:
+            {'used': [Phrase, ...], 'suggested': [Phrase, ...]}, where the
+            suggestions come from the topics closest to `prompt`, longest
+            collocations first.
+        """
+        used = self.used(text)
+        used_texts = {p.text for p in used}
+        corpus = get_speaking_corpus()
+        topics = []
+        if corpus is not None:
+            topics = list(dict.fromkeys(q.topic for _, q in corpus.search(prompt or "", limit=10)))[:3]
+        suggested = []
+        for topic in topics:
+            unused = [p for p in self.phrases if p.topic == topic and p.text not in used_texts]
+            suggested.extend(sorted(unused, key=lambda p: len(p.text.split()), reverse=True))
+        return {"used": used, "suggested": suggested[:limit]}
+
+
+def format_phrase_review(review: dict, lang_code: str) -> str | None:
+    """Formats a review for appending to Markdown feedback, or returns None if there is nothing to say."""
+    lines = []
+    for key, label in (("used", "target_phrases_used"), ("suggested", "target_phrases_suggested")):
+        if review[key]:
+            phrases = ", ".join(_MARKDOWN.sub("", p.text) for p in review[key])
+            lines.append(TranslationSystem.get_message("feedback", label, lang_code, phrases=phrases))
+    return "\n".join(lines) or None
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _is_stale(path: str) -> bool:
+    if not os.path.exists(path):
+        return True
+    built_at = os.path.getmtime(path)
+    return any(os.path.getmtime(p) > built_at for p in glob.glob(os.path.join(SEED_DATA_DIR, "*.md")))
+
+
+def ensure_phrase_table() -> None:
+    """Builds the phrase table if it is missing or older than the seed data."""
+    if _is_stale(PHRASE_TABLE_PATH):
+        corpus = get_speaking_corpus()
+        if corpus is None:
+            raise OSError(f"No speaking corpus under {SEED_DATA_DIR}")
+        count = build_phrase_table(corpus, PHRASE_TABLE_PATH)
+        logger.info(f"Built phrase table with {count} phrases at {PHRASE_TABLE_PATH}.")
+
+
+_rebuild = BackgroundBuild("phrase table", ensure_phrase_table)
+
+
+def get_phrase_index() -> PhraseIndex | None:
+    """Returns the shared index, or None while the phrase table is being rebuilt or if it is unavailable."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                try:
+                    if _is_stale(PHRASE_TABLE_PATH):
+                        _rebuild.start()
+                        return None
+                    _index = PhraseIndex.load(PHRASE_TABLE_PATH)
+                except (OSError, ValueError, TypeError) as e:
+                    logger.error(f"Could not load the phrase index: {e}")
+                    return None
+    return _index
+
+
+if __name__ == "__main__":
+    count = build_phrase_table(SpeakingCorpus.from_directory())
+    index = PhraseIndex.load()
+    print(f"Built {count} phrases into {PHRASE_TABLE_PATH}; automaton has {len(index._automaton)} states")
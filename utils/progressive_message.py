@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, Iterable
+
+from telegram import Message
+from telegram.error import BadRequest, RetryAfter
+
+logger = logging.getLogger(__name__)
+
+# Telegram allows roughly one edit per second per chat before answering 429.
+EDIT_INTERVAL = 1.0
+MAX_MESSAGE_LENGTH = 4096
+
+_DONE = object()
+
+
+async def iterate_in_thread(iterable: Iterable) -> AsyncIterator:
+    """
+    Consumes a blocking iterable (e.g., an OpenAI stream) from a worker
+    thread, so the event loop keeps serving other updates between chunks.
+    """
+    iterator = iter(iterable)
+    while True:
+        item = await asyncio.to_thread(next, iterator, _DONE)
+        if item is _DONE:
+            return
+        yield item
+
+
+class ProgressiveMessage:
+    """
+    Edits a placeholder message as streamed text arrives, at most once per
+    `interval` seconds. Intermediate edits are best-effort; `finish` always
+    delivers the final text.
+    """
+
+    def __init__(self, message: Message, interval: float = EDIT_INTERVAL):
+        self.message = message
+        self.interval = interval
+        self._last_text = message.text if isinstance(getattr(message, "text", None), str) else None
+        self._next_edit_at = time.monotonic() + interval
+
+    @staticmethod
+    def _fit(text: str) -> str:
+        if len(text) <= MAX_MESSAGE_LENGTH:
+            return text
+        return text[:MAX_MESSAGE_LENGTH - 1] + "…"
+
+    async def _edit(self, text: str, **kwargs) -> None:
+        await self.message.edit_text(text, **kwargs)
+        self._last_text = text
+
+    async def update(self, text: str) -> None:
+        """Shows `text` if the throttle window has passed; otherwise drops it."""
+        text = self._fit(text)
+        now = time.monotonic()
+        if now < self._next_edit_at or not text.strip() or text == self._last_text:
+            return
+        self._next_edit_at = now + self.interval
+        try:
+            await self._edit(text)
+        except RetryAfter as e:
+            self._next_edit_at = now + e.retry_after
+            logger.warning(f"Telegram throttled progressive edits; pausing for {e.retry_after}s.")
+        except BadRequest as e:
+            logger.debug(f"Skipped progressive edit: {e}")
+
+    async def finish(self, text: str, **kwargs) -> None:
+        """Shows the final text, with any formatting options such as `parse_mode`."""
+        text = self._fit(text)
+        if text == self._last_text and not kwargs:
+            return
+        try:
+            await self._edit(text, **kwargs)
+        except RetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+            await self._edit(text, **kwargs)
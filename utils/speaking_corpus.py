@@ -0,0 +1,261 @@
+"""
+IELTS Speaking questions and model answers from data/seed-data.
+
+Each topic file is parsed into SpeakingQuestion records: numbered '####'
+questions (Part 1, or Part 3 after a '### PART 3' heading) and Part 2 cue
+cards, whose answer is every paragraph written under the card. Bolded
+phrases in an answer are kept as its vocabulary.
+
+The records are indexed for Okapi BM25 in an in-memory inverted index, so a
+topic search over the whole corpus takes well under a millisecond:
+
+    python -m utils.speaking_corpus "a city you would like to visit"
+"""
+import glob
+import logging
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+
+from utils.lexicon import get_lexicon
+
+logger = logging.getLogger(__name__)
+
+SEED_DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "seed-data")
+
+# Standard Okapi BM25 parameters.
+K1 = 1.5
+B = 0.75
+# Question and topic words say what an item is about; answers only hint at it.
+QUESTION_WEIGHT = 3
+# Below this a search result shares little more than a common word with the query.
+MIN_SCORE = 2.0
+
+_STOPWORDS = frozenset("""
+a about an and are as at be but by can do does for from have how i if in is it its me my of on or so that the
+their them there they this time to was we were what when where which who why will with would you your
+""".split())
+_TOKEN = re.compile(r"[a-z]+(?:'[a-z]+)?")
+_BOLD = re.compile(r"\*\*(.+?)\*\*")
+_PART_HEADING = re.compile(r"^###\s*PART\s*(\d)", re.IGNORECASE)
+_NUMBERED = re.compile(r"^(?:\d+\.)?\s*(.+)$")
+
+
+@dataclass(frozen=True)
+class SpeakingQuestion:
+    topic: str
+    part: int
+    question: str
+    model_answer: str
+    vocabulary: tuple[str, ...]
+    source: str
+
+    def to_dict(self) -> dict:
+        """The shape returned by OpenAIService.generate_speaking_question."""
+        return {
+            "topic": self.topic,
+            "question": self.question,
+            "model_answer": self.model_answer,
+            "vocabulary": list(self.vocabulary),
+        }
+
+
+def _topic_name(path: str) -> str:
+    """'008-hurrying-&-rushing.md' -> 'Hurrying & Rushing'."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    words = stem.split("-")[1:] if stem.split("-")[0].isdigit() else stem.split("-")
+    return " ".join(w.capitalize() for w in words if w)
+
+
+def _plain(text: str) -> str:
+    return _BOLD.sub(r"\1", text).strip()
+
+
+def parse_topic_file(path: str) -> list[SpeakingQuestion]:
+    """Parses one seed-data markdown file into its questions."""
+    topic = _topic_name(path)
+    source = os.path.basename(path)
+    questions = []
+    part = 1
+    current = None  # [part, question lines, answer lines]
+
+    def flush():
+        nonlocal current
+        if current is not None:
+            answer = "\n".join(current[2]).strip()
+            vocabulary = dict.fromkeys(v.strip(" .,;:!?").lower() for v in _BOLD.findall(answer))
+            questions.append(SpeakingQuestion(
+                topic=topic,
+                part=current[0],
+                question="\n".join(current[1]),
+                model_answer=_plain(answer),
+                vocabulary=tuple(v for v in vocabulary if v),
+                source=source,
+            ))
+        current = None
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            stripped = line.strip()
+            heading = _PART_HEADING.match(stripped)
+            if heading:
+                flush()
+                part = int(heading.group(1))
+            elif re.fullmatch(r"-{3,}", stripped):
+                flush()
+            elif stripped.startswith("####"):
+                if part == 2 and current is not None:
+                    # Part 2 answers are split under the cue card's prompts.
+                    continue
+                flush()
+                text = _plain(_NUMBERED.match(stripped.lstrip("#").strip()).group(1))
+                current = [part, [text], []]
+            elif part == 2 and current is None and _BOLD.fullmatch(stripped):
+                current = [part, [_plain(stripped)], []]
+            elif part == 2 and current is not None and not current[2] and stripped.startswith("- "):
+                current[1].append(f"- {_plain(stripped[2:])}")
+            elif current is not None and (stripped or current[2]):
+                current[2].append(stripped)
+    flush()
+    return questions
+
+
+def _normalize_token(token: str) -> str:
+    """Reduces a token to its dictionary form where the lexicon knows one ('cities' -> 'city')."""
+    lexicon = get_lexicon()
+    if lexicon is None:
+        return token  # Not cached, so the token is reduced once the lexicon is back.
+    return _lemmatize(lexicon, token)
+
+
+@lru_cache(maxsize=8192)
+def _lemmatize(lexicon, token: str) -> str:
+    lemma = lexicon.lemma(token)
+    # 'cans' is not the modal 'can'.
+    return lemma if lemma and lemma not in _STOPWORDS else token
+
+
+def words(text: str) -> list[str]:
+    """Every word of `text` in dictionary form."""
+    return [_normalize_token(t) for t in _TOKEN.findall(text.lower())]
+
+
+def tokenize(text: str) -> list[str]:
+    """The words of `text` that carry meaning for search, in dictionary form."""
+    return [_normalize_token(t) for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class SpeakingCorpus:
+    """The parsed questions with a BM25 inverted index over them."""
+
+    def __init__(self, questions: list[SpeakingQuestion]):
+        self.questions = questions
+        self._postings = defaultdict(list)  # term -> [(question index, term frequency)]
+        lengths = []
+        for i, q in enumerate(questions):
+            terms = tokenize(f"{q.topic} {q.question}") * QUESTION_WEIGHT
+            terms += tokenize(q.model_answer) + tokenize(" ".join(q.vocabulary))
+            lengths.append(len(terms))
+            for term, count in Counter(terms).items():
+                self._postings[term].append((i, count))
+        average = sum(lengths) / len(lengths) if lengths else 1.0
+        # Per-document part of the BM25 denominator, precomputed once.
+        self._norms = [K1 * (1 - B + B * length / average) for length in lengths]
+        n = len(questions)
+        self._idf = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    @classmethod
+    def from_directory(cls, directory: str = SEED_DATA_DIR) -> "SpeakingCorpus":
+        questions = []
+        for path in sorted(glob.glob(os.path.join(directory, "*.md"))):
+            if os.path.basename(path).lower() != "readme.md":
+                questions.extend(parse_topic_file(path))
+        return cls(questions)
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def topics(self) -> list[str]:
+        return sorted({q.topic for q in self.questions})
+
+    def search(self, query: str, part: int = None, limit: int = 5) -> list[tuple[float, SpeakingQuestion]]:
+        """Returns up to `limit` (score, question) pairs for `query`, best first."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for i, tf in self._postings[term]:
+                if part is None or self.questions[i].part == part:
+                    scores[i] += idf * tf * (K1 + 1) / (tf + self._norms[i])
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(score, self.questions[i]) for i, score in best]
+
+    def pick(self, part: int, topic: str = None) -> SpeakingQuestion | None:
+        """
+        Chooses a question for a speaking part: one of the closest matches to
+        `topic` if given, otherwise any question of that part.
+
+        Returns:
+            The question, or None if the corpus has nothing suitable.
+        """
+        if topic:
+            # Words shared only with a model answer are too weak a link to serve the question.
+            wanted = set(tokenize(topic))
+            matches = [
+                q for score, q in self.search(topic, part=part, limit=3)
+                if score >= MIN_SCORE and wanted & set(tokenize(f"{q.topic} {q.question}"))
+            ]
+            return random.choice(matches) if matches else None
+        candidates = [q for q in self.questions if q.part == part and q.question]
+        return random.choice(candidates) if candidates else None
+
+
+_corpus = None
+_corpus_lemmatized = False
+_corpus_lock = threading.Lock()
+
+
+def get_speaking_corpus() -> SpeakingCorpus | None:
+    """
+    Returns the shared corpus, parsing the seed data on first use; None if it
+    is unavailable. A corpus indexed while the lexicon was unavailable holds
+    words as written, so it is indexed again once the lexicon loads.
+    """
+    global _corpus, _corpus_lemmatized
+    if _corpus is None or not _corpus_lemmatized:
+        with _corpus_lock:
+            lemmatized = get_lexicon() is not None
+            if _corpus is None or (lemmatized and not _corpus_lemmatized):
+                try:
+                    _corpus = SpeakingCorpus.from_directory()
+                    _corpus_lemmatized = lemmatized
+                    logger.info(f"Indexed {len(_corpus)} speaking questions from {SEED_DATA_DIR}.")
+                except (OSError, UnicodeDecodeError) as e:
+                    logger.error(f"Could not load the speaking corpus: {e}")
+    return _corpus
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    corpus = SpeakingCorpus.from_directory()
+    print(f"Indexed {len(corpus)} questions over {len(corpus.topics())} topics "
+          f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+    query = " ".join(sys.argv[1:]) or "a city you would like to visit"
+    runs = 1000
+    start = time.perf_counter()
+    for _ in range(runs):
+        results = corpus.search(query)
+    print(f"'{query}': {(time.perf_counter() - start) / runs * 1e6:.0f} us per search")
+    for score, q in results:
+        print(f"  {score:5.2f}  [{q.topic}, part {q.part}] {q.question.splitlines()[0]}")
@@ -0,0 +1,309 @@
+"""
+SymSpell-style spelling suggestions over the lexicon.
+
+Every single-word lexicon entry contributes the deletes (up to
+MAX_EDIT_DISTANCE characters removed) of its first PREFIX_LENGTH
+characters. The deletes are hashed with CRC32 and stored in one file:
+
+    header   8-byte magic, uint32 lexicon size, pair count, max distance
+    keys     uint32[pairs], delete hashes in sorted order
+    values   uint32[pairs], the lexicon index each delete came from
+    senses   uint8[lexicon size], how often each entry is listed
+    lengths  uint8[lexicon size], entry lengths
+
+A lookup binary-searches the query's own deletes, drops candidates whose
+length alone rules them out, and checks the rest with one vectorized
+Damerau-Levenshtein pass, so the cost is a few hundred microseconds
+regardless of the lexicon size.
+
+The index is written next to the lexicon at deploy time by
+`python -m utils.spelling` (after `python -m utils.lexicon`) and
+memory-mapped on first use; a missing or stale index is rebuilt in the
+background. `python -m utils.spelling --benchmark` compares it with a
+linear scan.
+"""
+import argparse
+import glob
+import logging
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from utils import lexicon as lexicon_module
+from utils.background_build import BackgroundBuild
+from utils.lexicon import Lexicon, get_lexicon, normalize
+
+logger = logging.getLogger(__name__)
+
+SPELLING_INDEX_PATH = os.path.join(lexicon_module.DICTIONARY_DIR, "spelling.bin")
+
+MAX_EDIT_DISTANCE = 2
+PREFIX_LENGTH = 7
+
+MAGIC = b"IELTSSP1"
+HEADER = struct.Struct("<8sIII")
+
+_SINGLE_WORD = re.compile(r"^[a-z][a-z'-]*$")
+
+
+def _deletes(word: str, distance: int = MAX_EDIT_DISTANCE) -> set[str]:
+    """All strings reachable from the word's prefix by deleting up to `distance` characters."""
+    results = {word[:PREFIX_LENGTH]}
+    frontier = set(results)
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        results |= frontier
+    return results
+
+
+def _key(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8"))
+
+
+def damerau_levenshtein(a: str, b: str, max_distance: int = MAX_EDIT_DISTANCE) -> int:
+    """
+    Optimal string alignment distance, giving up early once every path
+    exceeds `max_distance`.
+
+    Returns:
+        The distance, or max_distance + 1 if it is larger than max_distance.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1] if previous[-1] <= max_distance else max_distance + 1
+
+
+def batch_distances(word: str, candidates: list[str]) -> np.ndarray:
+    """
+    Optimal string alignment distance from `word` to every candidate at once.
+
+    Each row of the dynamic programme is computed for all candidates together;
+    the insertion chain along a row, cur[j] = min(t[j], cur[j - 1] + 1), is a
+    running minimum of t[j] - j.
+    """
+    width = max(map(len, candidates))
+    # Lexicon words are ASCII; anything else is replaced and simply never matches.
+    padded = b"".join(c.encode("ascii", "replace").ljust(width, b"\0") for c in candidates)
+    codes = np.frombuffer(padded, dtype=np.uint8).reshape(len(candidates), width)
+    word = word.encode("ascii", "replace")
+    lengths = np.fromiter(map(len, candidates), dtype=np.intp, count=len(candidates))
+    steps = np.arange(width + 1, dtype=np.int16)
+
+    previous_previous = None
+    previous = np.broadcast_to(steps, (len(candidates), width + 1))
+    for i, char in enumerate(word, start=1):
+        cost = codes != char
+        current = np.empty_like(previous)
+        current[:, 0] = i
+        np.minimum(previous[:, 1:] + 1, previous[:, :-1] + cost, out=current[:, 1:])
+        if previous_previous is not None and width > 1:
+            swapped = (codes[:, :-1] == char) & (codes[:, 1:] == word[i - 2])
+            np.minimum(current[:, 2:], np.where(swapped, previous_previous[:, :-2] + 1, current[:, 2:]), out=current[:, 2:])
+        current = np.minimum.accumulate(current - steps, axis=1) + steps
+        previous_previous, previous = previous, current
+    return previous[np.arange(len(candidates)), lengths]
+
+
+def _sense_counts(lexicon: Lexicon, source_dir: str) -> np.ndarray:
+    """
+    How many times each lexicon entry is listed across the CSVs. Common words
+    have many senses, so this stands in for word frequency when ranking.
+    """
+    counts = {}
+    for csv_path in glob.glob(os.path.join(source_dir, "*.csv")):
+        with open(csv_path, encoding="cp1252") as f:
+            for line in f:
+                word = normalize(line)
+                counts[word] = counts.get(word, 0) + 1
+    return np.fromiter((min(counts.get(w, 1), 255) for w in lexicon), dtype=np.uint8, count=len(lexicon))
+
+
+def build_spelling_index(lexicon: Lexicon, path: str = SPELLING_INDEX_PATH,
+                         source_dir: str = lexicon_module.DICTIONARY_DIR) -> int:
+    """
+    Builds the delete index for every single-word entry of `lexicon`.
+
+    Returns:
+        The number of (delete, word) pairs stored.
+    """
+    keys, values = [], []
+    for index, word in enumerate(lexicon):
+        if not _SINGLE_WORD.match(word):
+            continue
+        for delete in _deletes(word):
+            keys.append(_key(delete))
+            values.append(index)
+    keys = np.asarray(keys, dtype=np.uint32)
+    values = np.asarray(values, dtype=np.uint32)
+    order = np.argsort(keys, kind="stable")
+    senses = _sense_counts(lexicon, source_dir)
+    lengths = np.fromiter((min(len(w), 255) for w in lexicon), dtype=np.uint8, count=len(lexicon))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(lexicon), len(keys), MAX_EDIT_DISTANCE))
+        f.write(keys[order].tobytes())
+        f.write(values[order].tobytes())
+        f.write(senses.tobytes())
+        f.write(lengths.tobytes())
+    os.replace(tmp_path, path)
+    return len(keys)
+
+
+class SpellingIndex:
+    """Read-only, memory-mapped view over a file built by `build_spelling_index`."""
+
+    def __init__(self, lexicon: Lexicon, path: str = SPELLING_INDEX_PATH):
+        self.lexicon = lexicon
+        with open(path, "rb") as f:
+            magic, lexicon_size, pairs, max_distance = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or lexicon_size != len(lexicon) or max_distance != MAX_EDIT_DISTANCE:
+            raise ValueError(f"{path} does not match the current lexicon")
+        offset = HEADER.size
+        # Plain ndarray views over the mapping: slicing np.memmap itself is several times slower.
+        self._keys = np.asarray(np.memmap(path, dtype=np.uint32, mode="r", offset=offset, shape=(pairs,)))
+        offset += 4 * pairs
+        self._values = np.asarray(np.memmap(path, dtype=np.uint32, mode="r", offset=offset, shape=(pairs,)))
+        offset += 4 * pairs
+        self._senses = np.asarray(np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(lexicon_size,)))
+        offset += lexicon_size
+        self._lengths = np.asarray(np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(lexicon_size,)))
+
+    def _candidates(self, word: str) -> np.ndarray:
+        """Lexicon indices sharing a delete with `word` and close enough to it in length."""
+        query_keys = np.fromiter((_key(d) for d in _deletes(word)), dtype=np.uint32)
+        starts = np.searchsorted(self._keys, query_keys, side="left")
+        ends = np.searchsorted(self._keys, query_keys, side="right")
+        hits = [self._values[s:e] for s, e in zip(starts, ends) if e > s]
+        if not hits:
+            return np.empty(0, dtype=np.uint32)
+        indices = np.unique(np.concatenate(hits))
+        gap = np.abs(self._lengths[indices].astype(np.int32) - len(word))
+        return indices[gap <= MAX_EDIT_DISTANCE]
+
+    def suggest(self, word: str, limit: int = 3) -> list[str]:
+        """
+        Returns up to `limit` dictionary words within MAX_EDIT_DISTANCE of
+        `word`, closest first.
+        """
+        word = normalize(word)
+        indices = self._candidates(word) if word else []
+        if not len(indices):
+            return []
+        candidates = [self.lexicon[i] for i in indices.tolist()]
+        distances = batch_distances(word, candidates)
+        close = (distances <= MAX_EDIT_DISTANCE) & (distances > 0)
+        # Among equally close words, swapped letters ('thier') are the likeliest typo, then the commoner word.
+        letters = sorted(word)
+        not_anagram = np.fromiter((sorted(c) != letters for c in candidates), dtype=bool, count=len(candidates))
+        order = np.lexsort((-self._senses[indices].astype(np.int32), not_anagram, distances))
+        return [candidates[i] for i in order if close[i]][:limit]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _is_stale(lexicon: Lexicon) -> bool:
+    if (not os.path.exists(SPELLING_INDEX_PATH)
+            or os.path.getmtime(SPELLING_INDEX_PATH) < os.path.getmtime(lexicon_module.LEXICON_PATH)):
+        return True
+    try:
+        SpellingIndex(lexicon, SPELLING_INDEX_PATH)
+    except ValueError:
+        return True
+    return False
+
+
+def ensure_spelling_index() -> None:
+    """Builds the index file if it is missing or does not match the current lexicon."""
+    lexicon = Lexicon(lexicon_module.LEXICON_PATH)
+    if _is_stale(lexicon):
+        pairs = build_spelling_index(lexicon, SPELLING_INDEX_PATH)
+        logger.info(f"Built spelling index with {pairs} entries at {SPELLING_INDEX_PATH}.")
+
+
+_rebuild = BackgroundBuild("spelling index", ensure_spelling_index)
+
+
+def get_spelling_index() -> SpellingIndex | None:
+    """
+    Returns the shared index, or None while the file is being rebuilt or if
+    the lexicon is unavailable.
+    """
+    global _index
+    if _index is None:
+        lexicon = get_lexicon()
+        if lexicon is None:
+            return None
+        with _index_lock:
+            if _index is None:
+                try:
+                    if _is_stale(lexicon):
+                        _rebuild.start()
+                        return None
+                    _index = SpellingIndex(lexicon, SPELLING_INDEX_PATH)
+                except OSError as e:
+                    logger.error(f"Could not load the spelling index: {e}")
+                    return None
+    return _index
+
+
+def _benchmark(queries: list[str]) -> None:
+    lexicon = Lexicon()
+    start = time.perf_counter()
+    build_spelling_index(lexicon)
+    build_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    index = SpellingIndex(lexicon)
+    load_ms = (time.perf_counter() - start) * 1000
+    words = [w for w in lexicon if _SINGLE_WORD.match(w)]
+
+    print(f"Lexicon: {len(lexicon)} entries ({os.path.getsize(lexicon_module.LEXICON_PATH) / 1024:.0f} KiB), "
+          f"{len(words)} single words")
+    print(f"Spelling index: {os.path.getsize(SPELLING_INDEX_PATH) / 1024 / 1024:.1f} MiB, "
+          f"built in {build_ms:.0f} ms, mapped in {load_ms:.2f} ms")
+    print(f"{'query':<14}{'symspell':>12}{'linear scan':>14}  suggestions")
+    for query in queries:
+        runs = 200
+        start = time.perf_counter()
+        for _ in range(runs):
+            suggestions = index.suggest(query)
+        symspell_us = (time.perf_counter() - start) / runs * 1e6
+
+        start = time.perf_counter()
+        naive = sorted(
+            (d, w) for w in words if (d := damerau_levenshtein(query, w)) <= MAX_EDIT_DISTANCE and w != query
+        )
+        naive_us = (time.perf_counter() - start) * 1e6
+        print(f"{query:<14}{symspell_us:>10.0f}us{naive_us / 1000:>12.0f}ms  "
+              f"{', '.join(suggestions)} (scan found {len(naive)})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or benchmark the spelling index.")
+    parser.add_argument("--benchmark", action="store_true", help="Compare lookups with a linear Damerau-Levenshtein scan.")
+    parser.add_argument("queries", nargs="*", default=["recieve", "enviroment", "accomodate", "goverment", "thier", "definately"])
+    args = parser.parse_args()
+    if args.benchmark:
+        _benchmark(args.queries)
+    else:
+        print(f"Built {build_spelling_index(Lexicon())} entries into {SPELLING_INDEX_PATH}")